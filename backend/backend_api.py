@@ -3,31 +3,154 @@ Mentra AI Group Therapy Coordination System
 Backend API with OpenAI ChatGPT integration for advanced AI conversation analysis
 """
 
-from flask import Flask, request, jsonify
-from flask.cli import load_dotenv
-from flask_cors import CORS
+from quart import Quart, Request, request, jsonify, Response, g
+from quart_cors import cors
 from datetime import datetime, timedelta
+import asyncio
+import contextvars
 import json
+import math
 import re
+import time
 from dotenv import load_dotenv
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 import os
-from openai import OpenAI
+from user_store import create_user_store, concern_keys, urgency_of, URGENCY_LEVELS
+from group_store import create_group_store
+from json_stream import JSONFieldStreamer, JSONRecordStream
+from llm_cache import create_llm_cache, make_cache_key
+from idempotency import create_idempotency_store, request_fingerprint
+from json_provider import FastJSONProvider, compact_json
+from rate_limit import create_rate_limiter
+from metrics import registry
+from tracing import tracer, configure_tracer
+from llm_gateway import create_llm_gateway
+from llm_scheduler import prioritized
+from lexicon import load_lexicon
+from prompt_templates import CRISIS_ASSESSMENT_PROMPT, ANALYSIS_SYSTEM_PROMPT_V1
+from similarity_engine import SimilarityGroupEngine
+from group_placement import IncrementalGroupPlacer, PeriodicRebalancer
+from briefing_store import BriefingStore, BriefingError, FINGERPRINT_FIELDS
+from job_queue import JobRunner, TERMINAL, create_job_queue, public_job
+from conversation_memory import ConversationMemory, estimate_tokens, trim_to_budget, unsummarized
+from turn_sequencer import TurnSequencer, StaleTurn
 
-app = Flask(__name__)
-CORS(app)
+# POST /api/users/import streams its body record by record, so it may be far
+# larger than MAX_CONTENT_LENGTH (16 MB), which still applies everywhere else
+IMPORT_PATH = '/api/users/import'
+IMPORT_MAX_BYTES = int(os.getenv('MENTRA_IMPORT_MAX_BYTES', str(2 * 1024 ** 3)))
 
-# In-memory storage (use database in production)
-users_db = []
-groups_db = []
+
+class MentraRequest(Request):
+    """Request with the larger body limit on IMPORT_PATH"""
+
+    def __init__(self, method, scheme, path, *args, max_content_length=None, **kwargs):
+        if path == IMPORT_PATH:
+            max_content_length = IMPORT_MAX_BYTES
+        super().__init__(method, scheme, path, *args, max_content_length=max_content_length, **kwargs)
+
+
+app = Quart(__name__)
+app = cors(app, allow_origin="*")
+app.request_class = MentraRequest
+# jsonify and request.get_json go through orjson when it is installed (see json_provider.py)
+app.json = FastJSONProvider(app)
+
+# Storage: users and groups live in stores (in-memory, or SQLite shared by all
+# worker processes; see user_store.py and group_store.py)
+users_db = create_user_store()
+groups_db = create_group_store()
 sessions_db = []
 
 #load dotenv
 load_dotenv() 
 
-# Initialize OpenAI client
+# Request tracing (off unless MENTRA_TRACE_SAMPLE_RATE is set; see tracing.py)
+configure_tracer()
+
+# Initialize OpenAI client behind the shared gateway (pooling, deadlines, retries, circuit breaker)
 # Set your API key via environment variable: export OPENAI_API_KEY='your-key-here'
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+llm_gateway = create_llm_gateway()
+
+# Shared response cache for all AI components (see llm_cache.py)
+llm_cache = create_llm_cache()
+
+# Responses remembered per Idempotency-Key so client retries cost no LLM calls
+idempotency_store = create_idempotency_store()
+
+# Token buckets per user, IP and AI component, checked before any OpenAI call (see rate_limit.py)
+rate_limiter = create_rate_limiter()
+# Behind a reverse proxy every request shares the proxy's address; use X-Forwarded-For instead
+TRUST_PROXY = os.getenv('MENTRA_TRUST_PROXY', 'false').lower() in ('1', 'true', 'yes')
+
+# Prometheus metrics served at /metrics (LLM latency and tokens are counted in llm_gateway.py)
+HTTP_LATENCY = registry.histogram(
+    'mentra_http_request_duration_seconds',
+    "API latency per route until response headers are sent", ('route', 'method', 'status'))
+HTTP_IN_FLIGHT = registry.gauge('mentra_http_requests_in_flight', "API requests in progress", ('route',))
+FALLBACKS = registry.counter(
+    'mentra_fallback_responses_total', "Degraded or fail-safe results served instead of an LLM answer",
+    ('component',))
+
+USERS_IMPORTED = registry.counter(
+    'mentra_users_imported_total', "Profiles received by POST /api/users/import", ('result',))
+
+# Bulk import: profiles per store write, largest single record, errors listed per response
+IMPORT_BATCH_SIZE = int(os.getenv('MENTRA_IMPORT_BATCH_SIZE', '1000'))
+IMPORT_MAX_RECORD_BYTES = 1024 * 1024
+MAX_IMPORT_ERRORS = 1000
+
+# Local phrase lexicon used to pre-screen intake turns (see lexicon.py)
+lexicon = load_lexicon()
+
+
+def cached_completion(component, gateway, model, messages, temperature, response_format=None):
+    """
+    chat.completions.create through the gateway, behind the shared response cache.
+    Returns {'content': ..., 'usage': {...}}; 'cached' is set on hits.
+    """
+    key = make_cache_key(model, messages, temperature, response_format)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return dict(cached, cached=True)
+    
+    kwargs = {'model': model, 'messages': messages, 'temperature': temperature}
+    if response_format:
+        kwargs['response_format'] = response_format
+    response = gateway.complete(component, **kwargs)
+    return _store_completion(component, key, response, response_format)
+
+
+async def cached_completion_async(component, gateway, model, messages, temperature, response_format=None):
+    """cached_completion on the gateway's async client (request path)"""
+    key = make_cache_key(model, messages, temperature, response_format)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return dict(cached, cached=True)
+    
+    kwargs = {'model': model, 'messages': messages, 'temperature': temperature}
+    if response_format:
+        kwargs['response_format'] = response_format
+    response = await gateway.complete_async(component, **kwargs)
+    return _store_completion(component, key, response, response_format)
+
+
+def _store_completion(component, key, response, response_format):
+    usage = response.usage
+    result = {
+        'content': response.choices[0].message.content,
+        'usage': {
+            'prompt_tokens': usage.prompt_tokens if usage else 0,
+            'completion_tokens': usage.completion_tokens if usage else 0,
+            'total_tokens': usage.total_tokens if usage else 0
+        }
+    }
+    # Never cache a JSON-mode reply that would fail to parse on the next hit
+    if response_format and response_format.get('type') == 'json_object':
+        json.loads(result['content'])
+    llm_cache.set(key, result, component)
+    return result
 
 
 class AIConversationAnalyzer:
@@ -37,7 +160,13 @@ class AIConversationAnalyzer:
     
     def __init__(self, model="gpt-4o-mini"):
         self.model = model
-        self.client = client
+        self.gateway = llm_gateway
+        self.lexicon = lexicon
+        # Prompt budget for summary + recent turns (older turns are folded by ConversationMemory)
+        self.history_token_budget = int(os.getenv('MENTRA_HISTORY_TOKEN_BUDGET', '800'))
+        # Whole-thread analysis (/api/analyze-conversation and offline re-analysis, see batch_reanalysis.py)
+        self.thread_prompt = ANALYSIS_SYSTEM_PROMPT_V1
+        self.thread_token_budget = int(os.getenv('MENTRA_THREAD_TOKEN_BUDGET', '6000'))
         
         # This prompt instructs the AI to be an interviewer first, analyst second
         self.system_prompt = """You are Mentra, an empathetic mental health intake coordinator. 
@@ -101,20 +230,121 @@ OUTPUT FORMAT (JSON):
 }
 """
 
-    def analyze_message(self, message, conversation_history=None):
+    @tracer.traced('analyzer.analyze_message')
+    async def analyze_message(self, message, conversation_history=None, summary=None):
         """
         Args:
             message: Current user message
             conversation_history: List of dicts [{'role': 'user', 'content': '...'}, ...]
+            summary: Rolling summary of turns no longer kept verbatim
+        """
+        with tracer.span('analyzer.lexicon_screen'):
+            screen = self.lexicon.classify(message, conversation_history or summary)
+        if screen['kind'] != 'content':
+            tracer.current().set('answered_by', 'lexicon')
+            return self.lexicon.templated_response(screen['kind'], conversation_history)
+        
+        try:
+            with tracer.span('analyzer.build_prompt'):
+                messages = self._build_messages(message, conversation_history, screen['concerns'], summary)
+            result = await cached_completion_async(
+                'analyzer', self.gateway,
+                model=self.model,
+                messages=messages,
+                temperature=0.7, # Slightly higher for more natural conversation
+                response_format={"type": "json_object"}
+            )
+            tracer.current().set('cached', result.get('cached', False))
+            
+            with tracer.span('analyzer.parse_json'):
+                analysis = json.loads(result['content'])
+            analysis['_prompt_tokens'] = {
+                'estimated': sum(estimate_tokens(m['content']) for m in messages),
+                'billed': result['usage'].get('prompt_tokens')
+            }
+            return analysis
+            
+        except Exception as e:
+            print(f"Error in AI analysis: {str(e)}")
+            FALLBACKS.inc('analyzer')
+            return self._fallback_response()
+
+    async def stream_message(self, message, conversation_history=None, summary=None):
+        """
+        Streaming variant of analyze_message.
+
+        Yields ('token', text) while the reply_to_user field is being generated,
+        then a single ('final', analysis_dict) once the JSON object is complete.
         """
+        with tracer.span('analyzer.lexicon_screen'):
+            screen = self.lexicon.classify(message, conversation_history or summary)
+        if screen['kind'] != 'content':
+            analysis = self.lexicon.templated_response(screen['kind'], conversation_history)
+            yield 'token', analysis['reply_to_user']
+            yield 'final', analysis
+            return
+        
+        streamer = JSONFieldStreamer('reply_to_user')
+        with tracer.span('analyzer.build_prompt'):
+            messages = self._build_messages(message, conversation_history, screen['concerns'], summary)
+        prompt_tokens = {'estimated': sum(estimate_tokens(m['content']) for m in messages), 'billed': None}
+        response_format = {"type": "json_object"}
         try:
-            # 1. Prepare context string for the AI
-            context_str = "No previous context."
-            if conversation_history:
-                # Format last 5 messages for context
-                context_str = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_history[-5:]])
+            # A cached completion is replayed as a single token
+            key = make_cache_key(self.model, messages, 0.7, response_format)
+            cached = llm_cache.get(key)
+            if cached is not None:
+                analysis = json.loads(cached['content'])
+                analysis['_prompt_tokens'] = prompt_tokens
+                yield 'token', analysis.get('reply_to_user', '')
+                yield 'final', analysis
+                return
+            
+            stream = await self.gateway.complete_async(
+                'analyzer',
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                response_format=response_format,
+                stream=True,
+                stream_options={'include_usage': True}
+            )
+            async for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    prompt_tokens['billed'] = chunk.usage.prompt_tokens
+                    self.gateway.record_usage('analyzer', self.model, chunk.usage)
+                if not chunk.choices:
+                    continue
+                text = streamer.feed(chunk.choices[0].delta.content or '')
+                if text:
+                    yield 'token', text
+            
+            with tracer.span('analyzer.parse_json'):
+                analysis = json.loads(streamer.text)
+            llm_cache.set(key, {'content': streamer.text, 'usage': {}}, 'analyzer')
+            analysis['_prompt_tokens'] = prompt_tokens
+            yield 'final', analysis
+            
+        except Exception as e:
+            print(f"Error in streaming AI analysis: {str(e)}")
+            FALLBACKS.inc('analyzer')
+            fallback = self._fallback_response()
+            if not streamer.field_complete:
+                yield 'token', fallback['reply_to_user']
+            yield 'final', fallback
+
+    def _build_messages(self, message, conversation_history=None, concern_hints=None, summary=None):
+        """Render the system + user messages for one intake turn"""
+        # 1. Prepare context string for the AI: rolling summary plus as many recent turns as fit
+        context_str = "No previous context."
+        budget = self.history_token_budget - (estimate_tokens(summary) if summary else 0)
+        recent = trim_to_budget(conversation_history, max(budget, 0))
+        if recent:
+            context_str = "\n".join([f"{msg['role']}: {msg['content']}" for msg in recent])
+        if summary:
+            context_str = f"Summary of earlier conversation: {summary}\n{context_str if recent else ''}"
 
-            user_prompt = f"""
+        user_prompt = f"""
             CONVERSATION HISTORY:
             {context_str}
 
@@ -125,41 +355,142 @@ OUTPUT FORMAT (JSON):
             If you need more info to place them safely, ask a question. 
             If you have a clear picture, complete the analysis.
             """
-            
-            # 2. Call OpenAI
-            response = self.client.chat.completions.create(
+        if concern_hints:
+            user_prompt += "\n" + self.lexicon.format_hints(concern_hints)
+        
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    @tracer.traced('analyzer.summarize_history')
+    def summarize_history(self, previous_summary, messages):
+        """
+        Fold older turns into the rolling conversation summary.
+        Runs off the request path (see ConversationMemory).
+        """
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
+        prompt = f"""PREVIOUS SUMMARY:
+{previous_summary or "None yet."}
+
+NEW TURNS TO FOLD IN:
+{transcript}
+
+Update the summary in at most 120 words. Keep: stated concerns, severity and duration,
+behaviours, how the user's mood has changed over time, and which questions were already asked."""
+        try:
+            result = cached_completion(
+                'memory', self.gateway,
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt}
+                    {"role": "system", "content": "You maintain concise running summaries of mental health intake conversations."},
+                    {"role": "user", "content": prompt}
                 ],
-                temperature=0.7, # Slightly higher for more natural conversation
+                temperature=0.2
+            )
+            return result['content'].strip()
+        except Exception as e:
+            print(f"Error summarizing history: {str(e)}")
+            FALLBACKS.inc('memory')
+            # Local fallback: keep what the user said, newest last, within budget
+            user_turns = [m for m in messages if m['role'] == 'user']
+            kept = trim_to_budget(user_turns, 150)
+            earlier = f"{previous_summary} " if previous_summary else ""
+            return earlier + "User said: " + " | ".join(m['content'] for m in kept)
+
+    def build_thread_messages(self, thread, system_prompt=None):
+        """
+        System + user messages scoring a whole conversation thread.
+        thread is a list of {'role', 'content'} dicts (plain strings count as user
+        turns); the newest turns that fit thread_token_budget are kept.
+        """
+        turns = [t if isinstance(t, dict) else {'role': 'user', 'content': str(t)} for t in thread or []]
+        kept = trim_to_budget(turns, self.thread_token_budget)
+        transcript = "\n".join(f"{t.get('role', 'user')}: {t.get('content', '')}" for t in kept)
+        if len(kept) < len(turns):
+            transcript = f"[{len(turns) - len(kept)} earlier messages omitted]\n{transcript}"
+        return [
+            {"role": "system", "content": system_prompt or self.thread_prompt},
+            {"role": "user", "content": f"Analyze this complete intake conversation thread:\n\n{transcript}"}
+        ]
+
+    def score_thread(self, thread, component='analyzer', system_prompt=None):
+        """
+        Blocking whole-thread analysis. Raises on upstream or parse errors,
+        so batch callers can retry the thread instead of storing a fallback.
+        """
+        messages = self.build_thread_messages(thread, system_prompt)
+        result = cached_completion(
+            component, self.gateway,
+            model=self.model,
+            messages=messages,
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+        return self.parse_thread_analysis(result, sum(estimate_tokens(m['content']) for m in messages))
+
+    @tracer.traced('analyzer.analyze_conversation_thread')
+    async def analyze_conversation_thread(self, thread):
+        """Whole-thread analysis on the request path; degrades instead of raising"""
+        try:
+            messages = self.build_thread_messages(thread)
+            result = await cached_completion_async(
+                'analyzer', self.gateway,
+                model=self.model,
+                messages=messages,
+                temperature=0.3,
                 response_format={"type": "json_object"}
             )
-            
-            return json.loads(response.choices[0].message.content)
-            
+            return self.parse_thread_analysis(result, sum(estimate_tokens(m['content']) for m in messages))
         except Exception as e:
-            print(f"Error in AI analysis: {str(e)}")
-            return self._fallback_response()
+            print(f"Error in thread analysis: {str(e)}")
+            FALLBACKS.inc('analyzer')
+            return {
+                "detected_concerns": {},
+                "urgency_level": "normal",
+                "key_themes": [],
+                "degraded": True
+            }
+
+    @staticmethod
+    def parse_thread_analysis(result, estimated_tokens):
+        """The analysis dict from a thread completion ({'content', 'usage'})"""
+        analysis = json.loads(result['content'])
+        if not isinstance(analysis, dict):
+            raise ValueError("thread analysis is not a JSON object")
+        analysis['_prompt_tokens'] = {
+            'estimated': estimated_tokens,
+            'billed': result['usage'].get('prompt_tokens')
+        }
+        return analysis
 
     def _fallback_response(self):
         return {
             "status": "interviewing",
             "reply_to_user": "I'm having a little trouble connecting. Could you tell me a bit more about what brings you here?",
-            "gathered_info": {}
+            "gathered_info": {},
+            "degraded": True
         }
 
 
 class GroupMatchingAI:
     """
-    AI-powered group matching using ChatGPT to create optimal therapy groups
+    AI-powered group matching using ChatGPT to create optimal therapy groups.
+    Large pools are partitioned into shards that fit the context window and
+    formed concurrently, then merged into groups of 4-8.
     """
     
-    def __init__(self, model="gpt-4o-mini"):
+    MIN_GROUP_SIZE = 4
+    MAX_GROUP_SIZE = 8
+    
+    def __init__(self, model="gpt-4o-mini", shard_token_budget=None, max_parallel=None):
         self.model = model
-        self.client = client
+        self.gateway = llm_gateway
+        # Approximate prompt tokens of profile data allowed per shard
+        self.shard_token_budget = shard_token_budget or int(os.getenv('MENTRA_MATCHER_SHARD_TOKENS', '6000'))
+        self.max_parallel = max_parallel or int(os.getenv('MENTRA_MATCHER_PARALLELISM', '4'))
     
+    @tracer.traced('matcher.optimize_group_formation')
     def optimize_group_formation(self, user_profiles):
         """
         Use AI to optimize group formation based on user profiles
@@ -175,11 +506,25 @@ class GroupMatchingAI:
             }
             user_summaries.append(summary)
         
+        shards = self._plan_shards(user_summaries)
+        if len(shards) <= 1:
+            return self._form_shard(user_summaries)
+        
+        # Each shard runs in a copy of this context so its spans nest under this call
+        contexts = [contextvars.copy_context() for _ in shards]
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='matcher') as pool:
+            results = list(pool.map(lambda ctx, shard: ctx.run(self._form_shard, shard), contexts, shards))
+        
+        return self._merge_shards(results, user_summaries)
+    
+    @tracer.traced('matcher.form_shard')
+    def _form_shard(self, user_summaries):
+        """Single AI formation call over one set of user summaries"""
         prompt = f"""You are a therapeutic group formation specialist. Based on the following user profiles, 
 recommend optimal group formations for group therapy.
 
 User Profiles:
-{json.dumps(user_summaries, indent=2)}
+{compact_json(user_summaries)}
 
 Create groups of 4-8 people that will work well together based on:
 1. Similar primary concerns
@@ -203,7 +548,8 @@ Return your recommendations in JSON format:
 }}"""
 
         try:
-            response = self.client.chat.completions.create(
+            result = cached_completion(
+                'matcher', self.gateway,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an expert in therapeutic group formation."},
@@ -213,26 +559,127 @@ Return your recommendations in JSON format:
                 response_format={"type": "json_object"}
             )
             
-            return json.loads(response.choices[0].message.content)
+            return json.loads(result['content'])
             
         except Exception as e:
             print(f"Error in group formation: {str(e)}")
+            FALLBACKS.inc('matcher')
             return {'error': str(e)}
     
+    def _plan_shards(self, user_summaries):
+        """
+        Partition summaries by (primary concern, urgency) and pack them into shards
+        whose profile JSON stays within shard_token_budget. Buckets of the same
+        concern are packed together so the model sees compatible members side by side.
+        """
+        buckets = defaultdict(list)
+        for summary in user_summaries:
+            concern = summary['primary_concerns'][0] if summary['primary_concerns'] else 'general'
+            buckets[(concern, URGENCY_LEVELS.index(summary['urgency']))].append(summary)
+        
+        shards, current, current_tokens, current_concern = [], [], 0, None
+        for (concern, _), members in sorted(buckets.items()):
+            # Close the shard at a concern boundary once it can hold a full group
+            if concern != current_concern and len(current) >= self.MAX_GROUP_SIZE:
+                shards.append(current)
+                current, current_tokens = [], 0
+            current_concern = concern
+            for summary in members:
+                tokens = estimate_tokens(compact_json(summary))
+                if current and current_tokens + tokens > self.shard_token_budget:
+                    shards.append(current)
+                    current, current_tokens = [], 0
+                current.append(summary)
+                current_tokens += tokens
+        if current:
+            shards.append(current)
+        return shards
+    
+    def _merge_shards(self, results, user_summaries):
+        """
+        Combine shard results: drop unknown or duplicate ids, split oversized groups,
+        then place leftover members into compatible groups with spare capacity
+        or form new groups from them. Leftovers too few to make a group of
+        MIN_GROUP_SIZE are returned as unassigned_ids.
+        """
+        by_id = {s['user_id']: s for s in user_summaries}
+        assigned = set()
+        groups, strategies, errors = [], [], []
+        
+        for result in results:
+            if 'error' in result:
+                errors.append(result['error'])
+                continue
+            if result.get('overall_strategy'):
+                strategies.append(result['overall_strategy'])
+            for rec_group in result.get('recommended_groups', []):
+                member_ids = [m for m in dict.fromkeys(rec_group.get('member_ids', []))
+                              if m in by_id and m not in assigned]
+                n_chunks = -(-len(member_ids) // self.MAX_GROUP_SIZE)
+                for i in range(n_chunks):
+                    chunk = member_ids[i::n_chunks]
+                    if len(chunk) < self.MIN_GROUP_SIZE:
+                        continue
+                    groups.append(dict(rec_group, member_ids=chunk))
+                    assigned.update(chunk)
+        
+        if errors and not groups:
+            return {'error': '; '.join(errors)}
+        
+        # Reconcile leftovers, preferring groups that already share a concern
+        leftovers = [s for s in user_summaries if s['user_id'] not in assigned]
+        group_concerns = [{c for m in g['member_ids'] for c in by_id[m]['primary_concerns']} for g in groups]
+        unplaced = defaultdict(list)
+        for summary in leftovers:
+            concerns = set(summary['primary_concerns'])
+            candidates = [i for i, g in enumerate(groups)
+                          if len(g['member_ids']) < self.MAX_GROUP_SIZE and concerns & group_concerns[i]]
+            if candidates:
+                best = min(candidates, key=lambda i: len(groups[i]['member_ids']))
+                groups[best]['member_ids'].append(summary['user_id'])
+            else:
+                concern = summary['primary_concerns'][0] if summary['primary_concerns'] else 'general'
+                unplaced[concern].append(summary['user_id'])
+        
+        unassigned = []
+        for concern, member_ids in unplaced.items():
+            if len(member_ids) < self.MIN_GROUP_SIZE:
+                unassigned.extend(member_ids)
+                continue
+            # Aim for ~6 members while keeping every chunk within 4-8
+            n_chunks = max(-(-len(member_ids) // self.MAX_GROUP_SIZE), round(len(member_ids) / 6))
+            n_chunks = min(n_chunks, len(member_ids) // self.MIN_GROUP_SIZE)
+            for i in range(n_chunks):
+                groups.append({
+                    'group_name': f"{concern.replace('_', ' ').title()} Support Group",
+                    'member_ids': member_ids[i::n_chunks],
+                    'primary_focus': concern,
+                    'reasoning': "Members left unplaced after sharded formation, matched by primary concern",
+                    'estimated_cohesion': 0.6,
+                    'special_considerations': ""
+                })
+        
+        return {
+            'recommended_groups': groups,
+            'unassigned_ids': unassigned,
+            'overall_strategy': f"Formed in {len(results)} shards by concern and urgency. " + " ".join(strategies[:3]),
+            'shard_count': len(results),
+            'shard_errors': errors
+        }
+    
     def _extract_concerns(self, user):
         """Extract primary concerns from user analysis"""
         concerns = []
         for analysis in user.get('conversation_analysis', []):
             if 'detected_concerns' in analysis:
                 concerns.extend(analysis['detected_concerns'].keys())
-        return list(set(concerns))[:3]  # Top 3 unique concerns
+        if not concerns:
+            concerns = concern_keys(user)
+        return list(dict.fromkeys(concerns))[:3]  # Top 3 unique concerns
     
     def _extract_urgency(self, user):
         """Extract urgency level from user analysis"""
-        urgency_levels = []
-        for analysis in user.get('conversation_analysis', []):
-            urgency_levels.append(analysis.get('urgency_level', 'normal'))
-        return max(urgency_levels, default='normal')
+        return urgency_of(user)
     
     def _extract_themes(self, user):
         """Extract key themes from user analysis"""
@@ -249,8 +696,9 @@ class TherapistBriefingAI:
     
     def __init__(self, model="gpt-4o"):
         self.model = model  # Use GPT-4 for higher quality briefings
-        self.client = client
+        self.gateway = llm_gateway
     
+    @tracer.traced('briefing.generate')
     def generate_comprehensive_briefing(self, group_data):
         """
         Generate a detailed therapist briefing for a group
@@ -258,7 +706,7 @@ class TherapistBriefingAI:
         prompt = f"""Generate a comprehensive therapist briefing for an upcoming group therapy session.
 
 Group Information:
-{json.dumps(group_data, indent=2)}
+{compact_json(group_data)}
 
 Create a professional briefing that includes:
 1. Group Overview (size, primary focus, formation date)
@@ -273,7 +721,8 @@ Create a professional briefing that includes:
 Make it actionable and clinically relevant. Use professional therapeutic language."""
 
         try:
-            response = self.client.chat.completions.create(
+            result = cached_completion(
+                'briefing', self.gateway,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a clinical supervisor preparing briefings for group therapists."},
@@ -282,21 +731,125 @@ Make it actionable and clinically relevant. Use professional therapeutic languag
                 temperature=0.4
             )
             
-            briefing_text = response.choices[0].message.content
-            
             return {
                 'group_id': group_data.get('id'),
                 'generated_at': datetime.utcnow().isoformat(),
-                'briefing_text': briefing_text,
+                'briefing_text': result['content'],
                 'model_used': self.model,
-                'token_count': response.usage.total_tokens
+                'token_count': result['usage']['total_tokens'],
+                'cached': result.get('cached', False)
             }
             
         except Exception as e:
             print(f"Error generating briefing: {str(e)}")
+            FALLBACKS.inc('briefing')
             return {'error': str(e)}
         
 
+class CrisisScreener:
+    """
+    Fast-path crisis screening that runs alongside the intake analyzer.
+    A local high-recall keyword screen gates CRISIS_ASSESSMENT_PROMPT on a small model,
+    which runs as its own task so it never waits on the intake reply.
+    """
+    
+    # Deliberately broad: a false positive only costs one small-model call
+    KEYWORD_RE = re.compile(r"\b(?:" + "|".join([
+        r"suicid\w*", r"kill(?:ing)? my ?self", r"end(?:ing)? (?:it all|my life|things)", r"want(?:ed)? to die",
+        r"wish i (?:was|were) dead", r"better off (?:dead|without me)", r"no reason to (?:live|go on)",
+        r"(?:don'?t|do not) want to (?:be here|live|wake up)", r"can'?t go on", r"take my (?:own )?life",
+        r"hurt(?:ing)? my ?self", r"self[- ]?harm\w*", r"cut(?:ting)? my ?self", r"cutting",
+        r"overdos\w*", r"hang(?:ing)? my ?self", r"jump(?:ing)? off", r"pills",
+        r"hurt(?:ing)? (?:someone|somebody|them|him|her|people)", r"kill (?:someone|somebody|them|him|her|people)",
+        r"voices (?:tell|telling)", r"goodbye forever", r"not safe"
+    ]) + r")\b", re.IGNORECASE)
+    
+    ESCALATION_LEVELS = ('high', 'immediate')
+    
+    def __init__(self, model="gpt-4o-mini", max_workers=4):
+        self.model = model
+        self.gateway = llm_gateway
+        # Caps concurrent assessments; created lazily inside the serving event loop
+        self.max_concurrent = max_workers
+        self._slots = None
+        self.screened = 0
+        self.keyword_hits = 0
+        self.escalations = 0
+        self.detection_ms = deque(maxlen=1000)
+    
+    def build_messages(self, message):
+        """Chat messages for one assessment"""
+        return [
+            {"role": "system", "content": CRISIS_ASSESSMENT_PROMPT},
+            {"role": "user", "content": message}
+        ]
+    
+    def keyword_screen(self, message):
+        """Matched risk phrases in the message (empty list when clear)"""
+        return [m.group(0).lower() for m in self.KEYWORD_RE.finditer(message or '')]
+    
+    def submit(self, message):
+        """
+        Screen a message. Returns an asyncio Task resolving to the crisis assessment,
+        or None when the keyword screen finds nothing. Must be called from the event loop.
+        """
+        self.screened += 1
+        matched = self.keyword_screen(message)
+        if not matched:
+            return None
+        self.keyword_hits += 1
+        return asyncio.ensure_future(self.assess(message, matched, time.perf_counter()))
+    
+    @tracer.traced('crisis.assess')
+    async def assess(self, message, matched, started=None):
+        """Run CRISIS_ASSESSMENT_PROMPT on the message"""
+        started = started or time.perf_counter()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        try:
+            async with self._slots:
+                result = await cached_completion_async(
+                    'crisis', self.gateway,
+                    model=self.model,
+                    messages=self.build_messages(message),
+                    temperature=0,
+                    response_format={"type": "json_object"}
+                )
+            assessment = json.loads(result['content'])
+        except Exception as e:
+            print(f"Error in crisis assessment: {str(e)}")
+            FALLBACKS.inc('crisis')
+            # Fail safe: a keyword hit we could not verify is treated as high risk
+            assessment = {
+                'crisis_level': 'high',
+                'specific_concerns': matched,
+                'recommended_actions': ['Review this conversation manually'],
+                'needs_immediate_intervention': False,
+                'safety_plan_needed': True,
+                'unverified': True
+            }
+        
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.detection_ms.append(elapsed_ms)
+        assessment['matched_keywords'] = matched
+        assessment['detection_ms'] = elapsed_ms
+        assessment['escalate'] = assessment.get('crisis_level') in self.ESCALATION_LEVELS
+        if assessment['escalate']:
+            self.escalations += 1
+        return assessment
+    
+    def stats(self):
+        samples = sorted(self.detection_ms)
+        return {
+            'model': self.model,
+            'messages_screened': self.screened,
+            'keyword_hits': self.keyword_hits,
+            'escalations': self.escalations,
+            'detection_ms_p50': samples[len(samples) // 2] if samples else None,
+            'detection_ms_p95': samples[int(len(samples) * 0.95)] if samples else None
+        }
+
+
 # ============================================================================
 # Group Formation Engine (Traditional Rule-Based)
 class TraditionalGroupEngine:
@@ -309,7 +862,11 @@ class TraditionalGroupEngine:
         concern_buckets = defaultdict(list)
         
         for user in user_profiles:
-            concern = user.get('primary_concern', 'general')
+            concern = user.get('primary_concern') or 'general'
+            if not isinstance(concern, str):
+                # Completed intakes store the detected_concerns dict here
+                keys = concern_keys(user)
+                concern = keys[0] if keys else 'general'
             concern_buckets[concern].append(user)
             
         for concern, members in concern_buckets.items():
@@ -320,7 +877,6 @@ class TraditionalGroupEngine:
                     'id': f"group_trad_{concern}_{i}",
                     'name': f"{concern.capitalize()} Support Group {i+1}",
                     'members': [u['user_id'] for u in chunk],
-                    'member_details': chunk,
                     'primary_focus': concern,
                     'reasoning': "Matched by primary concern category",
                     'cohesion_score': 0.5,
@@ -339,6 +895,121 @@ briefing_generator = TherapistBriefingAI(model="gpt-4o")
 
 # Initialize Traditional Engine (Fixing the missing variable)
 group_engine = TraditionalGroupEngine()
+similarity_engine = SimilarityGroupEngine()
+
+# GET /api/groups page size when ?limit= is not given, and the largest page allowed
+GROUPS_PAGE_SIZE = int(os.getenv('MENTRA_GROUPS_PAGE_SIZE', '100'))
+MAX_GROUPS_PAGE_SIZE = 1000
+
+# Completed intakes are placed into open groups as they arrive
+group_placer = IncrementalGroupPlacer(groups_db, users=users_db)
+
+# Older intake turns are folded into a rolling summary in the background
+conversation_memory = ConversationMemory(
+    users_db,
+    lambda previous, messages: ai_analyzer.summarize_history(previous, messages)
+)
+
+# Briefings are generated in the background and served from this store
+briefing_store = BriefingStore(
+    lambda group: briefing_generator.generate_comprehensive_briefing(group),
+    max_workers=int(os.getenv('MENTRA_BRIEFING_WORKERS', '2'))
+)
+# Member fields sent to the briefing model: the analysis, the rolling summary and the
+# intake answers. Transcripts, token logs and bookkeeping stay out of the prompt.
+BRIEFING_MEMBER_FIELDS = ('user_id',) + FINGERPRINT_FIELDS + ('memory_summary', 'responses')
+
+def _scheduled_rebalance(method, interval):
+    """Periodic re-formation; when several workers share the store only the first one due runs it"""
+    with groups_db.lock():
+        if time.time() - groups_db.get_state('last_rebalance', 0) < interval / 2:
+            return None
+        groups_db.set_state('last_rebalance', time.time())
+    return _form_all_groups(method)
+
+
+# Optional periodic full re-formation, e.g. MENTRA_REBALANCE_INTERVAL=3600
+if os.getenv('MENTRA_REBALANCE_INTERVAL'):
+    rebalance_interval = float(os.getenv('MENTRA_REBALANCE_INTERVAL'))
+    PeriodicRebalancer(
+        rebalance_interval,
+        lambda: _scheduled_rebalance(os.getenv('MENTRA_REBALANCE_METHOD', 'similarity'), rebalance_interval)
+    ).start()
+
+
+def _run_formation_job(params, job):
+    """Job handler: full re-formation; a cancelled job stops before the new groups replace the old"""
+    groups, method_label, strategy = _form_all_groups(params['method'], before_commit=job.check_cancelled)
+    return {
+        'count': len(groups),
+        'method': method_label,
+        'strategy': strategy,
+        'group_ids': [g['id'] for g in groups]
+    }
+
+
+def _briefing_for(group):
+    """(briefing, meta) for a group from the briefing store; reads the members' records"""
+    return briefing_store.get(_with_member_details(group))
+
+
+def _run_briefing_job(params, job):
+    """Job handler: the therapist briefing for one group; BriefingError retries the job"""
+    group = group_placer.get_group(params['group_id'])
+    if not group:
+        raise LookupError('Group not found')
+    briefing, meta = _briefing_for(group)
+    return {'briefing': briefing, 'briefing_meta': meta}
+
+
+# Slow AI work can run as jobs (Prefer: respond-async); the queue is a local
+# SQLite file, so queued jobs survive restarts and are shared by the workers
+job_queue = create_job_queue()
+job_runner = JobRunner(
+    job_queue,
+    {'group_formation': _run_formation_job, 'briefing': _run_briefing_job},
+    max_workers=int(os.getenv('MENTRA_JOB_WORKERS', '2')),
+    retention_seconds=float(os.getenv('MENTRA_JOB_RETENTION', '86400')),
+    retryable=(BriefingError,)
+)
+# /api/jobs/<id>/events re-reads the job this often, and sends a keepalive when idle
+JOB_EVENTS_POLL_INTERVAL = 0.5
+JOB_EVENTS_KEEPALIVE = 15.0
+
+
+# Turns for one user run one at a time, in client sequence order
+turn_sequencer = TurnSequencer()
+
+# Crisis fast path runs next to every intake turn
+crisis_screener = CrisisScreener(model="gpt-4o-mini", max_workers=int(os.getenv('MENTRA_CRISIS_WORKERS', '4')))
+
+
+def _collect_component_metrics():
+    """Scrape-time view of counters the components already keep"""
+    cache = llm_cache.stats()
+    idempotency = idempotency_store.stats()
+    briefings = briefing_store.stats()
+    circuit = llm_gateway.breaker.stats()
+    return [
+        ('mentra_llm_cache_lookups_total', 'counter', "LLM response cache lookups by result",
+         [({'result': 'hit'}, cache['hits']), ({'result': 'disk_hit'}, cache['disk_hits']),
+          ({'result': 'miss'}, cache['misses'])]),
+        ('mentra_llm_cache_hit_ratio', 'gauge', "Share of LLM cache lookups answered from the cache",
+         [({}, cache['hit_ratio'])]),
+        ('mentra_idempotent_replays_total', 'counter', "Retried requests answered without a second call",
+         [({'how': 'stored'}, idempotency['replayed']), ({'how': 'attached_in_flight'}, idempotency['attached_in_flight'])]),
+        ('mentra_briefings_served_total', 'counter', "Therapist briefings served by freshness",
+         [({'freshness': 'fresh'}, briefings['served_fresh']), ({'freshness': 'stale'}, briefings['served_stale'])]),
+        ('mentra_llm_circuit_open', 'gauge', "1 while the upstream circuit breaker is open",
+         [({}, int(circuit['state'] == 'open'))]),
+        ('mentra_llm_short_circuited_total', 'counter', "Calls refused by the open circuit",
+         [({}, circuit['short_circuited'])]),
+        ('mentra_jobs', 'gauge', "Background jobs in the queue by status",
+         [({'status': status}, count) for status, count in job_queue.counts().items()])
+    ]
+
+
+registry.register_collector(_collect_component_metrics)
 # ============================================================================
 
 
@@ -352,33 +1023,76 @@ briefing_generator = TherapistBriefingAI(model="gpt-4o")
 # API ENDPOINTS
 # ============================================================================
 
-@app.route('/api/analyze-message', methods=['POST'])
-def analyze_message():
-    data = request.json
-    message = data.get('message', '')
-    user_id = data.get('user_id')
-    
-    # 1. Retrieve or Initialize User Session
-    # In a real app, you'd pull this from a database. Here we use the in-memory `users_db`
-    user = next((u for u in users_db if u.get('user_id') == user_id), None)
+@app.before_serving
+async def _start_job_runner():
+    # Also re-queues jobs a previous run of this worker left 'running'
+    job_runner.start()
+
+
+def _route_label():
+    # The route template, not the path, keeps label cardinality bounded
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+@app.before_request
+async def _start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc(_route_label())
+    # Root span of the request; spans opened below (AI classes, gateway) nest under it
+    g.trace_span = tracer.start_trace(f"{request.method} {_route_label()}",
+                                      request.headers.get('traceparent'), path=request.path)
+    g.trace_span.__enter__()
+
+
+@app.after_request
+async def _record_request_metrics(response):
+    started = getattr(g, 'metrics_started', None)
+    if started is not None:
+        HTTP_LATENCY.observe(_route_label(), request.method, str(response.status_code),
+                             value=time.perf_counter() - started)
+    span = getattr(g, 'trace_span', None)
+    if span is not None and span.trace_id:
+        span.set('status_code', response.status_code)
+        response.headers['X-Trace-Id'] = span.trace_id
+    return response
+
+
+@app.teardown_request
+async def _end_request_metrics(exc):
+    if getattr(g, 'metrics_started', None) is not None:
+        HTTP_IN_FLIGHT.dec(_route_label())
+    span = getattr(g, 'trace_span', None)
+    if span is not None:
+        span.__exit__(type(exc) if exc else None, exc, None)
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus scrape endpoint (per worker process)"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _load_intake_user(user_id):
+    """Retrieve or initialize the user session for an intake turn"""
+    user = users_db.get(user_id)
     
     if not user:
         # Create temporary user if not found
         user = {'user_id': user_id, 'chat_history': []}
-        users_db.append(user)
-    
-    # 2. Analyze with History
-    # We pass the existing history to the AI so it knows what has already been said
-    analysis_result = ai_analyzer.analyze_message(message, user['chat_history'])
-    
-    # 3. Update History
-    # Append the user's message
-    user['chat_history'].append({'role': 'user', 'content': message})
-    # Append the AI's reply (so the AI remembers what it asked next time)
-    if 'reply_to_user' in analysis_result:
-        user['chat_history'].append({'role': 'assistant', 'content': analysis_result['reply_to_user']})
+    user.setdefault('chat_history', [])
+    return user
+
+
+def _record_turn(user, message, analysis_result, crisis=None, seq=None):
+    """
+    Append the turn to the user's history, persist it and build the API response.
+    Raises StaleTurn if turn seq was recorded meanwhile (e.g. by another worker).
+    """
+    prompt_tokens = analysis_result.pop('_prompt_tokens', None)
+    user_id = user['user_id']
     
-    # 4. Check if Analysis is Complete
+    # Check if Analysis is Complete
     response_data = {
         'success': True,
         'reply': analysis_result['reply_to_user'], # Display this bubble in UI
@@ -388,18 +1102,322 @@ def analyze_message():
     # If complete, we send the final categorization data
     if analysis_result['status'] == 'complete':
         response_data['final_analysis'] = analysis_result.get('final_analysis')
-        # Optional: Save final result to user profile
-        user['primary_concern'] = analysis_result['final_analysis'].get('detected_concerns')
+    if crisis:
+        response_data['crisis'] = crisis
+    
+    def apply(record):
+        if seq is not None and record.get('turn_count', 0) + 1 != seq:
+            return False
+        record.setdefault('chat_history', [])
+        # Append the user's message
+        record['chat_history'].append({'role': 'user', 'content': message})
+        # Append the AI's reply (so the AI remembers what it asked next time)
+        if 'reply_to_user' in analysis_result:
+            record['chat_history'].append({'role': 'assistant', 'content': analysis_result['reply_to_user']})
+        if analysis_result['status'] == 'complete':
+            # Optional: Save final result to user profile
+            record['primary_concern'] = analysis_result['final_analysis'].get('detected_concerns')
+            # Never lowers an urgency set earlier, e.g. a crisis escalation on a previous turn
+            _raise_urgency(record, analysis_result['final_analysis'].get('urgency_level'))
+        if crisis:
+            _apply_crisis(record, crisis)
+        # Locally answered turns (lexicon short-circuit) cost no prompt tokens
+        conversation_memory.record_turn(record, prompt_tokens or {'estimated': 0, 'billed': 0})
+        # Kept so a client retrying this turn gets the same reply back
+        record['last_turn'] = {'seq': record['turn_count'], 'message': message, 'response': dict(response_data)}
+
+    # Persist the turn (also refreshes the concern/urgency indexes). The write is
+    # optimistic: if another worker or a background fold changed the record since
+    # it was loaded, the turn is re-applied to the fresh copy instead of clobbering it.
+    user = users_db.update(user_id, apply, create=lambda: {'user_id': user_id, 'chat_history': []})
+    if user is None:
+        # This turn number was taken while we were analyzing
+        turn_sequencer.check(users_db.get(user_id) or {'user_id': user_id}, message, seq)
+    conversation_memory.maybe_fold(user)
+    
+    # A finished intake is placed right away into an open group, or queued
+    if analysis_result['status'] == 'complete':
+        response_data['placement'] = _place_user(user)
+    return response_data
+
+
+def _place_user(user):
+    """Incrementally place a user and refresh the affected group's briefing"""
+    placement = group_placer.place(user)
+    if placement['action'] in ('placed', 'formed'):
+        briefing_store.schedule(_with_member_details(group_placer.get_group(placement['group_id'])))
+    return placement
+
+
+def _with_member_details(group, lookup=None):
+    """
+    Copy of a group with the briefing fields of its members' current user records,
+    for the briefing prompt and fingerprint. Stored and listed groups carry member ids only.
+    """
+    lookup = lookup or users_db.get
+    return dict(group, member_details=[{f: u[f] for f in BRIEFING_MEMBER_FIELDS if f in u}
+                                       for u in map(lookup, group.get('members', [])) if u])
+
+
+def _raise_urgency(user, level):
+    """Set the user's urgency_level unless a higher level is already recorded"""
+    current = user.get('urgency_level')
+    if current in URGENCY_LEVELS and (level not in URGENCY_LEVELS
+                                      or URGENCY_LEVELS.index(level) < URGENCY_LEVELS.index(current)):
+        return
+    user['urgency_level'] = level
+
+
+def _apply_crisis(user, crisis):
+    """Record a crisis assessment on the user; escalations raise urgency to crisis"""
+    user['crisis_level'] = crisis.get('crisis_level')
+    if crisis.get('escalate'):
+        _raise_urgency(user, 'crisis')
+
+
+def _sse(event, payload):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {app.json.dumps(payload)}\n\n"
+
+
+def _turn_seq(data):
+    """Client turn number (1-based), or None for clients that do not send one"""
+    seq = data.get('seq')
+    if seq is None:
+        return None
+    if isinstance(seq, bool) or not isinstance(seq, int) or seq < 1:
+        raise ValueError("seq must be a positive integer")
+    return seq
+
+
+def _client_ip():
+    if TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr
+
+
+async def _rate_limit(*keys):
+    """
+    Take a token from each (scope, key) bucket before doing LLM work.
+    None when allowed, else the 429 (payload, status) naming the empty bucket.
+    The SQLite limiter may wait on other workers for its write lock, so it runs in a thread.
+    """
+    refused = await asyncio.to_thread(rate_limiter.acquire, keys)
+    if refused is None:
+        return None
+    scope, wait = refused
+    return {
+        'success': False,
+        'error': 'rate_limited',
+        'scope': scope,
+        'retry_after': max(1, math.ceil(wait))
+    }, 429
+
+
+def _json_response(payload, status):
+    response = jsonify(payload)
+    if status == 429:
+        response.headers['Retry-After'] = str(payload['retry_after'])
+    return response, status
+
+
+def _wants_async(data=None):
+    """Prefer: respond-async (RFC 7240), ?async=true or "async": true in the body"""
+    if 'respond-async' in request.headers.get('Prefer', '').lower():
+        return True
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return bool(data and data.get('async') is True)
+
+
+async def _submit_job(kind, params):
+    """
+    Queue a job (or join the identical one already queued or running) and
+    answer 202 with where to poll and subscribe.
+    """
+    job, created = await asyncio.to_thread(
+        job_queue.submit, kind, params, dedupe_key=f"{kind}:{request_fingerprint(params)}")
+    if created:
+        job_runner.wake()
+    status_url = f"/api/jobs/{job['job_id']}"
+    response = jsonify({
+        'success': True,
+        'job': public_job(job),
+        'status_url': status_url,
+        'events_url': f"{status_url}/events"
+    })
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+def _llm_priority(user):
+    """Intake replies for users already flagged in crisis jump the OpenAI call queue"""
+    return 'crisis' if urgency_of(user) == 'crisis' else None
+
+
+async def _intake_turn(user_id, message, seq, client_ip=None):
+    """One intake turn, in order with the user's other turns; returns (payload, status)"""
+    # Checked here rather than per HTTP request so coalesced and replayed retries are free
+    limited = await _rate_limit(('user', user_id), ('ip', client_ip), ('analyzer', '*'))
+    if limited:
+        return limited
+    async with turn_sequencer.serialize(user_id):
+        # 1. Retrieve or Initialize User Session
+        with tracer.span('intake.load_user'):
+            user = await asyncio.to_thread(_load_intake_user, user_id)
+        try:
+            turn_sequencer.check(user, message, seq)
+            
+            # 2. Start crisis screening in parallel with the intake analysis
+            crisis_task = crisis_screener.submit(message)
+            
+            # 3. Analyze with History
+            # We pass the existing history to the AI so it knows what has already been said
+            with prioritized(_llm_priority(user)):
+                analysis_result = await ai_analyzer.analyze_message(message, unsummarized(user), user.get('memory_summary'))
+            
+            # 4. Update History and build the response
+            crisis = await crisis_task if crisis_task else None
+            # Store writes and placement may wait on the shared store's lock
+            with tracer.span('intake.record_turn'):
+                return await asyncio.to_thread(_record_turn, user, message, analysis_result, crisis, seq), 200
+        except StaleTurn as e:
+            return e.response()
+
+
+@app.route('/api/analyze-message', methods=['POST'])
+async def analyze_message():
+    data = await request.get_json()
+    message = data.get('message', '')
+    user_id = data.get('user_id')
+    try:
+        seq = _turn_seq(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    client_ip = _client_ip()
+    
+    async def run():
+        # A double-submitted turn shares the analysis already in flight
+        (payload, status), coalesced = await turn_sequencer.coalesce(
+            (user_id, seq, message), lambda: _intake_turn(user_id, message, seq, client_ip))
+        if coalesced and status == 200:
+            payload = dict(payload, duplicate=True)
+        return payload, status
+    
+    # A retry carrying the same Idempotency-Key gets the original response back
+    payload, status, duplicate = await idempotency_store.run(
+        'analyze-message', request.headers.get('Idempotency-Key'),
+        request_fingerprint(user_id, message, seq), run)
+    if duplicate and status == 200:
+        payload = dict(payload, duplicate=True)
+    with tracer.span('response.jsonify'):
+        return _json_response(payload, status)
+
+
+@app.route('/api/analyze-message/stream', methods=['POST'])
+async def analyze_message_stream():
+    """
+    Streaming intake turn over Server-Sent Events.
+    Emits 'token' events with reply_to_user text as the model writes it,
+    a 'crisis' event as soon as a screened message has been assessed,
+    then one 'final' event shaped like the /api/analyze-message response.
+    A turn that loses a sequence race after the stream opened ends with an 'error' event.
+    """
+    data = await request.get_json()
+    message = data.get('message', '')
+    user_id = data.get('user_id')
+    try:
+        seq = _turn_seq(data)
+        # Cheap early answer while a status code can still be sent
+        turn_sequencer.check(await asyncio.to_thread(_load_intake_user, user_id), message, seq)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except StaleTurn as e:
+        payload, status = e.response()
+        return jsonify(payload), status
+    limited = await _rate_limit(('user', user_id), ('ip', _client_ip()), ('analyzer', '*'))
+    if limited:
+        return _json_response(*limited)
+    
+    # The body streams after the request's root span has closed; keep nesting under it
+    request_span = tracer.current()
+    
+    async def generate():
+        with tracer.span('intake.stream', parent=request_span):
+            async for frame in _stream_turn():
+                yield frame
+    
+    async def _stream_turn():
+        async with turn_sequencer.serialize(user_id):
+            user = await asyncio.to_thread(_load_intake_user, user_id)
+            try:
+                turn_sequencer.check(user, message, seq)
+            except StaleTurn as e:
+                payload, status = e.response()
+                yield _sse('final' if status == 200 else 'error', payload)
+                return
+            history = unsummarized(user)
+            summary = user.get('memory_summary')
+            started = time.perf_counter()
+            
+            # Intake tokens and the crisis verdict arrive on one queue, whichever is first
+            events = asyncio.Queue()
+            crisis_task = crisis_screener.submit(message)
+            if crisis_task:
+                crisis_task.add_done_callback(lambda t: events.put_nowait(('crisis', t.result())))
+            
+            async def pump():
+                async for item in ai_analyzer.stream_message(message, history, summary):
+                    await events.put(item)
+            # The task copies the context, priority included, when it is created
+            with prioritized(_llm_priority(user)):
+                pump_task = asyncio.ensure_future(pump())
+            
+            first_token_at = None
+            analysis = crisis = None
+            while analysis is None or (crisis_task and crisis is None):
+                kind, payload = await events.get()
+                if kind == 'token':
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    yield _sse('token', {'text': payload})
+                elif kind == 'crisis':
+                    crisis = payload
+                    yield _sse('crisis', crisis)
+                else:
+                    analysis = payload
+            
+            try:
+                response_data = await asyncio.to_thread(_record_turn, user, message, analysis, crisis, seq)
+            except StaleTurn as e:
+                yield _sse('error', e.response()[0])
+                await pump_task
+                return
+            response_data['timing'] = {
+                'ttft_ms': round((first_token_at - started) * 1000, 1) if first_token_at else None,
+                'total_ms': round((time.perf_counter() - started) * 1000, 1),
+                'crisis_ms': crisis['detection_ms'] if crisis else None
+            }
+            yield _sse('final', response_data)
+            await pump_task
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-    return jsonify(response_data)
 
 @app.route('/api/analyze-conversation', methods=['POST'])
-def analyze_conversation():
+async def analyze_conversation():
     """Analyze an entire conversation thread"""
-    data = request.json
+    data = await request.get_json()
     messages = data.get('messages', [])
+    if not isinstance(messages, list) or not messages:
+        return jsonify({'success': False, 'error': 'messages must be a non-empty list'}), 400
+    limited = await _rate_limit(('ip', _client_ip()), ('analyzer', '*'))
+    if limited:
+        return _json_response(*limited)
     
-    analysis = ai_analyzer.analyze_conversation_thread(messages)
+    analysis = await ai_analyzer.analyze_conversation_thread(messages)
     
     return jsonify({
         'success': True,
@@ -407,26 +1425,42 @@ def analyze_conversation():
     })
 
 
-@app.route('/api/users', methods=['POST'])
-def create_user():
-    """Create or update user profile"""
-    data = request.json
-    
-    user = {
+def _user_record(data):
+    """The stored user for a profile posted to /api/users or /api/users/import"""
+    return {
         'user_id': data.get('user_id'),
         'primary_concern': data.get('primary_concern'),
         'conversation_analysis': data.get('conversation_analysis', []),
         'responses': data.get('responses', {}),
         'created_at': datetime.utcnow().isoformat()
     }
+
+
+def _profile_error(data):
+    """Why an imported profile cannot be stored, or None"""
+    user_id = data.get('user_id')
+    if not isinstance(user_id, str) or not user_id.strip():
+        return "user_id must be a non-empty string"
+    if len(user_id) > 200:
+        return "user_id is longer than 200 characters"
+    if data.get('primary_concern') is not None and not isinstance(data['primary_concern'], str):
+        return "primary_concern must be a string"
+    if not isinstance(data.get('conversation_analysis', []), list):
+        return "conversation_analysis must be a list"
+    if not isinstance(data.get('responses', {}), dict):
+        return "responses must be an object"
+    return None
+
+
+@app.route('/api/users', methods=['POST'])
+async def create_user():
+    """Create or update user profile"""
+    data = await request.get_json()
     
-    # Check if user exists
-    existing_idx = next((i for i, u in enumerate(users_db) if u['user_id'] == user['user_id']), None)
+    user = _user_record(data)
     
-    if existing_idx is not None:
-        users_db[existing_idx] = user
-    else:
-        users_db.append(user)
+    # Insert or replace by user_id
+    await asyncio.to_thread(users_db.upsert, user)
     
     return jsonify({
         'success': True,
@@ -434,27 +1468,84 @@ def create_user():
     })
 
 
-@app.route('/api/groups/form', methods=['POST'])
-def form_groups():
-    """Form therapy groups - choose AI or traditional method"""
-    data = request.json
-    use_ai = data.get('use_ai', False)
+@app.route(IMPORT_PATH, methods=['POST'])
+async def import_users():
+    """
+    Create or update many users from one streamed body: NDJSON (one profile per
+    line) or a JSON array of profiles. Records are parsed as chunks arrive and
+    written IMPORT_BATCH_SIZE at a time; invalid records are skipped and
+    reported by their 1-based position in the body.
+    """
+    reader = JSONRecordStream(max_record_bytes=IMPORT_MAX_RECORD_BYTES)
+    started = time.perf_counter()
+    batch, errors = [], []
+    imported = failed = 0
+    
+    async def write(batch):
+        # The store write is blocking (SQLite); the next chunks keep arriving meanwhile
+        await asyncio.to_thread(users_db.upsert_many, batch)
+        return len(batch)
     
-    if use_ai and users_db:
+    def take(records):
+        nonlocal failed
+        for number, data, error in records:
+            error = error or _profile_error(data)
+            if error:
+                failed += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({'record': number, 'user_id': data.get('user_id') if data else None, 'error': error})
+            else:
+                batch.append(_user_record(data))
+    
+    async for chunk in request.body:
+        take(reader.feed(chunk))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            imported += await write(batch)
+            batch = []
+        if reader.finished:
+            break
+    take(reader.close())
+    if batch:
+        imported += await write(batch)
+    
+    elapsed = time.perf_counter() - started
+    USERS_IMPORTED.inc('imported', value=imported)
+    USERS_IMPORTED.inc('failed', value=failed)
+    return jsonify({
+        'success': failed == 0,
+        'format': reader.mode,
+        'imported': imported,
+        'failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors),
+        'seconds': round(elapsed, 3),
+        'records_per_second': round(imported / elapsed, 1) if elapsed > 0 else None
+    })
+
+
+def _form_all_groups(method, before_commit=None):
+    """
+    Re-form every group from scratch with the given method.
+    Returns (groups, method_label, strategy); strategy is only set for AI formation.
+    before_commit runs once the groups are computed and may raise to discard them.
+    """
+    users = users_db.all()
+    unassigned = []
+    if method == 'ai' and users:
         # Use AI-powered group formation
-        ai_recommendations = group_matcher.optimize_group_formation(users_db)
+        ai_recommendations = group_matcher.optimize_group_formation(users)
         
         # Convert AI recommendations to group objects
         groups = []
-        for rec_group in ai_recommendations.get('recommended_groups', []):
-            member_ids = rec_group['member_ids']
-            members = [u for u in users_db if u['user_id'] in member_ids]
+        formed_at = datetime.utcnow().timestamp()
+        for i, rec_group in enumerate(ai_recommendations.get('recommended_groups', [])):
+            # Groups reference members by user_id; drop ids the model made up
+            member_ids = [mid for mid in rec_group['member_ids'] if mid in users_db]
             
             group = {
-                'id': f"group_ai_{datetime.utcnow().timestamp()}",
+                'id': f"group_ai_{formed_at}_{i}",
                 'name': rec_group['group_name'],
                 'members': member_ids,
-                'member_details': members,
                 'primary_focus': rec_group['primary_focus'],
                 'reasoning': rec_group['reasoning'],
                 'cohesion_score': rec_group.get('estimated_cohesion', 0.7),
@@ -463,64 +1554,252 @@ def form_groups():
                 'formation_method': 'ai_optimized'
             }
             groups.append(group)
-        
-        groups_db.clear()
-        groups_db.extend(groups)
-        
-        return jsonify({
-            'success': True,
-            'groups': groups,
-            'count': len(groups),
-            'method': 'ai_optimized',
-            'strategy': ai_recommendations.get('overall_strategy')
-        })
+        # Sharded formation returns stragglers too few for a group; they are waitlisted
+        unassigned = ai_recommendations.get('unassigned_ids', [])
+        result = (groups, 'ai_optimized', ai_recommendations.get('overall_strategy'))
+    elif method == 'similarity':
+        # Vectorized similarity clustering, no OpenAI calls; users no valid group
+        # fits are waitlisted for incremental placement instead
+        groups, unassigned = similarity_engine.partition(users)
+        result = (groups, 'similarity', None)
     else:
         # Use traditional rule-based formation
-        groups = group_engine.form_groups(users_db)
-        groups_db.clear()
-        groups_db.extend(groups)
-        
+        result = (group_engine.form_groups(users), 'traditional', None)
+    
+    if before_commit:
+        before_commit()
+    users_by_id = {u['user_id']: u for u in users}
+    group_placer.replace_groups(result[0], waitlist=[users_by_id[uid] for uid in unassigned if uid in users_by_id],
+                                lookup=users_by_id.get)
+    briefing_store.schedule_all([_with_member_details(g, users_by_id.get) for g in result[0]])
+    return result
+
+
+def _place_unplaced_users():
+    """Place every intake-complete user not yet in a group; returns (outcome counts, groups)"""
+    outcomes = Counter()
+    for user in users_db.all():
+        if user.get('primary_concern') and not group_placer.group_for(user['user_id']):
+            outcomes[_place_user(user)['action']] += 1
+    return outcomes, groups_db.all()
+
+
+@app.route('/api/groups/form', methods=['POST'])
+async def form_groups():
+    """
+    Form therapy groups - choose AI, similarity or traditional method.
+    With mode=incremental, existing groups are kept and only unplaced users are placed.
+    """
+    data = await request.get_json()
+    use_ai = data.get('use_ai', False)
+    method = data.get('method') or ('ai' if use_ai else 'traditional')
+    
+    if data.get('mode') == 'incremental':
+        # A pass over every user under the store lock; keep it off the event loop
+        outcomes, groups = await asyncio.to_thread(_place_unplaced_users)
         return jsonify({
             'success': True,
             'groups': groups,
             'count': len(groups),
-            'method': 'traditional'
+            'method': 'incremental',
+            'placements': dict(outcomes)
         })
+    
+    if method == 'ai':
+        limited = await _rate_limit(('ip', _client_ip()), ('matcher', '*'))
+        if limited:
+            return _json_response(*limited)
+    
+    if _wants_async(data):
+        return await _submit_job('group_formation', {'method': method})
+    
+    # Formation is batch work (CPU or sharded LLM calls); keep it off the event loop
+    groups, method_label, strategy = await asyncio.to_thread(_form_all_groups, method)
+    response_data = {
+        'success': True,
+        'groups': groups,
+        'count': len(groups),
+        'method': method_label
+    }
+    if method_label == 'ai_optimized':
+        response_data['strategy'] = strategy
+    return jsonify(response_data)
 
 
-@app.route('/api/groups', methods=['GET'])
-def get_groups():
-    """Get all formed groups"""
+@app.route('/api/groups/rebalance', methods=['POST'])
+async def rebalance_groups():
+    """Re-form all groups from scratch (defaults to the similarity engine)"""
+    data = await request.get_json(silent=True) or {}
+    method = data.get('method', 'similarity')
+    if method == 'ai':
+        limited = await _rate_limit(('ip', _client_ip()), ('matcher', '*'))
+        if limited:
+            return _json_response(*limited)
+    groups, method_label, _ = await asyncio.to_thread(_form_all_groups, method)
+    
     return jsonify({
         'success': True,
-        'groups': groups_db
+        'count': len(groups),
+        'method': method_label
     })
 
 
-@app.route('/api/therapist/briefing/<group_id>', methods=['GET'])
-def get_ai_briefing(group_id):
-    """Generate AI-powered therapist briefing"""
-    group = next((g for g in groups_db if g['id'] == group_id), None)
-    if not group:
-        return jsonify({'success': False, 'error': 'Group not found'}), 404
+@app.route('/api/groups', methods=['GET'])
+async def get_groups():
+    """
+    List formed groups a page at a time; members are user_ids.
+    ?fields=name,members keeps only those fields (plus id); ?limit= sets the page
+    size and ?cursor= takes the previous page's next_cursor. Every response has
+    an ETag, and If-None-Match gets a 304 until any group changes.
+    """
+    try:
+        limit = int(request.args.get('limit', GROUPS_PAGE_SIZE))
+        after = int(request.args.get('cursor') or -1)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit and cursor must be integers'}), 400
+    if not 1 <= limit <= MAX_GROUPS_PAGE_SIZE:
+        return jsonify({'success': False, 'error': f"limit must be between 1 and {MAX_GROUPS_PAGE_SIZE}"}), 400
+    fields = [f for f in dict.fromkeys(['id'] + request.args.get('fields', '').split(',')) if f] \
+        if request.args.get('fields') else None
     
-    briefing = briefing_generator.generate_comprehensive_briefing(group)
+    # Checked before any group is read, so an unchanged listing costs one store lookup
+    etag = f"{await asyncio.to_thread(groups_db.etag)}-{request_fingerprint(fields, after, limit)}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
     
-    return jsonify({
+    def read_page():
+        groups, last = groups_db.page(after, limit)
+        if fields:
+            groups = [{f: g[f] for f in fields if f in g} for g in groups]
+        return groups, last, len(groups_db)
+    
+    groups, last, total = await asyncio.to_thread(read_page)
+    response = jsonify({
         'success': True,
-        'briefing': briefing
+        'groups': groups,
+        'count': len(groups),
+        'total': total,
+        'next_cursor': str(last) if last is not None else None
     })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/therapist/briefing/<group_id>', methods=['GET'])
+async def get_ai_briefing(group_id):
+    """
+    Serve the AI-powered therapist briefing for a group.
+    Briefings are precomputed when groups form; a stale copy is served while
+    a regeneration runs in the background. With Prefer: respond-async the
+    briefing is produced by a job instead (202 with the job to poll).
+    """
+    client_ip = _client_ip()
+    
+    if _wants_async():
+        if not await asyncio.to_thread(group_placer.get_group, group_id):
+            return jsonify({'success': False, 'error': 'Group not found'}), 404
+        limited = await _rate_limit(('ip', client_ip), ('briefing', '*'))
+        if limited:
+            return _json_response(*limited)
+        return await _submit_job('briefing', {'group_id': group_id})
+    
+    async def run():
+        group = await asyncio.to_thread(group_placer.get_group, group_id)
+        if not group:
+            return {'success': False, 'error': 'Group not found'}, 404
+        limited = await _rate_limit(('ip', client_ip), ('briefing', '*'))
+        if limited:
+            return limited
+        
+        # The first request for a group may wait on background generation
+        try:
+            briefing, meta = await asyncio.to_thread(_briefing_for, group)
+        except BriefingError as e:
+            # 5xx, so neither the idempotency store nor the client keeps the failure
+            return {'success': False, 'error': f"Briefing generation failed: {str(e)}"}, 503
+        
+        return {
+            'success': True,
+            'briefing': briefing,
+            'briefing_meta': meta
+        }, 200
+    
+    payload, status, _ = await idempotency_store.run(
+        'therapist-briefing', request.headers.get('Idempotency-Key'), request_fingerprint(group_id), run)
+    return _json_response(payload, status)
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+async def get_job(job_id):
+    """Status of a job, with its result once it has succeeded"""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': public_job(job)})
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+async def cancel_job(job_id):
+    """
+    Cancel a job. A queued job never runs; a running one finishes its current
+    OpenAI call and is then dropped without applying its result.
+    """
+    job = await asyncio.to_thread(job_queue.cancel, job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] in ('succeeded', 'failed'):
+        return jsonify({'success': False, 'error': f"Job already {job['status']}", 'job': public_job(job)}), 409
+    return jsonify({'success': True, 'job': public_job(job)})
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+async def job_events(job_id):
+    """
+    Server-Sent Events for one job: a 'status' event whenever the status
+    changes and a final 'done' event carrying the finished job.
+    """
+    if not await asyncio.to_thread(job_queue.get, job_id):
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    async def generate():
+        last_status, idle = None, 0.0
+        while True:
+            job = await asyncio.to_thread(job_queue.get, job_id)
+            if job is None:
+                yield _sse('error', {'error': 'Job not found'})
+                return
+            if job['status'] in TERMINAL:
+                yield _sse('done', public_job(job))
+                return
+            if job['status'] != last_status:
+                last_status, idle = job['status'], 0.0
+                yield _sse('status', {'job_id': job_id, 'status': job['status']})
+            elif idle >= JOB_EVENTS_KEEPALIVE:
+                # Comment frame so proxies do not close an idle stream
+                idle = 0.0
+                yield ": keepalive\n\n"
+            await asyncio.sleep(JOB_EVENTS_POLL_INTERVAL)
+            idle += JOB_EVENTS_POLL_INTERVAL
+    
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Formation jobs can outlast Quart's default response timeout
+    response.timeout = None
+    return response
 
 
 @app.route('/api/config/model', methods=['POST'])
-def update_model_config():
+async def update_model_config():
     """
     Update which OpenAI model to use
     Allows for easy prompt engineering and model testing
     """
-    data = request.json
+    data = await request.get_json()
     model = data.get('model', 'gpt-4o-mini')
-    component = data.get('component', 'analyzer')  # analyzer, matcher, or briefing
+    component = data.get('component', 'analyzer')  # analyzer, matcher, briefing or crisis
     
     global ai_analyzer, group_matcher, briefing_generator
     
@@ -530,6 +1809,12 @@ def update_model_config():
         group_matcher = GroupMatchingAI(model=model)
     elif component == 'briefing':
         briefing_generator = TherapistBriefingAI(model=model)
+        briefing_store.invalidate()
+    elif component == 'crisis':
+        crisis_screener.model = model
+    
+    # Responses produced by the previous model are no longer valid
+    llm_cache.invalidate(component)
     
     return jsonify({
         'success': True,
@@ -539,16 +1824,17 @@ def update_model_config():
 
 
 @app.route('/api/config/prompt', methods=['POST'])
-def update_system_prompt():
+async def update_system_prompt():
     """
     Update the system prompt for conversation analysis
     THIS IS KEY FOR PROMPT ENGINEERING - allows dynamic prompt updates
     """
-    data = request.json
+    data = await request.get_json()
     new_prompt = data.get('prompt')
     
     if new_prompt:
         ai_analyzer.system_prompt = new_prompt
+        llm_cache.invalidate('analyzer')
         
         return jsonify({
             'success': True,
@@ -563,7 +1849,7 @@ def update_system_prompt():
 
 
 @app.route('/api/config/prompt', methods=['GET'])
-def get_current_prompt():
+async def get_current_prompt():
     """Get the current system prompt for inspection"""
     return jsonify({
         'success': True,
@@ -571,26 +1857,49 @@ def get_current_prompt():
     })
 
 
+def _collect_stats():
+    """Statistics from every component; store sizes and job counts are database reads"""
+    return {
+        'total_users': len(users_db),
+        'total_groups': len(groups_db),
+        'ai_enabled': True,
+        'state': {
+            'user_store': users_db.backend,
+            'group_store': groups_db.backend,
+            'version_conflicts': users_db.conflicts,
+            'worker_pid': os.getpid()
+        },
+        'current_models': {
+            'analyzer': ai_analyzer.model,
+            'matcher': group_matcher.model,
+            'briefing': briefing_generator.model,
+            'crisis': crisis_screener.model
+        },
+        'llm_cache': llm_cache.stats(),
+        'idempotency': idempotency_store.stats(),
+        'rate_limits': rate_limiter.stats(),
+        'llm_gateway': llm_gateway.stats(),
+        'lexicon': lexicon.stats(),
+        'crisis_screening': crisis_screener.stats(),
+        'turn_ordering': turn_sequencer.stats(),
+        'group_placement': group_placer.stats(),
+        'briefings': briefing_store.stats(),
+        'jobs': job_runner.stats(),
+        'conversation_memory': conversation_memory.stats()
+    }
+
+
 @app.route('/api/stats', methods=['GET'])
-def get_stats():
+async def get_stats():
     """Get system statistics"""
     return jsonify({
         'success': True,
-        'stats': {
-            'total_users': len(users_db),
-            'total_groups': len(groups_db),
-            'ai_enabled': True,
-            'current_models': {
-                'analyzer': ai_analyzer.model,
-                'matcher': group_matcher.model,
-                'briefing': briefing_generator.model
-            }
-        }
+        'stats': await asyncio.to_thread(_collect_stats)
     })
 
 
 @app.route('/api/health', methods=['GET'])
-def health_check():
+async def health_check():
     """Health check endpoint"""
     openai_status = 'configured' if os.getenv('OPENAI_API_KEY') else 'not_configured'
     
@@ -616,10 +1925,14 @@ if __name__ == '__main__':
     print("  POST     /api/config/model - Change OpenAI models")
     print("\n Core Endpoints:")
     print("  POST /api/analyze-message - AI message analysis")
+    print("  POST /api/analyze-message/stream - Streaming analysis (SSE)")
     print("  POST /api/analyze-conversation - AI thread analysis")
     print("  POST /api/users - Create/update users")
-    print("  POST /api/groups/form - Form groups (AI or traditional)")
-    print("  GET  /api/therapist/briefing/<id> - AI-generated briefing")
+    print("  POST /api/users/import - Bulk import users (NDJSON or JSON array, streamed)")
+    print("  POST /api/groups/form - Form groups (AI, similarity or traditional)")
+    print("  POST /api/groups/rebalance - Re-form all groups from scratch")
+    print("  GET  /api/therapist/briefing/<id> - AI-generated briefing (precomputed)")
+    print("  GET  /api/jobs/<id> - Async job status (events: /api/jobs/<id>/events)")
     print("=" * 70)
     
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Batch Re-analysis for Mentra AI System
+Re-scores stored conversation threads with the thread analysis prompt (e.g.
+after a prompt change) and streams one JSON result per thread to a JSONL file.
+
+Modes:
+  direct  threads fan out over a bounded pool through the LLM gateway, so calls
+          get its deadlines, retries, response cache and the 'batch' priority class
+  batch   threads go out as OpenAI Batch API jobs of --batch-size requests
+          (cheaper, answered within the completion window)
+
+The output file is the checkpoint: each result names the input line it answers,
+so a rerun after a crash skips threads already written. <output>.checkpoint pins
+the prompt and model, so one file never mixes prompts, and holds the Batch API
+job in flight, so a restart collects it instead of submitting it again.
+
+Run:    python3 batch_reanalysis.py threads.jsonl results.jsonl --concurrency 8
+        python3 batch_reanalysis.py threads.jsonl results.jsonl --mode batch --prompt v2_detailed
+Input:  {"thread_id": "...", "messages": [{"role": "user", "content": "..."}, ...]} per line
+        (exported users work too: user_id and chat_history are accepted)
+Output: {"line", "thread_id", "prompt", "model", "analysis", "analyzed_at"} per thread, or
+        {"line", "thread_id", "error"} for an input line that cannot be analysed
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from conversation_memory import estimate_tokens
+
+BATCH_TERMINAL = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class ResultLog:
+    """Append-only JSONL results; the input lines already answered are the run's progress"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            self._recover()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _recover(self):
+        # Keep every complete record; a crash can only have cut the last one short
+        kept = 0
+        with open(self.path, 'rb') as f:
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break
+                try:
+                    self.done.add(json.loads(raw)['line'])
+                except (ValueError, KeyError, TypeError):
+                    break
+                kept += len(raw)
+        with open(self.path, 'r+b') as f:
+            f.truncate(kept)
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.done.add(record['line'])
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    """Written to a temporary file and renamed, so a crash leaves the old or the new copy"""
+    state['updated_at'] = datetime.utcnow().isoformat()
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_threads(path, log):
+    """
+    (line, thread_id, messages) for each input line not yet in the log.
+    Lines that cannot be analysed are written to the log as errors here.
+    """
+    with open(path, encoding='utf-8') as f:
+        for number, raw in enumerate(f, 1):
+            if number in log.done or not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError as e:
+                log.write({'line': number, 'thread_id': None, 'error': f"invalid JSON: {str(e)}"})
+                continue
+            if not isinstance(record, dict):
+                log.write({'line': number, 'thread_id': None, 'error': "line must be a JSON object"})
+                continue
+            thread_id = record.get('thread_id') or record.get('id') or record.get('user_id')
+            messages = record.get('messages') or record.get('chat_history')
+            if not isinstance(messages, list) or not messages:
+                log.write({'line': number, 'thread_id': thread_id, 'error': "no messages to analyse"})
+                continue
+            yield number, thread_id, messages
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ReanalysisRun:
+    """One pass over an input file; construct, then call run_direct() or run_batch()"""
+
+    def __init__(self, analyzer, input_path, output_path, prompt_name, system_prompt,
+                 checkpoint_every=100, restart=False):
+        self.analyzer = analyzer
+        self.input_path = input_path
+        self.prompt_name = prompt_name
+        self.system_prompt = system_prompt
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_path = f"{output_path}.checkpoint"
+        if restart:
+            for path in (output_path, self.checkpoint_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        prompt_sha = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+        state = load_checkpoint(self.checkpoint_path)
+        if state and state['input'] != os.path.abspath(input_path):
+            raise SystemExit(f"{output_path} holds results for {state['input']}; use another output file or --restart")
+        if state and (state['prompt_sha'] != prompt_sha or state['model'] != analyzer.model):
+            raise SystemExit(f"{output_path} was written with prompt {state['prompt']} ({state['prompt_sha']}) "
+                             f"on {state['model']}; use another output file or --restart")
+        self.state = state or {
+            'input': os.path.abspath(input_path),
+            'prompt': prompt_name,
+            'prompt_sha': prompt_sha,
+            'model': analyzer.model,
+            'pending_batch': None
+        }
+        self.log = ResultLog(output_path)
+        self.resumed = len(self.log.done)
+        self.analyzed = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._since_checkpoint = 0
+
+    def _result(self, line, thread_id, analysis):
+        return {
+            'line': line,
+            'thread_id': thread_id,
+            'prompt': self.prompt_name,
+            'model': self.analyzer.model,
+            'analysis': analysis,
+            'analyzed_at': datetime.utcnow().isoformat()
+        }
+
+    def _written(self, record):
+        self.log.write(record)
+        self.analyzed += 1
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self.log.sync()
+        self.state['written'] = len(self.log.done)
+        save_checkpoint(self.checkpoint_path, self.state)
+        self._since_checkpoint = 0
+        elapsed = time.perf_counter() - self.started
+        print(f"  {len(self.log.done)} written ({self.analyzed} this run, {self.failed} failed, "
+              f"{self.analyzed / elapsed:.1f} threads/s)")
+
+    def run_direct(self, concurrency):
+        """Score threads concurrently through the gateway, at most concurrency at a time"""
+        def score(messages):
+            return self.analyzer.score_thread(messages, component='reanalysis', system_prompt=self.system_prompt)
+
+        in_flight = {}
+
+        def drain(limit):
+            while len(in_flight) > limit:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    line, thread_id = in_flight.pop(future)
+                    try:
+                        self._written(self._result(line, thread_id, future.result()))
+                    except Exception as e:
+                        # Not written, so the next run retries it
+                        print(f"Error analysing line {line} ({thread_id}): {str(e)}")
+                        self.failed += 1
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reanalysis') as pool:
+            for line, thread_id, messages in read_threads(self.input_path, self.log):
+                in_flight[pool.submit(score, messages)] = (line, thread_id)
+                # Read ahead only a little, so thousands of threads are never all in memory
+                drain(concurrency * 2)
+            drain(0)
+        return self.finish()
+
+    def run_batch(self, client, batch_size, poll_interval):
+        """Send threads as Batch API jobs, collecting any job a previous run left in flight"""
+        if self.state.get('pending_batch'):
+            print(f"Resuming batch {self.state['pending_batch']['id']}")
+            self._collect_batch(client, poll_interval)
+        for chunk in chunked(read_threads(self.input_path, self.log), batch_size):
+            self._submit_batch(client, chunk)
+            self._collect_batch(client, poll_interval)
+        return self.finish()
+
+    def _submit_batch(self, client, threads):
+        lines, expected = [], {}
+        for line, thread_id, messages in threads:
+            prompt = self.analyzer.build_thread_messages(messages, self.system_prompt)
+            lines.append(json.dumps({
+                'custom_id': f"line-{line}",
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {
+                    'model': self.analyzer.model,
+                    'messages': prompt,
+                    'temperature': 0.3,
+                    'response_format': {'type': 'json_object'}
+                }
+            }, ensure_ascii=False))
+            expected[str(line)] = [thread_id, sum(estimate_tokens(m['content']) for m in prompt)]
+        upload = client.files.create(file=('reanalysis.jsonl', ('\n'.join(lines) + '\n').encode('utf-8')),
+                                     purpose='batch')
+        batch = client.batches.create(input_file_id=upload.id, endpoint='/v1/chat/completions',
+                                      completion_window='24h', metadata={'source': 'mentra-reanalysis'})
+        self.state['pending_batch'] = {'id': batch.id, 'threads': expected}
+        save_checkpoint(self.checkpoint_path, self.state)
+        print(f"Submitted batch {batch.id} with {len(expected)} threads")
+
+    def _collect_batch(self, client, poll_interval):
+        pending = self.state['pending_batch']
+        while True:
+            batch = client.batches.retrieve(pending['id'])
+            if batch.status in BATCH_TERMINAL:
+                break
+            counts = batch.request_counts
+            print(f"  batch {batch.id} {batch.status}: {counts.completed if counts else 0}/"
+                  f"{counts.total if counts else '?'}")
+            time.sleep(poll_interval)
+
+        answered = set()
+        if batch.output_file_id:
+            for raw in client.files.content(batch.output_file_id).text.splitlines():
+                if not raw.strip():
+                    continue
+                record = json.loads(raw)
+                key = record['custom_id'].split('-', 1)[1]
+                if key not in pending['threads'] or int(key) in self.log.done:
+                    continue
+                answered.add(key)
+                thread_id, estimated = pending['threads'][key]
+                response = record.get('response') or {}
+                try:
+                    if response.get('status_code') != 200:
+                        raise ValueError(f"status {response.get('status_code')}: {record.get('error')}")
+                    body = response['body']
+                    analysis = self.analyzer.parse_thread_analysis(
+                        {'content': body['choices'][0]['message']['content'], 'usage': body.get('usage') or {}},
+                        estimated)
+                    self._written(self._result(int(key), thread_id, analysis))
+                except Exception as e:
+                    print(f"Error analysing line {key} ({thread_id}): {str(e)}")
+                    self.failed += 1
+        # Requests in the error file, or never answered (failed/expired job), are retried next run
+        unanswered = [k for k in pending['threads'] if k not in answered and int(k) not in self.log.done]
+        if unanswered:
+            print(f"Batch {batch.id} {batch.status}: {len(unanswered)} threads unanswered")
+            self.failed += len(unanswered)
+        self.state['pending_batch'] = None
+        self.checkpoint()
+
+    def finish(self):
+        self.checkpoint()
+        self.log.close()
+        elapsed = time.perf_counter() - self.started
+        return {
+            'written': self.analyzed,
+            'failed': self.failed,
+            'resumed_from': self.resumed,
+            'total_in_output': len(self.log.done),
+            'seconds': round(elapsed, 2),
+            'threads_per_second': round(self.analyzed / elapsed, 1) if elapsed > 0 else None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored conversation threads into a JSONL file")
+    parser.add_argument('input', help="JSONL file, one thread per line")
+    parser.add_argument('output', help="JSONL results file (appended to and resumed from)")
+    parser.add_argument('--mode', choices=['direct', 'batch'], default='direct')
+    parser.add_argument('--concurrency', type=int, default=8, help="direct mode: threads scored at once")
+    parser.add_argument('--batch-size', type=int, default=50000, help="batch mode: requests per Batch API job")
+    parser.add_argument('--poll-interval', type=float, default=30.0, help="batch mode: seconds between status checks")
+    parser.add_argument('--prompt', default='current',
+                        help="analysis prompt from prompt_templates (v1_standard, v2_detailed, v3_brief) "
+                             "or 'current' for the analyzer's thread prompt")
+    parser.add_argument('--checkpoint-every', type=int, default=100, help="results between checkpoints")
+    parser.add_argument('--restart', action='store_true', help="discard existing output and checkpoint")
+    args = parser.parse_args()
+
+    # The analyzer, gateway and its client come configured from the environment
+    from backend_api import ai_analyzer, llm_gateway
+    from prompt_templates import PROMPTS_LIBRARY
+
+    if args.prompt == 'current':
+        system_prompt = ai_analyzer.thread_prompt
+    elif args.prompt in PROMPTS_LIBRARY['analysis']:
+        system_prompt = PROMPTS_LIBRARY['analysis'][args.prompt]
+    else:
+        parser.error(f"unknown prompt {args.prompt}; choose from current, {', '.join(PROMPTS_LIBRARY['analysis'])}")
+
+    run = ReanalysisRun(ai_analyzer, args.input, args.output, args.prompt, system_prompt,
+                        checkpoint_every=args.checkpoint_every, restart=args.restart)
+    if run.resumed:
+        print(f"Resuming: {run.resumed} threads already in {args.output}")
+    if args.mode == 'batch':
+        summary = run.run_batch(llm_gateway.client, args.batch_size, args.poll_interval)
+    else:
+        summary = run.run_direct(args.concurrency)
+    print(json.dumps(summary))
+    sys.exit(1 if summary['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
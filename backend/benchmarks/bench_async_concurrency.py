@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent intake sessions one backend process can hold
+Opens N simultaneous /api/analyze-message turns (each a distinct session and
+message, so neither the lexicon nor the response cache answers them) at
+increasing N and reports wall time, throughput and latency percentiles.
+
+Run the backend as a single process against the local OpenAI stand-in:
+    python3 mock_openai_server.py --port 8001 --latency-dist fixed --latency-ms 500
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=mock hypercorn backend_api:app --bind 0.0.0.0:5000
+
+Usage: python3 benchmarks/bench_async_concurrency.py [--levels 50,200,800] [--slo-ms 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from urllib.parse import urlsplit
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)] if ordered else None
+
+
+async def post_json(url, payload, timeout):
+    """
+    Minimal HTTP/1.1 POST on a fresh connection. The load generator shares the
+    machine with the server, so it avoids a full client library's per-request CPU.
+    """
+    parts = urlsplit(url)
+    body = json.dumps(payload).encode('utf-8')
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+    try:
+        writer.write((f"POST {parts.path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                      f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                      f"Connection: close\r\n\r\n").encode('ascii') + body)
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    if b"chunked" in head.lower():
+        chunks, rest = [], content
+        while rest:
+            size, _, rest = rest.partition(b"\r\n")
+            size = int(size, 16)
+            if not size:
+                break
+            chunks.append(rest[:size])
+            rest = rest[size + 2:]
+        content = b"".join(chunks)
+    return status, json.loads(content) if content else {}
+
+
+async def one_turn(api_url, run_id, i, timeout):
+    started = time.perf_counter()
+    try:
+        status, data = await post_json(f"{api_url}/analyze-message", {
+            'user_id': f"bench_{run_id}_{i}",
+            'message': f"I have been feeling anxious about work for {i % 50 + 2} weeks ({run_id}-{i})"
+        }, timeout)
+        ok = status == 200 and not data.get('degraded')
+    except Exception:
+        ok = False
+    return (time.perf_counter() - started) * 1000, ok
+
+
+async def run_level(api_url, n, timeout):
+    run_id = uuid.uuid4().hex[:6]
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one_turn(api_url, run_id, i, timeout) for i in range(n)))
+    wall = time.perf_counter() - started
+    latencies = [ms for ms, ok in results if ok]
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        'sessions': n,
+        'wall_s': wall,
+        'turns_per_s': len(latencies) / wall,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--api-url', default='http://localhost:5000/api')
+    parser.add_argument('--levels', default='50,200,800,2000')
+    parser.add_argument('--slo-ms', type=float, default=2000,
+                        help="p95 a level must stay under to count as sustained")
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"{'sessions':>9}{'wall s':>9}{'turns/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    sustained = 0
+    for n in [int(x) for x in args.levels.split(',')]:
+        r = asyncio.run(run_level(args.api_url, n, args.timeout))
+        p50 = f"{r['p50_ms']:.0f}" if r['p50_ms'] is not None else '-'
+        p95 = f"{r['p95_ms']:.0f}" if r['p95_ms'] is not None else '-'
+        print(f"{n:>9}{r['wall_s']:>9.2f}{r['turns_per_s']:>10.1f}{p50:>10}{p95:>10}{r['errors']:>8}")
+        if r['p95_ms'] is not None and r['p95_ms'] <= args.slo_ms and r['errors'] <= n * 0.01:
+            sustained = n
+    print(f"largest level within p95 {args.slo_ms:.0f}ms and <1% errors: {sustained} concurrent sessions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: onboarding throughput, one POST /api/users per profile vs POST /api/users/import
+Streams --profiles profiles through the bulk endpoint in 64 KB chunks (NDJSON and
+a JSON array) against the in-memory and SQLite user stores, and times a sample of
+single-profile requests for comparison. Also compares the parser's peak memory
+with loading the whole body at once.
+
+Usage: python3 benchmarks/bench_bulk_import.py [--profiles 100000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+import backend_api
+from backend_api import app
+from json_stream import JSONRecordStream
+from user_store import InMemoryUserStore, SQLiteUserStore
+
+CONCERNS = ['anxiety', 'depression', 'grief', 'stress', 'loneliness', 'trauma']
+CHUNK = 64 * 1024
+
+
+def make_profiles(n):
+    return [{
+        'user_id': f"clinic_{i}",
+        'primary_concern': CONCERNS[i % len(CONCERNS)],
+        'conversation_analysis': [{'urgency_level': 'normal', 'detected_concerns': {
+            CONCERNS[i % len(CONCERNS)]: {'confidence': 0.8, 'severity': 'moderate', 'key_themes': ['work', 'sleep']}}}],
+        'responses': {'referral': 'clinic backlog', 'preferred_time': 'evening'}
+    } for i in range(n)]
+
+
+def chunks(body):
+    view = memoryview(body)
+    for i in range(0, len(body), CHUNK):
+        yield view[i:i + CHUNK]
+
+
+async def stream_import(client, body):
+    """POST the body to /api/users/import in CHUNK-sized pieces, as a streaming client would"""
+    async with client.request('/api/users/import', method='POST',
+                              headers={'Content-Type': 'application/x-ndjson'}) as connection:
+        for piece in chunks(body):
+            await connection.send(piece)
+        await connection.send_complete()
+    response = await connection.as_response()
+    return json.loads(await response.get_data())
+
+
+async def single_requests(client, profiles):
+    for profile in profiles:
+        response = await client.post('/api/users', json=profile)
+        assert response.status_code == 200
+
+
+def parser_peak(body, streamed):
+    tracemalloc.start()
+    if streamed:
+        reader = JSONRecordStream()
+        count = 0
+        for piece in chunks(body):
+            count += len(reader.feed(piece))
+        count += len(reader.close())
+    else:
+        count = len(json.loads(body))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, peak
+
+
+async def main_async(args):
+    profiles = make_profiles(args.profiles)
+    ndjson = b''.join(json.dumps(p).encode() + b'\n' for p in profiles)
+    array = json.dumps(profiles).encode()
+    client = app.test_client()
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for store_name, make_store in (('memory', InMemoryUserStore),
+                                       ('sqlite', lambda: SQLiteUserStore(os.path.join(tmp, 'users.db')))):
+            backend_api.users_db = make_store()
+            sample = profiles[:args.single_sample]
+            started = time.perf_counter()
+            await single_requests(client, sample)
+            rate = len(sample) / (time.perf_counter() - started)
+            rows.append((store_name, f"POST /api/users x{len(sample)}", len(sample), rate, args.profiles / rate))
+
+            for label, body in (('import, NDJSON', ndjson), ('import, JSON array', array)):
+                backend_api.users_db = make_store()
+                backend_api.users_db.clear()
+                started = time.perf_counter()
+                result = await stream_import(client, body)
+                elapsed = time.perf_counter() - started
+                assert result['imported'] == args.profiles and result['failed'] == 0, result
+                assert len(backend_api.users_db) == args.profiles
+                rows.append((store_name, label, args.profiles, args.profiles / elapsed, elapsed))
+
+    print(f"{args.profiles} profiles, NDJSON body {len(ndjson) / 1e6:.1f} MB, "
+          f"batch size {backend_api.IMPORT_BATCH_SIZE}, {CHUNK // 1024} KB chunks")
+    print(f"{'store':<8}{'method':<28}{'records':>9}{'records/s':>12}{'s for all':>11}")
+    for store_name, label, records, rate, seconds in rows:
+        print(f"{store_name:<8}{label:<28}{records:>9,}{rate:>12,.0f}{seconds:>11.1f}")
+    print("(single-request time for all profiles is extrapolated from the sample)")
+
+    print(f"\n{'parser peak memory':<34}{'records':>9}{'peak MB':>10}")
+    for label, streamed in (('JSONRecordStream, 64 KB chunks', True), ('json.loads(whole array body)', False)):
+        count, peak = parser_peak(ndjson if streamed else array, streamed)
+        print(f"{label:<34}{count:>9,}{peak / 1e6:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=100000)
+    parser.add_argument('--single-sample', type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sharded vs single-shot AI group formation
+Uses a simulated chat.completions upstream whose latency grows with prompt and
+completion tokens and which rejects prompts over the context window.
+
+Usage: python3 benchmarks/bench_group_formation.py [--users 5000] [--time-scale 0.01]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+from backend_api import GroupMatchingAI, estimate_tokens, llm_cache
+from llm_gateway import LLMGateway
+
+CONCERNS = ['anxiety', 'depression', 'grief', 'trauma', 'stress', 'adhd', 'eating_disorder']
+URGENCIES = ['normal', 'normal', 'normal', 'elevated', 'high']
+THEMES = ['work stress', 'sleep', 'relationships', 'loss', 'isolation', 'self-esteem', 'family']
+
+
+class SimulatedCompletions:
+    """Latency model: base + per prompt token + per completion token (gpt-4o-mini-like)"""
+
+    def __init__(self, time_scale, context_window=128000, base_s=0.4, prompt_tok_s=0.00002, completion_tok_s=0.012):
+        self.time_scale = time_scale
+        self.context_window = context_window
+        self.base_s = base_s
+        self.prompt_tok_s = prompt_tok_s
+        self.completion_tok_s = completion_tok_s
+
+    def create(self, model, messages, **kwargs):
+        prompt = messages[-1]['content']
+        prompt_tokens = sum(estimate_tokens(m['content']) for m in messages)
+        if prompt_tokens > self.context_window:
+            raise RuntimeError(f"context_length_exceeded: {prompt_tokens} > {self.context_window} tokens")
+        ids = re.findall(r'"user_id": "([^"]+)"', prompt)
+        groups = [{
+            'group_name': f"Group {i // 6}",
+            'member_ids': ids[i:i + 6],
+            'primary_focus': 'shared concern',
+            'reasoning': 'simulated',
+            'estimated_cohesion': 0.8,
+            'special_considerations': ''
+        } for i in range(0, len(ids), 6)]
+        content = json.dumps({'recommended_groups': groups, 'overall_strategy': 'simulated'})
+        completion_tokens = estimate_tokens(content)
+        latency = self.base_s + prompt_tokens * self.prompt_tok_s + completion_tokens * self.completion_tok_s
+        time.sleep(latency * self.time_scale)
+        usage = types.SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                      total_tokens=prompt_tokens + completion_tokens)
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+
+def make_users(n):
+    return [{
+        'user_id': f"bench_{i}",
+        'conversation_analysis': [{
+            'detected_concerns': {CONCERNS[i % len(CONCERNS)]: {'confidence': 0.8, 'severity': 'moderate'}},
+            'urgency_level': URGENCIES[i % len(URGENCIES)],
+            'key_themes': [THEMES[i % len(THEMES)], THEMES[(i * 3) % len(THEMES)]]
+        }]
+    } for i in range(n)]
+
+
+def run(matcher, users, single_shot, time_scale, context_window):
+    completions = SimulatedCompletions(time_scale, context_window)
+    matcher.gateway = LLMGateway(types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions)))
+    llm_cache.invalidate()
+    start = time.perf_counter()
+    if single_shot:
+        summaries = [{'user_id': u['user_id'], 'primary_concerns': matcher._extract_concerns(u),
+                      'urgency': matcher._extract_urgency(u), 'key_themes': matcher._extract_themes(u)}
+                     for u in users]
+        result = matcher._form_shard(summaries)
+    else:
+        result = matcher.optimize_group_formation(users)
+    wall = (time.perf_counter() - start) / time_scale
+    placed = sum(len(g['member_ids']) for g in result.get('recommended_groups', []))
+    return wall, placed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--time-scale', type=float, default=0.01,
+                        help="fraction of simulated latency actually slept (results are scaled back)")
+    parser.add_argument('--parallel', type=int, default=4)
+    parser.add_argument('--context-window', type=int, default=128000,
+                        help="raise it to see what single-shot would cost without the context limit")
+    args = parser.parse_args()
+
+    users = make_users(args.users)
+    matcher = GroupMatchingAI(max_parallel=args.parallel)
+    print(f"{args.users} users, parallelism {args.parallel}, simulated seconds")
+
+    wall, placed, result = run(matcher, users, True, args.time_scale, args.context_window)
+    status = f"error: {result['error']}" if 'error' in result else f"{placed} placed"
+    print(f"  single-shot: {wall:8.1f}s  {status}")
+
+    wall, placed, result = run(matcher, users, False, args.time_scale, args.context_window)
+    sizes = [len(g['member_ids']) for g in result.get('recommended_groups', [])]
+    print(f"  sharded:     {wall:8.1f}s  {placed} placed in {len(sizes)} groups "
+          f"across {result.get('shard_count', 1)} shards (sizes {min(sizes, default=0)}-{max(sizes, default=0)})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GET /api/groups payload size and serialization time at 10k groups
+Compares the old listing (every group embedding full member records, chat
+history included, all groups in one response) with member ids, pages, field
+projection and If-None-Match revalidation.
+
+Usage: python3 benchmarks/bench_group_listing.py [--groups 10000] [--turns 12]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+import backend_api
+from backend_api import app, jsonify
+
+CONCERNS = ['anxiety', 'depression', 'grief', 'stress', 'loneliness', 'trauma']
+
+
+def make_users(n, turns, rng):
+    users = []
+    for i in range(n):
+        concern = rng.choice(CONCERNS)
+        users.append({
+            'user_id': f"user_{i}",
+            'primary_concern': concern,
+            'chat_history': [{'role': 'user' if t % 2 == 0 else 'assistant',
+                              'content': f"Turn {t}: " + 'I have been feeling overwhelmed lately. ' * 4}
+                             for t in range(turns)],
+            'conversation_analysis': [{'urgency_level': 'normal', 'detected_concerns': {
+                concern: {'confidence': 0.8, 'severity': 'moderate', 'key_themes': ['work', 'sleep']}}}],
+            'created_at': '2025-01-01T00:00:00'
+        })
+    return users
+
+
+def make_groups(users, size=6):
+    groups = []
+    for i in range(0, len(users), size):
+        members = users[i:i + size]
+        groups.append({
+            'id': f"group_bench_{i // size}",
+            'name': f"Support Group {i // size}",
+            'members': [u['user_id'] for u in members],
+            'primary_focus': members[0]['primary_concern'],
+            'reasoning': "Matched by primary concern category",
+            'cohesion_score': 0.5,
+            'created_at': '2025-01-01T00:00:00',
+            'status': 'forming',
+            'formation_method': 'traditional'
+        })
+    return groups
+
+
+async def timed_get(client, path, headers=None, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers or {})
+        body = await response.get_data()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return response, body, best
+
+
+async def main_async(args):
+    rng = random.Random(7)
+    users = make_users(args.groups * 6, args.turns, rng)
+    groups = make_groups(users)
+    by_id = {u['user_id']: u for u in users}
+    backend_api.groups_db.replace_all(groups)
+    client = app.test_client()
+    rows = []
+
+    # Before: one response with every group and a copy of each member's full record
+    legacy = [dict(g, member_details=[by_id[uid] for uid in g['members']]) for g in groups]
+    async with app.app_context():
+        best = None
+        for _ in range(3):
+            started = time.perf_counter()
+            body = await jsonify({'success': True, 'groups': legacy}).get_data()
+            best = min(best or 1e9, time.perf_counter() - started)
+    rows.append(('embedded members, all groups (before)', len(body), best, 1))
+
+    # Member ids, every group, walking the cursor at the largest page size
+    total_bytes, total_time, requests, cursor = 0, 0.0, 0, ''
+    while cursor is not None:
+        response, body, elapsed = await timed_get(client, f"/api/groups?limit=1000&cursor={cursor}", repeat=1)
+        cursor = (await response.get_json())['next_cursor']
+        total_bytes += len(body)
+        total_time += elapsed
+        requests += 1
+    rows.append(('member ids, all groups in pages of 1000', total_bytes, total_time, requests))
+
+    response, body, elapsed = await timed_get(client, "/api/groups")
+    rows.append(('member ids, first page (default 100)', len(body), elapsed, 1))
+    etag = response.headers['ETag']
+
+    _, body, elapsed = await timed_get(client, "/api/groups?limit=1000&fields=name,members")
+    rows.append(('?fields=name,members, page of 1000', len(body), elapsed, 1))
+
+    response, body, elapsed = await timed_get(client, "/api/groups", headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    rows.append(('If-None-Match, unchanged (304)', len(body), elapsed, 1))
+
+    print(f"{args.groups} groups x 6 members, {args.turns} chat turns per member")
+    print(f"{'listing':<42}{'requests':>9}{'bytes':>14}{'ms':>10}")
+    for label, size, elapsed, requests in rows:
+        print(f"{label:<42}{requests:>9}{size:>14,}{elapsed * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--groups', type=int, default=10000)
+    parser.add_argument('--turns', type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
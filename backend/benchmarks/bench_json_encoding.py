@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON encode time for API responses and prompt size for embedded JSON
+Encodes realistic payloads (a GET /api/groups page, a group with its member
+records, an intake reply) with Quart's default provider and with
+FastJSONProvider, and compares the briefing and matcher prompt JSON with
+indent=2 against compact separators.
+
+Prompt tokens are counted with tiktoken when it is installed, otherwise with
+the ~4 characters per token estimate used elsewhere in the backend.
+
+Usage: python3 benchmarks/bench_json_encoding.py [--groups 1000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+from quart.json.provider import DefaultJSONProvider
+
+import backend_api
+from backend_api import app
+from benchmarks.bench_group_listing import make_users, make_groups
+from conversation_memory import estimate_tokens
+from json_provider import FastJSONProvider, compact_json, orjson
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('o200k_base')
+    count_tokens = lambda text: len(_encoding.encode(text))
+    TOKENIZER = 'tiktoken o200k_base'
+except ImportError:
+    count_tokens = estimate_tokens
+    TOKENIZER = '~4 chars/token estimate (tiktoken not installed)'
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+async def encode_times(payloads, repeat):
+    rows = []
+    default, fast = DefaultJSONProvider(app), FastJSONProvider(app)
+    async with app.app_context():
+        for label, payload in payloads:
+            default_s = best_of(lambda: default.response(payload), repeat)
+            fast_s = best_of(lambda: fast.response(payload), repeat)
+            default_body = await default.response(payload).get_data()
+            fast_body = await fast.response(payload).get_data()
+            assert json.loads(default_body) == json.loads(fast_body)
+            rows.append((label, len(default_body), len(fast_body), default_s, fast_s))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--groups', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    users = make_users(args.groups * 6, 12, random.Random(7))
+    groups = make_groups(users)
+    by_id = {u['user_id']: u for u in users}
+    briefing_group = backend_api._with_member_details(groups[0], by_id.get)
+    summaries = [{
+        'user_id': u['user_id'],
+        'primary_concerns': backend_api.group_matcher._extract_concerns(u),
+        'urgency': backend_api.group_matcher._extract_urgency(u),
+        'key_themes': backend_api.group_matcher._extract_themes(u)
+    } for u in users[:400]]
+
+    payloads = [
+        (f"GET /api/groups page ({args.groups} groups)", {'success': True, 'groups': groups, 'count': len(groups)}),
+        ("group with member records (briefing)", {'success': True, 'group': briefing_group}),
+        ("single intake reply", {'success': True, 'reply': 'How long have you felt this way? é', 'status': 'interviewing'}),
+    ]
+    rows = asyncio.run(encode_times(payloads, args.repeat))
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'response payload':<40}{'default B':>12}{'fast B':>12}{'default ms':>12}{'fast ms':>10}{'speedup':>9}")
+    for label, default_size, fast_size, default_s, fast_s in rows:
+        print(f"{label:<40}{default_size:>12,}{fast_size:>12,}{default_s * 1000:>12.3f}"
+              f"{fast_s * 1000:>10.3f}{default_s / fast_s:>8.1f}x")
+
+    print(f"\nprompt JSON ({TOKENIZER})")
+    print(f"{'embedded in prompt':<40}{'indent=2 tok':>14}{'compact tok':>13}{'saved':>8}{'indent ms':>11}{'compact ms':>12}")
+    for label, payload in (("briefing group data (6 members)", briefing_group),
+                           ("matcher shard (400 profiles)", summaries)):
+        indented = json.dumps(payload, indent=2)
+        compact = compact_json(payload)
+        indent_s = best_of(lambda: json.dumps(payload, indent=2), args.repeat)
+        compact_s = best_of(lambda: compact_json(payload), args.repeat)
+        before, after = count_tokens(indented), count_tokens(compact)
+        print(f"{label:<40}{before:>14,}{after:>13,}{(before - after) / before * 100:>7.1f}%"
+              f"{indent_s * 1000:>11.3f}{compact_s * 1000:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
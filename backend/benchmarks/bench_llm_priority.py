@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: intake latency while a briefing burst saturates the OpenAI call cap
+A simulated upstream answers every call in --latency-ms. A burst of briefing
+calls (sync client, worker threads, as the briefing store runs them) fills the
+gateway's concurrency cap while intake turns and crisis checks arrive on the
+async client. The same load is run with every call in one FIFO class and with
+the priority scheduler.
+
+Usage: python3 benchmarks/bench_llm_priority.py [--briefings 400] [--intake 100]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from llm_gateway import LLMGateway
+from llm_scheduler import LLMScheduler
+
+
+def make_clients(latency):
+    def response():
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content='{}'))],
+            usage=types.SimpleNamespace(prompt_tokens=900, completion_tokens=300, total_tokens=1200,
+                                        prompt_tokens_details=None))
+
+    def create(**kwargs):
+        time.sleep(latency)
+        return response()
+
+    async def create_async(**kwargs):
+        await asyncio.sleep(latency)
+        return response()
+
+    def client(fn):
+        return types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=fn)))
+    return client(create), client(create_async)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+async def run(args, fifo):
+    sync_client, async_client = make_clients(args.latency_ms / 1000.0)
+    scheduler = LLMScheduler(max_concurrency=args.concurrency)
+    if fifo:
+        scheduler.priority_for = lambda component: 'batch'
+    gateway = LLMGateway(sync_client, async_client, scheduler=scheduler,
+                         deadlines={'analyzer': 600, 'crisis': 600, 'briefing': 600})
+    messages = [{'role': 'user', 'content': 'x' * 400}]
+
+    pool = ThreadPoolExecutor(max_workers=args.briefings)
+    burst = [asyncio.get_running_loop().run_in_executor(
+        pool, lambda: gateway.complete('briefing', model='gpt-4o', messages=messages))
+        for _ in range(args.briefings)]
+    await asyncio.sleep(0.05)   # let the burst fill the queue first
+
+    async def timed(component):
+        started = time.perf_counter()
+        await gateway.complete_async(component, model='gpt-4o-mini', messages=messages)
+        return time.perf_counter() - started
+
+    # Turns arrive at a steady rate, spread over the time the burst takes to drain
+    interval = args.briefings * args.latency_ms / 1000.0 / args.concurrency / args.intake / 2
+    intake, crisis = [], []
+    for i in range(args.intake):
+        intake.append(asyncio.ensure_future(timed('analyzer')))
+        if i % 10 == 0:
+            crisis.append(asyncio.ensure_future(timed('crisis')))
+        await asyncio.sleep(interval)
+    intake, crisis = await asyncio.gather(*intake), await asyncio.gather(*crisis)
+    started = time.perf_counter()
+    await asyncio.gather(*burst)
+    pool.shutdown()
+    return intake, crisis, time.perf_counter() - started, scheduler.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--briefings', type=int, default=400)
+    parser.add_argument('--intake', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.briefings} briefings + {args.intake} intake turns, cap {args.concurrency}, "
+          f"upstream {args.latency_ms:g} ms")
+    print(f"{'mode':<10}{'intake p50':>12}{'intake p95':>12}{'crisis max':>12}{'burst left':>12}")
+    for label, fifo in (('fifo', True), ('priority', False)):
+        intake, crisis, tail, stats = asyncio.run(run(args, fifo))
+        print(f"{label:<10}{percentile(intake, 0.5):>10.0f}ms{percentile(intake, 0.95):>10.0f}ms"
+              f"{max(crisis) * 1000:>10.0f}ms{tail:>11.2f}s")
+    print("per class (priority run):")
+    for priority, c in stats['classes'].items():
+        print(f"  {priority:<12} granted {c['granted']:>4}  mean wait {c['mean_wait_ms']:>8.1f}ms  "
+              f"max wait {c['max_wait_ms']:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
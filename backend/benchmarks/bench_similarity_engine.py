@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SimilarityGroupEngine vs TraditionalGroupEngine on synthetic user pools
+Reports wall time, group size range, severity-rule violations and mean cohesion.
+
+Usage: python3 benchmarks/bench_similarity_engine.py [--users 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+from backend_api import TraditionalGroupEngine
+from similarity_engine import SimilarityGroupEngine, SEVERITY_LEVELS
+
+CONCERNS = ['anxiety', 'depression', 'grief', 'trauma', 'stress', 'adhd', 'eating_disorder', 'ocd']
+SEVERITIES = ['mild', 'moderate', 'severe']
+URGENCIES = ['normal', 'normal', 'normal', 'elevated', 'high']
+THEMES = ['work stress', 'sleep', 'relationships', 'loss', 'isolation', 'self-esteem', 'family',
+          'school', 'health', 'finances', 'loneliness', 'anger']
+
+
+def make_users(n, seed=7):
+    rng = random.Random(seed)
+    users = []
+    for i in range(n):
+        concerns = rng.sample(CONCERNS, rng.choice([1, 1, 2, 3]))
+        users.append({
+            'user_id': f"bench_{i}",
+            'primary_concern': concerns[0],
+            'conversation_analysis': [{
+                'detected_concerns': {c: {'confidence': round(rng.uniform(0.4, 1.0), 2),
+                                          'severity': rng.choice(SEVERITIES)} for c in concerns},
+                'urgency_level': rng.choice(URGENCIES),
+                'key_themes': rng.sample(THEMES, 2)
+            }]
+        })
+    return users
+
+
+def severity_gap(group, users_by_id):
+    # A member's severity is the worst severity across their concerns
+    levels = [max(SEVERITY_LEVELS[d['severity']] for a in users_by_id[uid]['conversation_analysis']
+                  for d in a['detected_concerns'].values())
+              for uid in group['members']]
+    return max(levels) - min(levels)
+
+
+def report(name, groups, elapsed, n_users):
+    sizes = [len(g['members']) for g in groups]
+    placed = sum(sizes)
+    out_of_range = sum(1 for s in sizes if not 4 <= s <= 8)
+    cohesion = sum(g['cohesion_score'] for g in groups) / len(groups) if groups else 0
+    print(f"  {name:<12} {elapsed:7.2f}s  {len(groups):6d} groups  placed {placed}/{n_users}  "
+          f"sizes {min(sizes)}-{max(sizes)} ({out_of_range} outside 4-8)  mean cohesion {cohesion:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    args = parser.parse_args()
+
+    users = make_users(args.users)
+    print(f"{args.users} users")
+
+    start = time.perf_counter()
+    groups = TraditionalGroupEngine().form_groups(users)
+    report('traditional', groups, time.perf_counter() - start, args.users)
+
+    start = time.perf_counter()
+    groups = SimilarityGroupEngine().form_groups(users)
+    report('similarity', groups, time.perf_counter() - start, args.users)
+    users_by_id = {u['user_id']: u for u in users}
+    violations = sum(1 for g in groups if severity_gap(g, users_by_id) > 1)
+    print(f"  similarity groups mixing mild and severe members: {violations}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-turn user lookup/update cost as the user base grows
+Compares the old list scan against the indexed user stores
+
+Usage: python3 benchmarks/bench_user_store.py [--sizes 1000,10000,100000,1000000] [--backend memory|sqlite|all]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from user_store import InMemoryUserStore, SQLiteUserStore
+
+CONCERNS = ['anxiety', 'depression', 'grief', 'trauma', 'stress', 'adhd']
+URGENCIES = ['normal', 'normal', 'normal', 'elevated', 'high']
+
+
+def make_user(i):
+    return {
+        'user_id': f"user_{i}",
+        'primary_concern': CONCERNS[i % len(CONCERNS)],
+        'urgency_level': URGENCIES[i % len(URGENCIES)],
+        'chat_history': [],
+    }
+
+
+def simulate_turn(lookup, save, user_id):
+    """One analyze-message turn minus the OpenAI call: find, append, persist"""
+    user = lookup(user_id) or {'user_id': user_id, 'chat_history': []}
+    user['chat_history'].append({'role': 'user', 'content': 'hello'})
+    save(user)
+
+
+def time_turns(lookup, save, n_users, turns):
+    ids = [f"user_{random.randrange(n_users)}" for _ in range(turns)]
+    start = time.perf_counter()
+    for user_id in ids:
+        simulate_turn(lookup, save, user_id)
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def bench_list(n_users, turns):
+    users = [make_user(i) for i in range(n_users)]
+    lookup = lambda uid: next((u for u in users if u.get('user_id') == uid), None)
+    return time_turns(lookup, lambda u: None, n_users, turns)
+
+
+def bench_store(store, n_users, turns):
+    batch = 50000
+    for start in range(0, n_users, batch):
+        store.upsert_many([make_user(i) for i in range(start, min(start + batch, n_users))])
+    return time_turns(store.get, store.upsert, n_users, turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    parser.add_argument('--turns', type=int, default=2000)
+    parser.add_argument('--backend', default='all', choices=['memory', 'sqlite', 'all'])
+    parser.add_argument('--skip-list', action='store_true', help="skip the O(N) list-scan baseline")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    print(f"{'users':>10} {'list scan':>14} {'memory store':>14} {'sqlite store':>14}   (us per turn)")
+    for n_users in sizes:
+        row = {}
+        if not args.skip_list:
+            # The scan is linear, so keep the number of turns bounded on large pools
+            row['list'] = bench_list(n_users, max(20, min(args.turns, 2_000_000 // n_users)))
+        if args.backend in ('memory', 'all'):
+            row['memory'] = bench_store(InMemoryUserStore(), n_users, args.turns)
+        if args.backend in ('sqlite', 'all'):
+            with tempfile.TemporaryDirectory() as tmp:
+                row['sqlite'] = bench_store(SQLiteUserStore(os.path.join(tmp, 'bench.db')), n_users, args.turns)
+        cells = [f"{row[k]:14.1f}" if k in row else f"{'-':>14}" for k in ('list', 'memory', 'sqlite')]
+        print(f"{n_users:>10} {' '.join(cells)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Briefing Store for Mentra AI System
+Precomputes therapist briefings in the background and serves stored copies,
+regenerating only when a group's membership or member analyses change
+"""
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Member fields that change what a briefing should say (chat_history deliberately excluded)
+FINGERPRINT_FIELDS = ('primary_concern', 'conversation_analysis', 'urgency_level', 'crisis_level')
+
+
+def group_fingerprint(group):
+    """Stable hash of a group's membership and its members' analyses"""
+    details = {u.get('user_id'): u for u in group.get('member_details') or []}
+    payload = {
+        'members': sorted(group.get('members') or []),
+        'primary_focus': group.get('primary_focus'),
+        'analyses': [{f: details[uid].get(f) for f in FINGERPRINT_FIELDS}
+                     for uid in sorted(details)]
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+class BriefingError(Exception):
+    """Raised by BriefingStore.get() when a group has no briefing and generating one failed"""
+
+
+class BriefingStore:
+    """
+    Fingerprint-keyed briefing cache with background generation.
+
+    Briefings are stored by member-set fingerprint, not group id, so a re-formation
+    that keeps a group's members (under a new id) reuses its briefing. schedule()
+    queues generation unless a fresh copy for the fingerprint exists or is already
+    being generated. get() serves the stored copy: fresh, stale (the group's previous
+    briefing while a regeneration runs) or, the first time, waits on generation.
+    Failed generations are never stored, so the next request tries again.
+    """
+
+    def __init__(self, generate, max_workers=2):
+        self.generate = generate
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='briefing')
+        self._lock = threading.Lock()
+        self._entries = {}     # fingerprint -> {'briefing', 'stored_at', 'current'}
+        self._latest = {}      # group_id -> fingerprint of the briefing last stored for it
+        self._inflight = {}    # fingerprint -> Future
+        self.generated = 0
+        self.failed = 0
+        self.reused = 0
+        self.served_fresh = 0
+        self.served_stale = 0
+
+    def schedule(self, group):
+        """Start background generation if needed; returns the Future or None"""
+        fingerprint = group_fingerprint(group)
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry and entry['current']:
+                if self._latest.get(group['id']) != fingerprint:
+                    self._remember(group['id'], fingerprint)
+                    self.reused += 1
+                return None
+            future = self._inflight.get(fingerprint)
+            if future is None:
+                future = self.executor.submit(self._run, group, fingerprint)
+                self._inflight[fingerprint] = future
+            return future
+
+    def schedule_all(self, groups):
+        """Queue every group whose members have no fresh briefing and forget briefings of groups that are gone"""
+        live = {g['id']: group_fingerprint(g) for g in groups}
+        with self._lock:
+            self._latest = {group_id: fp for group_id, fp in self._latest.items() if group_id in live}
+            keep = set(live.values()) | set(self._latest.values())
+            for fingerprint in [fp for fp in self._entries if fp not in keep]:
+                del self._entries[fingerprint]
+        for group in groups:
+            self.schedule(group)
+
+    def _remember(self, group_id, fingerprint):
+        """Point a group at its newest briefing, dropping the old one once no group uses it"""
+        previous = self._latest.get(group_id)
+        self._latest[group_id] = fingerprint
+        if previous and previous != fingerprint and previous not in self._latest.values():
+            self._entries.pop(previous, None)
+
+    def _run(self, group, fingerprint):
+        briefing = self.generate(group)
+        with self._lock:
+            self._inflight.pop(fingerprint, None)
+            if 'error' in briefing:
+                self.failed += 1
+                return briefing
+            self._entries[fingerprint] = {
+                'briefing': briefing,
+                'stored_at': time.time(),
+                'current': True
+            }
+            self._remember(group['id'], fingerprint)
+            self.generated += 1
+        return briefing
+
+    def get(self, group):
+        """Return (briefing, meta) for a group; raises BriefingError if none could be generated"""
+        fingerprint = group_fingerprint(group)
+        with self._lock:
+            stored_for = fingerprint
+            entry = self._entries.get(fingerprint)
+            if not (entry and entry['current']) and self._latest.get(group['id']) in self._entries:
+                # The group's previous briefing, served while its members' one is generated
+                stored_for = self._latest[group['id']]
+                entry = self._entries[stored_for]
+
+        if entry is None:
+            future = self.schedule(group)
+            briefing = future.result() if future else self._entries[fingerprint]['briefing']
+            if 'error' in briefing:
+                raise BriefingError(briefing['error'])
+            return dict(briefing, group_id=group['id']), {'fingerprint': fingerprint, 'stale': False, 'regenerating': False}
+
+        stale = not (stored_for == fingerprint and entry['current'])
+        # Regenerates a stale briefing; for a fresh one, records the reuse by this group
+        self.schedule(group)
+        if stale:
+            self.served_stale += 1
+        else:
+            self.served_fresh += 1
+        return dict(entry['briefing'], group_id=group['id']), {
+            'fingerprint': stored_for if entry['current'] else None,
+            'current_fingerprint': fingerprint,
+            'generated_at': entry['briefing'].get('generated_at'),
+            'age_seconds': round(time.time() - entry['stored_at'], 1),
+            'stale': stale,
+            'regenerating': fingerprint in self._inflight
+        }
+
+    def invalidate(self):
+        """Mark every stored briefing stale (e.g. after the briefing model changes)"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry['current'] = False
+
+    def stats(self):
+        return {
+            'stored': len(self._entries),
+            'in_flight': len(self._inflight),
+            'generated': self.generated,
+            'failed': self.failed,
+            'reused': self.reused,
+            'served_fresh': self.served_fresh,
+            'served_stale': self.served_stale
+        }
@@ -0,0 +1,113 @@
+"""
+Conversation Memory for Mentra AI System
+Keeps recent intake turns verbatim in the prompt, folds older turns into a
+rolling summary off the request path and keeps every prompt within a token budget
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def estimate_tokens(text):
+    """Rough local token estimate (~4 characters per token for English/JSON)"""
+    return len(text) // 4 + 1
+
+
+def message_tokens(msg):
+    # Role label, separator and newline cost a few tokens on top of the content
+    return estimate_tokens(msg['content']) + 4
+
+
+def trim_to_budget(messages, budget):
+    """Most recent messages whose estimated size fits in budget tokens"""
+    kept, used = [], 0
+    for msg in reversed(messages or []):
+        cost = message_tokens(msg)
+        if kept and used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+    return kept[::-1]
+
+
+def unsummarized(user):
+    """The messages of a user's chat_history that memory_summary does not cover yet"""
+    return (user.get('chat_history') or [])[user.get('memory_folded', 0):]
+
+
+class ConversationMemory:
+    """
+    Bounded per-user prompt memory.
+
+    After each turn the user's chat_history is checked; once more than max_messages
+    of it are not yet summarised, everything but the newest keep_recent messages is
+    folded into user['memory_summary'] by a background summarizer. The full transcript
+    stays in chat_history (batch re-analysis scores it); user['memory_folded'] counts
+    the leading messages the summary covers, and prompts use unsummarized(user).
+    Estimated and billed prompt tokens are logged per turn in user['prompt_token_log'].
+    """
+
+    def __init__(self, store, summarize, keep_recent=6, max_messages=12, log_size=50, max_workers=1):
+        self.store = store
+        self.summarize = summarize
+        self.keep_recent = keep_recent
+        self.max_messages = max_messages
+        self.log_size = log_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='memory')
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.summaries_built = 0
+        self.messages_folded = 0
+
+    def record_turn(self, user, prompt_tokens):
+        """Log the turn's prompt size ({'estimated': n, 'billed': n}) on the user record"""
+        user['turn_count'] = user.get('turn_count', 0) + 1
+        log = user.setdefault('prompt_token_log', [])
+        log.append(dict(prompt_tokens, turn=user['turn_count']))
+        del log[:-self.log_size]
+
+    def maybe_fold(self, user):
+        """Schedule background folding once the persisted history has grown too long"""
+        folded = user.get('memory_folded', 0)
+        recent = unsummarized(user)
+        if len(recent) <= self.max_messages:
+            return None
+        with self._lock:
+            if user['user_id'] in self._pending:
+                return None
+            self._pending.add(user['user_id'])
+        to_fold = [dict(m) for m in recent[:-self.keep_recent]]
+        return self.executor.submit(self._fold, user['user_id'], user.get('memory_summary'), folded, to_fold)
+
+    def _fold(self, user_id, previous_summary, folded, to_fold):
+        try:
+            summary = self.summarize(previous_summary, to_fold)
+
+            def apply(user):
+                # Only apply if nothing was folded meanwhile and the messages are where they were
+                if (user.get('memory_folded', 0) != folded
+                        or user.get('chat_history', [])[folded:folded + len(to_fold)] != to_fold):
+                    return False
+                user['memory_summary'] = summary
+                user['memory_folded'] = folded + len(to_fold)
+
+            # Optimistic write: a turn recorded meanwhile (by any worker) just means a retry
+            if self.store.update(user_id, apply) is None:
+                return None
+            with self._lock:
+                self.summaries_built += 1
+                self.messages_folded += len(to_fold)
+            return summary
+        except Exception as e:
+            print(f"Error folding conversation memory: {str(e)}")
+            return None
+        finally:
+            with self._lock:
+                self._pending.discard(user_id)
+
+    def stats(self):
+        return {
+            'summaries_built': self.summaries_built,
+            'messages_folded': self.messages_folded,
+            'pending': len(self._pending)
+        }
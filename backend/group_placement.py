@@ -0,0 +1,325 @@
+"""
+Incremental Group Placement for Mentra AI System
+Places each newly completed intake into the best open group instead of
+re-forming every group from scratch
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from similarity_engine import user_concerns
+
+
+def _concern_weights(user):
+    """concern -> weight (confidence scaled by severity) and the user's severity rank"""
+    concerns = user_concerns(user)
+    weights = {name: max(conf, 0.05) * (0.5 + sev / 6.0) for name, (conf, sev) in concerns.items()}
+    severity = max((sev for _, sev in concerns.values()), default=2)
+    return weights, severity
+
+
+def _cosine(a, b):
+    if not a or not b:
+        return 0.0
+    dot = sum(w * b.get(k, 0.0) for k, w in a.items())
+    norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class IncrementalGroupPlacer:
+    """
+    Keeps a small profile per open group (summed concern weights, severity range, size)
+    so placing one user costs O(open groups). Users with no good match wait in a
+    per-concern queue until there are enough of them to open a new group.
+
+    Groups, queues and the group counter live in a group store (see group_store.py);
+    the profiles are a local index that reloads just the groups another worker
+    process has saved since it last looked, and every placement runs under the
+    store's lock. Groups list members by user_id and queues hold user_id and
+    severity; records are read from the user store only for the members of a
+    group being profiled or opened, never by scanning it.
+    """
+
+    def __init__(self, store, users=None, min_size=4, max_size=8, max_severity_gap=1, min_score=0.35):
+        self.store = store
+        self.users = users
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_severity_gap = max_severity_gap
+        self.min_score = min_score
+        self._lock = threading.RLock()
+        self._generation = None        # store generation the index was built from
+        self._profiles = {}            # group_id -> profile of an open group
+        self._groups = {}              # group_id -> group dict
+        self._member_of = {}           # user_id -> group_id
+        self._pending = {}             # concern -> OrderedDict(user_id -> severity)
+        self._counter = 0
+        self.placed = 0
+        self.opened = 0
+
+    def _sync(self):
+        """Bring the index up to date with groups and queues saved since it was last read"""
+        generation = self.store.generation()
+        if generation == self._generation:
+            return
+        groups, replaced = self.store.changes_since(self._generation)
+        if replaced:
+            self._clear()
+        for group in groups:
+            self._index_group(group)
+        self._pending = {
+            # Entries written before queues held ids carried the whole user record
+            concern: OrderedDict((entry['user_id'] if isinstance(entry, dict) else entry, severity)
+                                 for entry, severity in queue)
+            for concern, queue in self.store.get_state('pending', {}).items()
+        }
+        self._counter = self.store.get_state('counter', 0)
+        self._generation = generation
+
+    def _clear(self):
+        self._profiles.clear()
+        self._groups.clear()
+        self._member_of.clear()
+
+    def _records(self, user_ids, lookup=None):
+        """User records for these ids, skipping any that no longer exist"""
+        lookup = lookup or (self.users.get if self.users is not None else None)
+        if lookup is None:
+            return []
+        return [u for u in map(lookup, user_ids) if u]
+
+    def _save_pending(self):
+        self.store.set_state('pending', {
+            concern: [[user_id, severity] for user_id, severity in queue.items()]
+            for concern, queue in self._pending.items() if queue
+        })
+
+    def replace_groups(self, groups, waitlist=(), lookup=None):
+        """
+        Swap in a wholesale (re)formation and rebuild the placement index.
+        waitlist: user records the formation left ungrouped; they join the queues.
+        lookup: user_id -> record for profiling the groups (defaults to the user store).
+        """
+        with self.store.lock(), self._lock:
+            self._sync()
+            self.store.replace_all(groups)
+            self._clear()
+            for group in groups:
+                self._index_group(group, lookup=lookup)
+            for queue in self._pending.values():
+                for user_id in [u for u in queue if u in self._member_of]:
+                    del queue[user_id]
+            for user in waitlist:
+                if user['user_id'] not in self._member_of:
+                    self._enqueue(user, *_concern_weights(user))
+            self._save_pending()
+            self._generation = self.store.generation()
+
+    def _index_group(self, group, members=None, lookup=None):
+        """
+        (Re)index one group. members: its user records if already at hand; otherwise
+        they are read, and only while the group is open and needs a profile.
+        """
+        previous = self._groups.get(group['id'])
+        if previous is not None:
+            for user_id in previous.get('members', []):
+                if self._member_of.get(user_id) == group['id']:
+                    del self._member_of[user_id]
+            self._profiles.pop(group['id'], None)
+        self._groups[group['id']] = group
+        for user_id in group.get('members', []):
+            self._member_of[user_id] = group['id']
+        size = len(group.get('members', []))
+        if group.get('status', 'forming') == 'forming' and size < self.max_size:
+            if members is None:
+                members = self._records(group.get('members', []), lookup)
+            profile = {'concerns': {}, 'sev_min': 3, 'sev_max': 1, 'size': 0}
+            for user in members:
+                self._add_to_profile(profile, user)
+            profile['size'] = size
+            self._profiles[group['id']] = profile
+
+    def _add_to_profile(self, profile, user):
+        weights, severity = _concern_weights(user)
+        for name, w in weights.items():
+            profile['concerns'][name] = profile['concerns'].get(name, 0.0) + w
+        profile['sev_min'] = min(profile['sev_min'], severity)
+        profile['sev_max'] = max(profile['sev_max'], severity)
+        profile['size'] += 1
+
+    def group_for(self, user_id):
+        with self._lock:
+            self._sync()
+            return self._member_of.get(user_id)
+
+    def get_group(self, group_id):
+        """O(1) lookup of any current group by id"""
+        with self._lock:
+            self._sync()
+            return self._groups.get(group_id)
+
+    def place(self, user):
+        """
+        Place one user. Returns a dict describing the outcome:
+        placed (joined an open group), formed (opened a new group from the queue),
+        queued (waiting for compatible peers) or already_placed.
+        New and joined groups are saved to the store.
+        """
+        user_id = user['user_id']
+        with self.store.lock(), self._lock:
+            self._sync()
+            try:
+                result = self._place(user_id, user)
+            except Exception:
+                self._generation = None    # index may be half-updated; reload next time
+                raise
+            self._generation = self.store.generation()
+            return result
+
+    def _place(self, user_id, user):
+        if user_id in self._member_of:
+            return {'action': 'already_placed', 'group_id': self._member_of[user_id]}
+
+        weights, severity = _concern_weights(user)
+        best_id, best_score = None, self.min_score
+        for group_id, profile in self._profiles.items():
+            if max(profile['sev_max'], severity) - min(profile['sev_min'], severity) > self.max_severity_gap:
+                continue
+            score = _cosine(weights, profile['concerns'])
+            if score > best_score:
+                best_id, best_score = group_id, score
+
+        if best_id is not None:
+            self._join(best_id, user)
+            self.store.save(self._groups[best_id])
+            if self._dequeue(user_id):
+                self._save_pending()
+            self.placed += 1
+            return {'action': 'placed', 'group_id': best_id, 'score': round(best_score, 3)}
+
+        concern, queue = self._enqueue(user, weights, severity)
+        peers = None
+        peer_ids = self._queued_window(queue, user_id, severity)
+        if peer_ids is not None:
+            peers = self._records(peer_ids)
+            # Users deleted while they waited leave the queue
+            for gone in set(peer_ids) - {p['user_id'] for p in peers}:
+                del queue[gone]
+            if len(peers) + 1 < self.min_size:
+                peers = None
+        if peers is None:
+            self._save_pending()
+            return {'action': 'queued', 'queue': concern, 'position': len(queue)}
+
+        members = peers + [user]
+        for member in members:
+            self._dequeue(member['user_id'])
+        group = self._open_group(concern, members)
+        self.store.save(group)
+        self.store.set_state('counter', self._counter)
+        self._save_pending()
+        self.opened += 1
+        return {'action': 'formed', 'group_id': group['id']}
+
+    def _queued_window(self, queue, user_id, severity):
+        """
+        Ids of the earliest queued peers to open a group with a just-queued user, all
+        within one max_severity_gap window of severities. None if too few.
+        """
+        best = None
+        for low in range(severity - self.max_severity_gap, severity + 1):
+            peers = [uid for uid, sev in queue.items()
+                     if low <= sev <= low + self.max_severity_gap and uid != user_id
+                     and uid not in self._member_of]
+            if len(peers) + 1 >= self.min_size and (best is None or len(peers) > len(best)):
+                best = peers
+        return best[:self.max_size - 1] if best is not None else None
+
+    def _enqueue(self, user, weights, severity):
+        """
+        Queue a user under their strongest concern, leaving any queue they waited
+        in before (their concern may have changed); returns (concern, queue)
+        """
+        self._dequeue(user['user_id'])
+        concern = max(weights, key=weights.get) if weights else 'general'
+        queue = self._pending.setdefault(concern, OrderedDict())
+        queue[user['user_id']] = severity
+        return concern, queue
+
+    def _dequeue(self, user_id):
+        """Take a user off every queue; True if they were waiting in one"""
+        found = False
+        for queue in self._pending.values():
+            if queue.pop(user_id, None) is not None:
+                found = True
+        return found
+
+    def _join(self, group_id, user):
+        group = self._groups[group_id]
+        profile = self._profiles[group_id]
+        members = self._records(group['members'])
+        group['members'].append(user['user_id'])
+        group['cohesion_score'] = self._cohesion(members + [user])
+        self._member_of[user['user_id']] = group_id
+        self._add_to_profile(profile, user)
+        if profile['size'] >= self.max_size:
+            del self._profiles[group_id]
+
+    def _open_group(self, concern, members):
+        self._counter += 1
+        group = {
+            'id': f"group_inc_{concern}_{int(datetime.utcnow().timestamp())}_{self._counter}",
+            'name': f"{concern.replace('_', ' ').title()} Support Group {self._counter}",
+            'members': [u['user_id'] for u in members],
+            'primary_focus': concern,
+            'reasoning': "Opened from queued intakes that share a primary concern",
+            'cohesion_score': self._cohesion(members),
+            'created_at': datetime.utcnow().isoformat(),
+            'status': 'forming',
+            'formation_method': 'incremental'
+        }
+        self._index_group(group, members)
+        return group
+
+    @staticmethod
+    def _cohesion(members):
+        """Mean pairwise concern similarity"""
+        vectors = [_concern_weights(u)[0] for u in members]
+        pairs = [(a, b) for i, a in enumerate(vectors) for b in vectors[i + 1:]]
+        if not pairs:
+            return 0.0
+        return round(sum(_cosine(a, b) for a, b in pairs) / len(pairs), 3)
+
+    def stats(self):
+        return {
+            'open_groups': len(self._profiles),
+            'placed': self.placed,
+            'groups_opened': self.opened,
+            'queued': {c: len(q) for c, q in self._pending.items() if q}
+        }
+
+
+class PeriodicRebalancer:
+    """Daemon thread that calls rebalance() every interval seconds"""
+
+    def __init__(self, interval, rebalance):
+        self.interval = interval
+        self.rebalance = rebalance
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='group-rebalancer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.rebalance()
+            except Exception as e:
+                print(f"Error in periodic rebalance: {str(e)}")
@@ -0,0 +1,270 @@
+"""
+Group Store for Mentra AI System
+Groups and placement state that one or several worker processes share,
+with an in-memory and a SQLite (WAL) backend
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class InMemoryGroupStore:
+    """
+    Ordered group_id -> group dict for a single process.
+    Groups are held by reference, so in-place edits are visible immediately.
+    """
+
+    backend = 'memory'
+
+    def __init__(self):
+        self._groups = OrderedDict()
+        self._positions = {}       # group_id -> position, as in the SQLite table
+        self._next_position = 0
+        self._versions = {}        # group_id -> generation of its last save
+        self._replaced_at = 0      # generation of the last replace_all
+        self._state = {}
+        self._generation = 0
+        self._epoch = os.urandom(4).hex()
+        self._ordered = None       # (generation, groups, positions) for page()
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def lock(self):
+        with self._lock:
+            yield
+
+    def generation(self):
+        """Bumped on every write; a changed value means another writer touched the store"""
+        return self._generation
+
+    def etag(self):
+        """Changes whenever the store does, including across restarts"""
+        return f"{self._epoch}-{self._generation}"
+
+    def all(self):
+        return list(self._groups.values())
+
+    def page(self, after=-1, limit=100):
+        """Up to limit groups positioned after `after`, and the last position (None when no more)"""
+        with self._lock:
+            if self._ordered is None or self._ordered[0] != self._generation:
+                groups = list(self._groups.values())
+                self._ordered = (self._generation, groups, [self._positions[g['id']] for g in groups])
+            _, groups, positions = self._ordered
+        start = bisect_right(positions, after)
+        end = start + limit
+        return groups[start:end], (positions[end - 1] if end < len(groups) else None)
+
+    def get(self, group_id):
+        return self._groups.get(group_id)
+
+    def changes_since(self, generation):
+        """
+        (groups saved after generation, replaced). replaced is True when the whole
+        set was swapped since then (or generation is None); groups is then every group.
+        """
+        with self._lock:
+            if generation is None or self._replaced_at > generation:
+                return list(self._groups.values()), True
+            return [g for group_id, g in self._groups.items() if self._versions[group_id] > generation], False
+
+    def save(self, group):
+        with self._lock:
+            if group['id'] not in self._groups:
+                self._positions[group['id']] = self._next_position
+                self._next_position += 1
+            self._groups[group['id']] = group
+            self._generation += 1
+            self._versions[group['id']] = self._generation
+
+    def replace_all(self, groups):
+        with self._lock:
+            self._groups = OrderedDict((g['id'], g) for g in groups)
+            self._positions = {group_id: i for i, group_id in enumerate(self._groups)}
+            self._next_position = len(self._groups)
+            self._generation += 1
+            self._versions = dict.fromkeys(self._groups, self._generation)
+            self._replaced_at = self._generation
+
+    def get_state(self, key, default=None):
+        return self._state.get(key, default)
+
+    def set_state(self, key, value):
+        with self._lock:
+            self._state[key] = value
+            self._generation += 1
+
+    def __len__(self):
+        return len(self._groups)
+
+    def __iter__(self):
+        return iter(self.all())
+
+
+class SQLiteGroupStore:
+    """
+    Groups and placement state in SQLite, shareable by several worker processes.
+
+    lock() is exclusive across threads and processes (an flock on path + '.lock'),
+    so read-decide-write sequences such as placing a user see a consistent view.
+    generation() lets each process notice writes made by the others.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path='mentra.db'):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._lock_file = None
+        self._lock_pid = None
+        conn = self._conn()
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS groups (
+                group_id TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                generation INTEGER NOT NULL DEFAULT 0)""")
+            # Databases created before per-group generations
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(groups)")}
+            if 'generation' not in columns:
+                conn.execute("ALTER TABLE groups ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS groups_position ON groups (position)")
+            conn.execute("CREATE INDEX IF NOT EXISTS groups_generation ON groups (generation)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS group_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL)""")
+            conn.execute("INSERT OR IGNORE INTO group_state (key, value) VALUES ('generation', '0')")
+            conn.execute("INSERT OR IGNORE INTO group_state (key, value) VALUES ('epoch', ?)",
+                         (json.dumps(os.urandom(4).hex()),))
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def lock(self):
+        with self._lock:
+            # Reopen after fork: an inherited descriptor would share the parent's lock
+            if self._lock_pid != os.getpid():
+                self._lock_file = open(self.path + '.lock', 'a')
+                self._lock_pid = os.getpid()
+                self._depth = 0
+            if self._depth == 0:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def generation(self):
+        row = self._conn().execute("SELECT value FROM group_state WHERE key = 'generation'").fetchone()
+        return int(row[0])
+
+    def etag(self):
+        """Changes whenever the store does; the same in every worker sharing the file"""
+        rows = dict(self._conn().execute(
+            "SELECT key, value FROM group_state WHERE key IN ('epoch', 'generation')").fetchall())
+        return f"{json.loads(rows['epoch'])}-{rows['generation']}"
+
+    def all(self):
+        rows = self._conn().execute("SELECT data FROM groups ORDER BY position")
+        return [json.loads(r[0]) for r in rows]
+
+    def page(self, after=-1, limit=100):
+        """Up to limit groups positioned after `after`, and the last position (None when no more)"""
+        rows = self._conn().execute(
+            "SELECT position, data FROM groups WHERE position > ? ORDER BY position LIMIT ?",
+            (after, limit + 1)).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return [json.loads(r[1]) for r in rows], (rows[-1][0] if more else None)
+
+    def get(self, group_id):
+        row = self._conn().execute("SELECT data FROM groups WHERE group_id = ?", (group_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def changes_since(self, generation):
+        """
+        (groups saved after generation, replaced). replaced is True when the whole
+        set was swapped since then (or generation is None); groups is then every group.
+        """
+        conn = self._conn()
+        # One read transaction, so the rows match the replaced_at they are judged by
+        with conn:
+            conn.execute("BEGIN")
+            row = conn.execute("SELECT value FROM group_state WHERE key = 'replaced_at'").fetchone()
+            if generation is None or (json.loads(row[0]) if row else 0) > generation:
+                rows, replaced = conn.execute("SELECT data FROM groups ORDER BY position").fetchall(), True
+            else:
+                rows, replaced = conn.execute("SELECT data FROM groups WHERE generation > ? ORDER BY position",
+                                              (generation,)).fetchall(), False
+        return [json.loads(r[0]) for r in rows], replaced
+
+    def save(self, group):
+        conn = self._conn()
+        with conn:
+            generation = self._bump(conn)
+            conn.execute(
+                """INSERT INTO groups (group_id, position, data, generation)
+                   VALUES (?, (SELECT COALESCE(MAX(position), 0) + 1 FROM groups), ?, ?)
+                   ON CONFLICT(group_id) DO UPDATE SET data = excluded.data, generation = excluded.generation""",
+                (group['id'], json.dumps(group), generation))
+
+    def replace_all(self, groups):
+        conn = self._conn()
+        with conn:
+            generation = self._bump(conn)
+            conn.execute("DELETE FROM groups")
+            conn.executemany(
+                "INSERT INTO groups (group_id, position, data, generation) VALUES (?, ?, ?, ?)",
+                [(g['id'], i, json.dumps(g), generation) for i, g in enumerate(groups)])
+            conn.execute("INSERT OR REPLACE INTO group_state (key, value) VALUES ('replaced_at', ?)",
+                         (json.dumps(generation),))
+
+    def get_state(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM group_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO group_state (key, value) VALUES (?, ?)",
+                         (key, json.dumps(value)))
+            self._bump(conn)
+
+    @staticmethod
+    def _bump(conn):
+        """Advance the generation inside the caller's transaction; returns the new value"""
+        conn.execute("UPDATE group_state SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+        return int(conn.execute("SELECT value FROM group_state WHERE key = 'generation'").fetchone()[0])
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM groups").fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.all())
+
+
+def create_group_store():
+    """Group store matching the user store backend (MENTRA_USER_STORE / MENTRA_DB_PATH)"""
+    backend = os.getenv('MENTRA_USER_STORE', 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteGroupStore(os.getenv('MENTRA_DB_PATH', 'mentra.db'))
+    return InMemoryGroupStore()
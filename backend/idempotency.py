@@ -0,0 +1,121 @@
+"""
+Idempotency Keys for Mentra AI System
+Remembers the response to each Idempotency-Key for a bounded window (LRU + TTL)
+so client retries are answered without re-running LLM calls; a retry that
+arrives while the original is still running waits for that result
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+
+def request_fingerprint(*parts):
+    """Hash of what the request asked for, to catch a key reused for a different request"""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Key -> stored (payload, status) for one worker's event loop.
+
+    Keys are scoped by route, so one key sent to two endpoints is two entries.
+    Failures (5xx) and rate-limit refusals (429) are not kept; the call may be
+    retried for real.
+    Entries are evicted least-recently-used beyond max_entries and expire after
+    ttl_seconds. All methods run on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # (scope, key) -> (stored_at, fingerprint, payload, status)
+        self._inflight = {}             # (scope, key) -> (fingerprint, asyncio.Task)
+        self.requests = 0
+        self.replayed = 0
+        self.attached = 0
+        self.mismatched = 0
+        self.evictions = 0
+
+    async def run(self, scope, key, fingerprint, handler):
+        """
+        (payload, status, duplicate) for handler(), which returns (payload, status).
+        Without a key the handler simply runs.
+        """
+        if not key:
+            payload, status = await handler()
+            return payload, status, False
+        self.requests += 1
+        entry_key = (scope, key)
+
+        entry = self._entries.get(entry_key)
+        if entry and time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._entries[entry_key]
+            entry = None
+        if entry:
+            if entry[1] != fingerprint:
+                return self._mismatch()
+            self._entries.move_to_end(entry_key)
+            self.replayed += 1
+            return entry[2], entry[3], True
+
+        inflight = self._inflight.get(entry_key)
+        if inflight:
+            if inflight[0] != fingerprint:
+                return self._mismatch()
+            self.attached += 1
+            payload, status = await asyncio.shield(inflight[1])
+            return payload, status, True
+
+        task = asyncio.ensure_future(handler())
+        self._inflight[entry_key] = (fingerprint, task)
+        task.add_done_callback(lambda t: self._finish(entry_key, fingerprint, t))
+        # Shielded so the original client hanging up does not cancel the call its retry waits on
+        payload, status = await asyncio.shield(task)
+        return payload, status, False
+
+    def _finish(self, entry_key, fingerprint, task):
+        self._inflight.pop(entry_key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        payload, status = task.result()
+        if status >= 500 or status == 429:
+            return
+        self._entries[entry_key] = (time.monotonic(), fingerprint, payload, status)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _mismatch(self):
+        self.mismatched += 1
+        return {
+            'success': False,
+            'error': 'Idempotency-Key was already used for a different request'
+        }, 422, False
+
+    def stats(self):
+        duplicates = self.replayed + self.attached
+        return {
+            'entries': len(self._entries),
+            'in_flight': len(self._inflight),
+            'keyed_requests': self.requests,
+            'replayed': self.replayed,
+            'attached_in_flight': self.attached,
+            'duplicate_calls_avoided': duplicates,
+            'duplicate_rate': round(duplicates / self.requests, 4) if self.requests else 0.0,
+            'key_mismatches': self.mismatched,
+            'evictions': self.evictions
+        }
+
+
+def create_idempotency_store():
+    """Idempotency store configured from MENTRA_IDEMPOTENCY_* env vars"""
+    return IdempotencyStore(
+        max_entries=int(os.getenv('MENTRA_IDEMPOTENCY_SIZE', '4096')),
+        ttl_seconds=float(os.getenv('MENTRA_IDEMPOTENCY_TTL', '3600'))
+    )
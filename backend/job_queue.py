@@ -0,0 +1,377 @@
+"""
+Job Queue for Mentra AI System
+Long-running work (AI group formation, briefing generation) as jobs in a local
+SQLite queue, run by a bounded pool of threads in each worker process. Jobs
+outlive the request that created them and the process that ran them: a claim is
+a lease the running process keeps renewing, and a job whose lease ran out (its
+process died or hung) is queued again.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from metrics import registry
+from tracing import tracer
+
+ACTIVE = ('queued', 'running')
+TERMINAL = ('succeeded', 'failed', 'cancelled')
+
+JOBS_FINISHED = registry.counter('mentra_jobs_finished_total', "Background job runs by outcome (retried runs go back to the queue)", ('kind', 'status'))
+JOB_DURATION = registry.histogram(
+    'mentra_job_duration_seconds', "Background job run time, queue wait excluded", ('kind',),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+
+# Names the process holding a claim; the token tells apart processes that reuse a pid
+WORKER_ID = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler once its job has been cancelled"""
+
+
+def _iso(timestamp):
+    return datetime.utcfromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class JobQueue:
+    """
+    Jobs in SQLite, shared by every worker process using the same file.
+    claim() hands each queued job to exactly one process (BEGIN IMMEDIATE) for
+    lease_seconds; the claimant extends the lease with renew() while it runs.
+    """
+
+    COLUMNS = ('job_id', 'kind', 'params', 'status', 'result', 'error', 'attempts', 'cancel_requested',
+               'dedupe_key', 'worker', 'created_at', 'started_at', 'finished_at', 'lease_until')
+
+    def __init__(self, path='jobs.db', max_attempts=3, lease_seconds=60.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            dedupe_key TEXT,
+            worker TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            lease_until REAL)""")
+        # Queues created before claims were leases
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if 'lease_until' not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Autocommit; multi-statement changes open their own BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _row(self, row):
+        job = dict(zip(self.COLUMNS, row))
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def _select(self, where, args=()):
+        return self._conn().execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE {where}", args)
+
+    def submit(self, kind, params, dedupe_key=None):
+        """
+        Queue a job; returns (job, created). With dedupe_key, a queued or running
+        job with the same key is returned instead of queueing a second one.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if dedupe_key is not None:
+                row = self._select("dedupe_key = ? AND status IN ('queued', 'running')", (dedupe_key,)).fetchone()
+                if row:
+                    conn.execute("COMMIT")
+                    return self._row(row), False
+            job_id = f"job_{uuid.uuid4().hex[:16]}"
+            conn.execute("INSERT INTO jobs (job_id, kind, params, status, dedupe_key, created_at) "
+                         "VALUES (?, ?, ?, 'queued', ?, ?)",
+                         (job_id, kind, json.dumps(params), dedupe_key, time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(job_id), True
+
+    def get(self, job_id):
+        row = self._select("job_id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def claim(self, worker=WORKER_ID):
+        """Oldest queued job, leased to worker and marked running; None when the queue is empty"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._select("status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, started_at = ?, lease_until = ?, "
+                         "attempts = attempts + 1 WHERE job_id = ?",
+                         (worker, now, now + self.lease_seconds, row[0]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0])
+
+    def renew(self, job_ids, worker=WORKER_ID):
+        """Extend worker's leases on these running jobs; returns the ids it still holds"""
+        if not job_ids:
+            return []
+        conn = self._conn()
+        marks = ', '.join('?' * len(job_ids))
+        conn.execute(f"UPDATE jobs SET lease_until = ? WHERE status = 'running' AND worker = ? AND job_id IN ({marks})",
+                     (time.time() + self.lease_seconds, worker, *job_ids))
+        return [r[0] for r in conn.execute(
+            f"SELECT job_id FROM jobs WHERE status = 'running' AND worker = ? AND job_id IN ({marks})",
+            (worker, *job_ids))]
+
+    def finish(self, job_id, status, result=None, error=None, worker=None):
+        """
+        Record a job's outcome. With worker, only while that worker still holds the
+        claim: a job whose lease ran out and was claimed again is not overwritten.
+        Returns whether the job was updated.
+        """
+        query = "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL WHERE job_id = ?"
+        args = [status, json.dumps(result) if result is not None else None, error, time.time(), job_id]
+        if worker is not None:
+            query += " AND status = 'running' AND worker = ?"
+            args.append(worker)
+        return self._conn().execute(query, args).rowcount > 0
+
+    def release(self, job_id, error, worker):
+        """Put worker's running job back in the queue for another attempt; False if it no longer holds it"""
+        return self._conn().execute(
+            "UPDATE jobs SET status = 'queued', error = ?, worker = NULL, lease_until = NULL "
+            "WHERE job_id = ? AND status = 'running' AND worker = ?", (error, job_id, worker)).rowcount > 0
+
+    def cancel(self, job_id):
+        """A queued job is cancelled at once; a running one is asked to stop at its next check"""
+        conn = self._conn()
+        conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                     (time.time(), job_id))
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def cancel_requested(self, job_id, worker=None):
+        """True once the job is cancelled, or, with worker, once worker no longer holds its claim"""
+        row = self._conn().execute("SELECT cancel_requested, status, worker FROM jobs WHERE job_id = ?",
+                                   (job_id,)).fetchone()
+        if row is None or row[0]:
+            return True
+        return worker is not None and (row[1] != 'running' or row[2] != worker)
+
+    def recover(self):
+        """
+        Re-queue running jobs whose lease has expired (failing them after max_attempts);
+        returns how many. A live claimant renews well before expiry, so an expired
+        lease means its process died or stopped making progress.
+        """
+        recovered = 0
+        now = time.time()
+        conn = self._conn()
+        for job_id, worker, attempts in conn.execute(
+                "SELECT job_id, worker, attempts FROM jobs "
+                "WHERE status = 'running' AND COALESCE(lease_until, 0) < ?", (now,)).fetchall():
+            if attempts >= self.max_attempts:
+                update, args = ("UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL",
+                                [f"lease expired during attempt {attempts}", now])
+            else:
+                update, args = "UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL", []
+            # Skipped if the claimant renewed in the meantime
+            cursor = conn.execute(update + " WHERE job_id = ? AND status = 'running' AND worker IS ? "
+                                           "AND COALESCE(lease_until, 0) < ?", args + [job_id, worker, now])
+            recovered += cursor.rowcount
+        return recovered
+
+    def purge(self, older_than_seconds):
+        """Forget finished jobs older than the retention window"""
+        cursor = self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') AND finished_at < ?",
+            (time.time() - older_than_seconds,))
+        return cursor.rowcount
+
+    def counts(self):
+        return dict(self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class JobHandle:
+    """Passed to handlers so long jobs can stop early once cancelled (or their lease is lost)"""
+
+    def __init__(self, queue, job_id, worker=None):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker = worker
+
+    def cancelled(self):
+        return self.queue.cancel_requested(self.job_id, self.worker)
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled(self.job_id)
+
+
+class JobRunner:
+    """
+    Claims jobs from the queue into a pool of max_workers threads.
+    handlers: kind -> fn(params, JobHandle) returning a JSON-serialisable result.
+    A handler raising one of the retryable exception types puts the job back in
+    the queue until it has used queue.max_attempts; any other exception fails it.
+
+    The dispatcher wakes on wake() (a job submitted by this process) or every
+    poll_interval seconds (jobs submitted by other processes, or recovered), and
+    renews the leases of the jobs running here every third of the lease.
+    """
+
+    def __init__(self, queue, handlers, max_workers=2, poll_interval=1.0, retention_seconds=86400,
+                 worker=WORKER_ID, retryable=()):
+        self.queue = queue
+        self.handlers = handlers
+        self.retryable = tuple(retryable)
+        self.max_workers = max_workers
+        self.poll_interval = min(poll_interval, queue.lease_seconds / 3)
+        self.retention_seconds = retention_seconds
+        self.worker = worker
+        self._held = set()         # job_ids this runner has claimed and not finished
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='job-dispatcher', daemon=True)
+        self._start_lock = threading.Lock()
+        self.running = 0
+        self.completed = {status: 0 for status in TERMINAL + ('retried',)}
+
+    def start(self):
+        """Start dispatching (idempotent); jobs left by an earlier process are picked up right away"""
+        with self._start_lock:
+            if not self._thread.is_alive():
+                self._thread.start()
+        return self
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        last_maintenance = last_renewal = None
+        while True:
+            # Cleared first, so a wake() that arrives mid-pass is seen by the wait below
+            self._wake.clear()
+            try:
+                if last_renewal is None or time.monotonic() - last_renewal > self.queue.lease_seconds / 3:
+                    last_renewal = time.monotonic()
+                    self.queue.renew(list(self._held), self.worker)
+                if last_maintenance is None or time.monotonic() - last_maintenance > 30:
+                    last_maintenance = time.monotonic()
+                    self.queue.recover()
+                    self.queue.purge(self.retention_seconds)
+                while self._slots.acquire(blocking=False):
+                    try:
+                        job = self.queue.claim(self.worker)
+                    except Exception:
+                        self._slots.release()
+                        raise
+                    if job is None:
+                        self._slots.release()
+                        break
+                    self.running += 1
+                    self._held.add(job['job_id'])
+                    self.executor.submit(self._execute, job)
+            except Exception as e:
+                print(f"Error dispatching jobs: {str(e)}")
+            self._wake.wait(self.poll_interval)
+
+    def _execute(self, job):
+        handle = JobHandle(self.queue, job['job_id'], self.worker)
+        started = time.perf_counter()
+        status, result, error = 'succeeded', None, None
+        try:
+            with tracer.start_trace(f"job {job['kind']}", job_id=job['job_id']):
+                result = self.handlers[job['kind']](job['params'], handle)
+            if handle.cancelled():
+                status, result = 'cancelled', None
+        except JobCancelled:
+            status = 'cancelled'
+        except Exception as e:
+            print(f"Error in job {job['job_id']} ({job['kind']}): {str(e)}")
+            status, error = 'failed', str(e)
+            if isinstance(e, self.retryable) and job['attempts'] < self.queue.max_attempts:
+                status = 'retried'
+        finally:
+            JOB_DURATION.observe(job['kind'], value=time.perf_counter() - started)
+            JOBS_FINISHED.inc(job['kind'], status)
+            try:
+                if status == 'retried':
+                    recorded = self.queue.release(job['job_id'], error, self.worker)
+                else:
+                    recorded = self.queue.finish(job['job_id'], status, result, error, worker=self.worker)
+                if not recorded:
+                    print(f"Job {job['job_id']} lost its lease while running; its outcome was not recorded")
+            except Exception as e:
+                print(f"Error recording job {job['job_id']}: {str(e)}")
+            self._held.discard(job['job_id'])
+            self.completed[status] += 1
+            self.running -= 1
+            self._slots.release()
+            self._wake.set()
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'running_here': self.running,
+            'finished_here': dict(self.completed),
+            'queue': self.queue.counts()
+        }
+
+
+def public_job(job):
+    """The API view of a job"""
+    return {
+        'job_id': job['job_id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'params': job['params'],
+        'result': job['result'],
+        'error': job['error'],
+        'attempts': job['attempts'],
+        'cancel_requested': job['cancel_requested'],
+        'created_at': _iso(job['created_at']),
+        'started_at': _iso(job['started_at']),
+        'finished_at': _iso(job['finished_at'])
+    }
+
+
+def create_job_queue():
+    """Job queue at MENTRA_JOB_DB_PATH (default jobs.db), shared by workers using that file"""
+    return JobQueue(os.getenv('MENTRA_JOB_DB_PATH', 'jobs.db'),
+                    max_attempts=int(os.getenv('MENTRA_JOB_MAX_ATTEMPTS', '3')),
+                    lease_seconds=float(os.getenv('MENTRA_JOB_LEASE_SECONDS', '60')))
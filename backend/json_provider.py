@@ -0,0 +1,54 @@
+"""
+JSON Encoding for Mentra AI System
+App JSON provider backed by orjson when it is installed (stdlib json otherwise),
+and compact encoding for JSON embedded in prompts, where every space is billed
+"""
+
+import json
+
+from quart.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Dates go through the provider's default (RFC 822, as with stdlib json) so output matches
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def compact_json(obj):
+    """JSON without indentation or spaces after separators, non-ASCII left unescaped"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=ORJSON_OPTIONS).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    The app's jsonify / get_json, encoded with orjson when available.
+    Responses are always compact, keys keep their insertion order and
+    non-ASCII text is sent as UTF-8 rather than \\u escapes.
+    """
+
+    sort_keys = False
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is None:
+            body = super().dumps(obj, separators=(',', ':')) + '\n'
+        else:
+            body = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,253 @@
+"""
+Incremental JSON parsing for streamed data
+JSONFieldStreamer picks one top-level string field out of a partial JSON object
+as an OpenAI completion streams in; JSONRecordStream splits a streamed request
+body (NDJSON or a JSON array) into records without holding the whole body.
+"""
+
+import codecs
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+_SIMPLE_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class JSONFieldStreamer:
+    """
+    Character-level scanner over a streamed JSON object.
+
+    feed() returns the newly decoded characters of the target field's string value,
+    so callers can forward them to the user before the object is complete.
+    """
+
+    def __init__(self, field='reply_to_user'):
+        self.field = field
+        self.raw = []              # Full text received so far
+        self.depth = 0
+        self.in_string = False
+        self.is_key = False
+        self.expecting_key = False
+        self.capturing = False
+        self.field_complete = False
+        self.last_key = None
+        self._key_buf = []
+        self._escape = None        # None, '' (after backslash) or collected \u hex digits
+        self._high_surrogate = None
+
+    def feed(self, chunk):
+        """Consume a chunk of JSON text and return newly decoded field text"""
+        self.raw.append(chunk)
+        out = []
+        for ch in chunk:
+            if self.in_string:
+                self._string_char(ch, out)
+            elif ch == '"':
+                self.in_string = True
+                self.is_key = self.depth == 1 and self.expecting_key
+                self._key_buf = []
+                self.capturing = (not self.is_key and self.depth == 1
+                                  and self.last_key == self.field and not self.field_complete)
+            elif ch in '{[':
+                self.depth += 1
+                self.expecting_key = ch == '{' and self.depth == 1
+            elif ch in '}]':
+                self.depth -= 1
+            elif ch == ':' and self.depth == 1:
+                self.expecting_key = False
+            elif ch == ',' and self.depth == 1:
+                self.expecting_key = True
+        return ''.join(out)
+
+    def _string_char(self, ch, out):
+        if self._escape is not None:
+            if self._escape == '' and ch != 'u':
+                self._emit(_SIMPLE_ESCAPES.get(ch, ch), out)
+                self._escape = None
+            elif self._escape == '':
+                self._escape = 'u'
+            else:
+                self._escape += ch
+                if len(self._escape) == 5:
+                    self._emit_codepoint(int(self._escape[1:], 16), out)
+                    self._escape = None
+        elif ch == '\\':
+            self._escape = ''
+        elif ch == '"':
+            self.in_string = False
+            if self.is_key:
+                self.last_key = ''.join(self._key_buf)
+            elif self.capturing:
+                self.capturing = False
+                self.field_complete = True
+        else:
+            self._emit(ch, out)
+
+    def _emit_codepoint(self, code, out):
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._emit(chr(code), out)
+
+    def _emit(self, text, out):
+        if self.is_key:
+            self._key_buf.append(text)
+        elif self.capturing:
+            out.append(text)
+
+    @property
+    def text(self):
+        """Everything received so far"""
+        return ''.join(self.raw)
+
+
+class JSONRecordStream:
+    """
+    Splits a streamed body into JSON records as chunks arrive.
+
+    The first non-blank byte decides the format: '[' is one JSON array of records,
+    anything else is NDJSON (one record per line). feed() and close() return the
+    records completed so far as (number, record, error) tuples, numbered from 1;
+    error is None for a record that parsed. A bad NDJSON line only loses that
+    line, but an array cannot be resynchronised, so a syntax error ends it.
+    """
+
+    def __init__(self, max_record_bytes=1 << 20):
+        self.max_record_bytes = max_record_bytes
+        self.mode = None
+        self.count = 0
+        self.finished = False
+        self._buf = bytearray()
+        self._skip_line = False
+        # Array mode decodes to text so records can be cut with raw_decode
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._scanner = json.JSONDecoder()
+        self._text = ''
+        self._pos = 0
+        self._expect_value = True
+
+    def feed(self, chunk):
+        if self.finished:
+            return []
+        if self.mode is None:
+            self._buf.extend(chunk)
+            stripped = self._buf.lstrip()
+            if not stripped:
+                self._buf.clear()
+                return []
+            self.mode = 'array' if stripped[:1] == b'[' else 'ndjson'
+            chunk, self._buf = bytes(self._buf), bytearray()
+            if self.mode == 'array':
+                chunk = chunk.lstrip()[1:]
+        if self.mode == 'ndjson':
+            return self._feed_lines(chunk, final=False)
+        return self._feed_array(chunk, final=False)
+
+    def close(self):
+        """Records completed by the end of the body, plus an error if it was cut short"""
+        if self.finished or self.mode is None:
+            self.finished = True
+            return []
+        records = self._feed_lines(b'', final=True) if self.mode == 'ndjson' else self._feed_array(b'', final=True)
+        self.finished = True
+        return records
+
+    def _record(self, value):
+        self.count += 1
+        if not isinstance(value, dict):
+            return (self.count, None, "record must be a JSON object")
+        return (self.count, value, None)
+
+    def _error(self, message):
+        self.count += 1
+        return (self.count, None, message)
+
+    def _feed_lines(self, chunk, final):
+        records = []
+        self._buf.extend(chunk)
+        start = 0
+        while True:
+            end = self._buf.find(b'\n', start)
+            if end < 0:
+                break
+            if self._skip_line:
+                self._skip_line = False
+            elif end - start > self.max_record_bytes:
+                records.append(self._error(f"record is larger than {self.max_record_bytes} bytes"))
+            else:
+                line = self._buf[start:end].strip()
+                if line:
+                    records.append(self._parse_line(line))
+            start = end + 1
+        del self._buf[:start]
+        if len(self._buf) > self.max_record_bytes:
+            # Report the oversized line once and drop the rest of it as it arrives
+            if not self._skip_line:
+                records.append(self._error(f"record is larger than {self.max_record_bytes} bytes"))
+            self._skip_line = True
+            self._buf.clear()
+        elif final and self._buf.strip() and not self._skip_line:
+            # Last line without a trailing newline
+            records.append(self._parse_line(self._buf.strip()))
+            self._buf.clear()
+        return records
+
+    def _parse_line(self, line):
+        try:
+            return self._record(_loads(bytes(line)))
+        except ValueError as e:
+            return self._error(f"invalid JSON: {str(e)}")
+
+    def _feed_array(self, chunk, final):
+        records = []
+        try:
+            self._text = self._text[self._pos:] + self._decoder.decode(chunk, final=final)
+        except UnicodeDecodeError as e:
+            self.finished = True
+            return [self._error(f"invalid UTF-8: {str(e)}")]
+        self._pos = 0
+        text, length = self._text, len(self._text)
+        while True:
+            pos = self._pos
+            while pos < length and text[pos] in ' \t\r\n':
+                pos += 1
+            self._pos = pos
+            if pos == length:
+                break
+            if text[pos] == ']':
+                self.finished = True
+                if self._expect_value and self.count:
+                    # '[{...},]': the comma promised another record
+                    return records + [self._error("invalid JSON: trailing comma before ']'")]
+                self._pos = length
+                return records
+            if not self._expect_value:
+                if text[pos] != ',':
+                    self.finished = True
+                    return records + [self._error(f"expected ',' or ']' in the array, got {text[pos]!r}")]
+                self._pos = pos + 1
+                self._expect_value = True
+                continue
+            try:
+                value, end = self._scanner.raw_decode(text, pos)
+            except ValueError as e:
+                # Usually a record cut off at the end of the chunk; wait for the rest
+                if not final and length - pos <= self.max_record_bytes:
+                    break
+                self.finished = True
+                return records + [self._error(f"invalid JSON: {str(e)}")]
+            records.append(self._record(value))
+            self._pos = end
+            self._expect_value = False
+        if final:
+            self.finished = True
+            records.append(self._error("body ended before the array was closed"))
+        return records
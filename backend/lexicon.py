@@ -0,0 +1,145 @@
+"""
+Local Lexicon Pre-Classifier for Mentra AI System
+Answers bare greetings and nonsense input without an OpenAI call and
+pre-detects concern phrases to hint the intake model on real turns
+"""
+
+import json
+import os
+import re
+import threading
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicon_v1.json')
+
+_WORD_RE = re.compile(r"[a-z']+")
+_VOWEL_RE = re.compile(r"[aeiouy]")
+# Digits (ratings, dates), emoji and non-Latin scripts are never treated as nonsense
+_OTHER_CONTENT_RE = re.compile(r"[0-9]|[^\x00-\x7f]")
+
+
+def _phrase_pattern(phrase):
+    """Escape a phrase, letting apostrophes be optional ("can't" also matches "cant")"""
+    return r"\s+".join(re.escape(word).replace("'", "'?") for word in phrase.split())
+
+
+def _normalise(text):
+    return text.lower().replace('’', "'")
+
+
+class LexiconClassifier:
+    """
+    Single compiled regex over a versioned phrase lexicon.
+
+    classify() returns one of three kinds:
+      greeting - bare greeting on the first turn (answered locally)
+      invalid  - nonsense opening message with no recognisable content (answered locally)
+      content  - a real turn; any matched concern phrases come back as hints
+    """
+
+    def __init__(self, path=DEFAULT_LEXICON_PATH):
+        with open(path, encoding='utf-8') as f:
+            spec = json.load(f)
+        self.version = spec.get('version', 'unversioned')
+        self.replies = spec['replies']
+        self.concerns = {_normalise(p).replace("'", ''): c for p, c in spec['concerns'].items()}
+        self.nonsense = {_normalise(w) for w in spec.get('nonsense', [])}
+
+        # Longest phrases first so "panic attacks" wins over "panic attack"
+        phrases = sorted(spec['concerns'], key=len, reverse=True)
+        self._concern_re = re.compile(
+            r"\b(?:" + "|".join(_phrase_pattern(_normalise(p)) for p in phrases) + r")\b")
+        greetings = sorted(spec.get('greetings', []), key=len, reverse=True)
+        self._greeting_re = re.compile(
+            r"^\s*(?:" + "|".join(_phrase_pattern(_normalise(g)) for g in greetings)
+            + r")(?:\s+(?:mentra|everyone|friend))?[\s!.,?~:)(]*$")
+
+        self._lock = threading.Lock()
+        self.turns_screened = 0
+        self.greetings_answered = 0
+        self.invalid_answered = 0
+        self.hinted_turns = 0
+
+    def classify(self, message, conversation_history=None):
+        text = _normalise(message or '')
+        matches = {}
+        for m in self._concern_re.finditer(text):
+            phrase = re.sub(r"\s+", ' ', m.group(0)).replace("'", '')
+            for concern in self.concerns.get(phrase, []):
+                matches.setdefault(concern, [])
+                if phrase not in matches[concern]:
+                    matches[concern].append(phrase)
+
+        if matches:
+            kind = 'content'
+        elif not conversation_history and self._greeting_re.match(text):
+            kind = 'greeting'
+        elif not conversation_history and self._is_nonsense(text):
+            # Mid-intake, a short reply ("7", "hmmm") answers the last question
+            kind = 'invalid'
+        else:
+            kind = 'content'
+
+        with self._lock:
+            self.turns_screened += 1
+            if kind == 'greeting':
+                self.greetings_answered += 1
+            elif kind == 'invalid':
+                self.invalid_answered += 1
+            elif matches:
+                self.hinted_turns += 1
+        return {'kind': kind, 'concerns': matches}
+
+    def _is_nonsense(self, text):
+        if _OTHER_CONTENT_RE.search(text):
+            return False
+        words = _WORD_RE.findall(text)
+        if not words:
+            # Only punctuation
+            return bool(text.strip())
+        if all(w in self.nonsense for w in words):
+            return True
+        # Keyboard mashing: every word is long and has no vowels ("sdfg hjkl")
+        return all(len(w) >= 4 and not _VOWEL_RE.search(w) for w in words)
+
+    def templated_response(self, kind, conversation_history=None):
+        """Analyzer-shaped reply for a turn answered locally"""
+        if kind == 'greeting':
+            return {
+                "status": "interviewing",
+                "conversation_stage": "greeting",
+                "reply_to_user": self.replies['greeting'],
+                "gathered_info": {"concern": "unknown", "missing_fields": ["concern", "severity", "duration"]},
+                "answered_locally": True
+            }
+        return {
+            "status": "invalid",
+            "conversation_stage": "gathering_info" if conversation_history else "greeting",
+            "reply_to_user": self.replies['invalid'],
+            "gathered_info": {},
+            "answered_locally": True
+        }
+
+    @staticmethod
+    def format_hints(concerns):
+        """Prompt fragment listing pre-detected concern phrases"""
+        by_phrase = {}
+        for concern, phrases in concerns.items():
+            for phrase in phrases:
+                by_phrase.setdefault(phrase, []).append(concern)
+        lines = [f'- "{phrase}" -> {", ".join(found)}' for phrase, found in by_phrase.items()]
+        return "LOCAL LEXICON HINTS (pre-detected phrases; verify against context):\n" + "\n".join(lines)
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'turns_screened': self.turns_screened,
+            'llm_calls_avoided': self.greetings_answered + self.invalid_answered,
+            'greetings_answered': self.greetings_answered,
+            'invalid_answered': self.invalid_answered,
+            'hinted_turns': self.hinted_turns
+        }
+
+
+def load_lexicon():
+    """Load the lexicon named by MENTRA_LEXICON_PATH (defaults to lexicon_v1.json)"""
+    return LexiconClassifier(os.getenv('MENTRA_LEXICON_PATH', DEFAULT_LEXICON_PATH))
@@ -0,0 +1,152 @@
+"""
+LLM Response Cache for Mentra AI System
+Content-addressed cache in front of chat.completions with LRU + TTL eviction
+and an optional on-disk (SQLite) tier
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(model, messages, temperature, response_format=None):
+    """
+    Hash of everything that determines a completion: model, the rendered
+    system/user prompts and the sampling temperature.
+    """
+    payload = json.dumps({
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'response_format': response_format
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier response cache.
+
+    Memory tier: OrderedDict used as an LRU, capped at max_entries.
+    Disk tier (optional): SQLite file that survives restarts.
+    Entries older than ttl_seconds are treated as misses in both tiers.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self._entries = OrderedDict()   # key -> (stored_at, component, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_path:
+            with self._disk() as conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    component TEXT,
+                    stored_at REAL NOT NULL,
+                    value TEXT NOT NULL)""")
+
+    def _disk(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.disk_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _expired(self, stored_at):
+        return self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry:
+                del self._entries[key]
+
+        if self.disk_path:
+            row = self._disk().execute(
+                "SELECT stored_at, component, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and not self._expired(row[0]):
+                value = json.loads(row[2])
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, row[0], row[1], value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value, component=None):
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, component, value)
+        if self.disk_path:
+            with self._disk() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, component, stored_at, value) VALUES (?, ?, ?, ?)",
+                    (key, component, stored_at, json.dumps(value)))
+
+    def _remember(self, key, stored_at, component, value):
+        self._entries[key] = (stored_at, component, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, component=None):
+        """Drop all entries for a component (or everything when component is None)"""
+        with self._lock:
+            if component is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [k for k, e in self._entries.items() if e[1] == component]
+                for k in stale:
+                    del self._entries[k]
+                removed = len(stale)
+        if self.disk_path:
+            with self._disk() as conn:
+                if component is None:
+                    conn.execute("DELETE FROM llm_cache")
+                else:
+                    conn.execute("DELETE FROM llm_cache WHERE component = ?", (component,))
+        return removed
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_llm_cache():
+    """
+    Build the shared cache from environment settings:
+    MENTRA_LLM_CACHE_SIZE (entries), MENTRA_LLM_CACHE_TTL (seconds),
+    MENTRA_LLM_CACHE_PATH (enables the on-disk tier)
+    """
+    return LLMResponseCache(
+        max_entries=int(os.getenv('MENTRA_LLM_CACHE_SIZE', '1024')),
+        ttl_seconds=float(os.getenv('MENTRA_LLM_CACHE_TTL', '3600')),
+        disk_path=os.getenv('MENTRA_LLM_CACHE_PATH') or None
+    )
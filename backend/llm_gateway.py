@@ -0,0 +1,430 @@
+"""
+LLM Gateway for Mentra AI System
+Single path to chat.completions for every AI component: pooled connections,
+per-component deadlines, retries with backoff and jitter, a circuit breaker,
+priority scheduling of calls and optional hedged requests for latency-sensitive components
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+
+from llm_scheduler import LLMScheduler, estimate_request_tokens
+from metrics import registry
+from tracing import tracer
+
+# Total seconds a component may spend on one call, retries included
+DEFAULT_DEADLINES = {
+    'analyzer': 20.0,   # user is waiting on the intake reply
+    'crisis': 10.0,
+    'memory': 30.0,     # background summarisation
+    'matcher': 120.0,   # one shard of group formation
+    'briefing': 90.0,   # precomputed in the background
+    'reanalysis': 60.0  # offline re-scoring of stored threads (batch_reanalysis.py)
+}
+DEFAULT_DEADLINE = 60.0
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError,
+                    openai.APITimeoutError, openai.APIConnectionError)
+
+LLM_LATENCY = registry.histogram(
+    'mentra_llm_request_duration_seconds',
+    "Upstream chat.completions latency per attempt (time to first byte when streaming)",
+    ('component', 'model', 'outcome'))
+LLM_ERRORS = registry.counter(
+    'mentra_llm_errors_total', "Failed or refused upstream attempts by error type", ('component', 'error'))
+LLM_IN_FLIGHT = registry.gauge(
+    'mentra_llm_requests_in_flight', "Upstream chat.completions attempts in progress", ('component',))
+LLM_TOKENS = registry.counter(
+    'mentra_llm_tokens_total', "Billed tokens by model (kind: prompt, completion, cached)",
+    ('model', 'component', 'kind'))
+
+
+class LLMUnavailableError(Exception):
+    """Raised instead of calling upstream when the circuit is open or the deadline is spent"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls go through; failure_threshold consecutive failures open the circuit.
+    open: calls fail fast for reset_timeout seconds.
+    half_open: one probe call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.times_opened += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'times_opened': self.times_opened,
+            'short_circuited': self.short_circuited
+        }
+
+
+class LLMGateway:
+    """
+    Wraps an OpenAI client and its async twin. complete(component, **kwargs) and
+    complete_async(component, **kwargs) behave like chat.completions.create but
+    are bounded by the component's deadline. Both share one circuit breaker.
+
+    Retryable errors (429, 5xx, timeouts, connection errors) are retried with
+    full-jitter exponential backoff while the deadline allows; a 429 Retry-After
+    header is honoured. Components listed in hedge_components get a second,
+    identical request if the first has not answered after hedge_delay seconds;
+    whichever finishes first wins.
+
+    Every attempt first waits for a slot from the scheduler (see llm_scheduler.py),
+    which orders calls by the component's priority class; the wait counts
+    against the deadline. A streamed call holds its slot until the response starts.
+    """
+
+    def __init__(self, client, async_client=None, deadlines=None, max_retries=2, backoff_base=0.25, backoff_max=4.0,
+                 breaker=None, hedge_delay=0.0, hedge_components=('analyzer',), hedge_workers=8, scheduler=None):
+        self.client = client
+        self.async_client = async_client
+        self.deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.scheduler = scheduler or LLMScheduler()
+        self.hedge_delay = hedge_delay
+        self.hedge_components = set(hedge_components)
+        self.hedge_executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix='llm-hedge')
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, component, field, n=1):
+        with self._lock:
+            counters = self._stats.setdefault(component, {
+                'calls': 0, 'retries': 0, 'failures': 0, 'timeouts': 0, 'hedged': 0, 'hedge_wins': 0
+            })
+            counters[field] += n
+
+    def deadline_for(self, component):
+        return self.deadlines.get(component, DEFAULT_DEADLINE)
+
+    def _no_slot(self, component):
+        self._count(component, 'failures')
+        LLM_ERRORS.inc(component, 'queue_timeout')
+        return LLMUnavailableError(f"{component}: no upstream slot before the deadline")
+
+    def _begin_attempt(self, component, deadline, ticket):
+        """
+        Seconds left for the attempt holding ticket; raises, giving the slot
+        back, when the circuit is open or time is up
+        """
+        if not self.breaker.allow():
+            self.scheduler.release(ticket)
+            self._count(component, 'failures')
+            LLM_ERRORS.inc(component, 'circuit_open')
+            raise LLMUnavailableError(f"{component}: upstream circuit open")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.scheduler.release(ticket)
+            self._count(component, 'failures')
+            LLM_ERRORS.inc(component, 'deadline_exceeded')
+            raise LLMUnavailableError(f"{component}: deadline exceeded")
+        return remaining
+
+    def _retry_delay(self, component, error, attempt, deadline):
+        """Backoff before the next attempt, or None when the error should be raised"""
+        # A 429 means "slow down", not "unhealthy"
+        if isinstance(error, openai.RateLimitError):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        if isinstance(error, openai.APITimeoutError):
+            self._count(component, 'timeouts')
+        delay = self._backoff(attempt, error)
+        if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+            self._count(component, 'failures')
+            return None
+        self._count(component, 'retries')
+        return delay
+
+    @staticmethod
+    def _create(client, timeout, kwargs):
+        """
+        chat.completions.create with this attempt's timeout and SDK retries off, so the
+        gateway's own retry policy is the only one. Returns a coroutine for AsyncOpenAI.
+        """
+        return client.with_options(timeout=timeout, max_retries=0).chat.completions.create(**kwargs)
+
+    def _hedges(self, component, kwargs):
+        return component in self.hedge_components and self.hedge_delay and not kwargs.get('stream')
+
+    def complete(self, component, **kwargs):
+        """chat.completions.create for one component, with deadline, retries and circuit breaking"""
+        with tracer.span('llm.chat_completions', component=component, model=kwargs.get('model'),
+                         stream=bool(kwargs.get('stream'))):
+            return self._complete(component, kwargs)
+
+    def _complete(self, component, kwargs):
+        self._count(component, 'calls')
+        deadline = time.monotonic() + self.deadline_for(component)
+        attempt = 0
+        tokens = estimate_request_tokens(kwargs)
+        while True:
+            ticket = self.scheduler.acquire(component, tokens, deadline - time.monotonic())
+            if ticket is None:
+                raise self._no_slot(component)
+            remaining = self._begin_attempt(component, deadline, ticket)
+            started = time.perf_counter()
+            LLM_IN_FLIGHT.inc(component)
+            used = None
+            try:
+                if self._hedges(component, kwargs):
+                    response = self._hedged(component, remaining, kwargs)
+                else:
+                    response = self._create(self.client, remaining, kwargs)
+            except RETRYABLE_ERRORS as e:
+                self._observe(component, kwargs, started, error=e)
+                delay = self._retry_delay(component, e, attempt, deadline)
+                if delay is None:
+                    raise
+            except Exception as e:
+                self._observe(component, kwargs, started, error=e)
+                self.breaker.record_success()
+                self._count(component, 'failures')
+                raise
+            else:
+                self._observe(component, kwargs, started, response=response)
+                self.breaker.record_success()
+                used = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+                return response
+            finally:
+                LLM_IN_FLIGHT.dec(component)
+                self.scheduler.release(ticket, used)
+            attempt += 1
+            time.sleep(delay)
+
+    async def complete_async(self, component, **kwargs):
+        """complete() on the async client; waits never block the event loop"""
+        with tracer.span('llm.chat_completions', component=component, model=kwargs.get('model'),
+                         stream=bool(kwargs.get('stream'))):
+            return await self._complete_async(component, kwargs)
+
+    async def _complete_async(self, component, kwargs):
+        self._count(component, 'calls')
+        deadline = time.monotonic() + self.deadline_for(component)
+        attempt = 0
+        tokens = estimate_request_tokens(kwargs)
+        while True:
+            ticket = await self.scheduler.acquire_async(component, tokens, deadline - time.monotonic())
+            if ticket is None:
+                raise self._no_slot(component)
+            remaining = self._begin_attempt(component, deadline, ticket)
+            started = time.perf_counter()
+            LLM_IN_FLIGHT.inc(component)
+            used = None
+            try:
+                if self._hedges(component, kwargs):
+                    response = await self._hedged_async(component, remaining, kwargs)
+                else:
+                    response = await self._create(self.async_client, remaining, kwargs)
+            except RETRYABLE_ERRORS as e:
+                self._observe(component, kwargs, started, error=e)
+                delay = self._retry_delay(component, e, attempt, deadline)
+                if delay is None:
+                    raise
+            except Exception as e:
+                self._observe(component, kwargs, started, error=e)
+                self.breaker.record_success()
+                self._count(component, 'failures')
+                raise
+            else:
+                self._observe(component, kwargs, started, response=response)
+                self.breaker.record_success()
+                used = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+                return response
+            finally:
+                LLM_IN_FLIGHT.dec(component)
+                self.scheduler.release(ticket, used)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _observe(self, component, kwargs, started, response=None, error=None):
+        model = kwargs.get('model', 'unknown')
+        LLM_LATENCY.observe(component, model, 'ok' if error is None else 'error',
+                            value=time.perf_counter() - started)
+        if error is not None:
+            LLM_ERRORS.inc(component, type(error).__name__)
+            tracer.current().set('last_error', type(error).__name__)
+        else:
+            self.record_usage(component, model, getattr(response, 'usage', None))
+
+    def record_usage(self, component, model, usage):
+        """Count billed tokens; streamed calls pass the usage from their final chunk"""
+        if usage is None:
+            return
+        details = getattr(usage, 'prompt_tokens_details', None)
+        LLM_TOKENS.inc(model, component, 'prompt', value=getattr(usage, 'prompt_tokens', 0) or 0)
+        LLM_TOKENS.inc(model, component, 'completion', value=getattr(usage, 'completion_tokens', 0) or 0)
+        LLM_TOKENS.inc(model, component, 'cached', value=getattr(details, 'cached_tokens', 0) or 0)
+
+    def _backoff(self, attempt, error):
+        retry_after = None
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get('retry-after'))
+            except (TypeError, ValueError):
+                retry_after = None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _hedged(self, component, remaining, kwargs):
+        started = time.monotonic()
+        primary = self.hedge_executor.submit(self._create, self.client, remaining, kwargs)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        self._count(component, 'hedged')
+        backup_timeout = max(remaining - (time.monotonic() - started), 0.001)
+        backup = self.hedge_executor.submit(self._create, self.client, backup_timeout, kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count(component, 'hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _hedged_async(self, component, remaining, kwargs):
+        started = time.monotonic()
+        primary = asyncio.ensure_future(self._create(self.async_client, remaining, kwargs))
+        done, _ = await asyncio.wait([primary], timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        self._count(component, 'hedged')
+        backup_timeout = max(remaining - (time.monotonic() - started), 0.001)
+        backup = asyncio.ensure_future(self._create(self.async_client, backup_timeout, kwargs))
+        pending = {primary, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count(component, 'hedge_wins')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Unlike threads, the losing request can actually be cancelled
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        with self._lock:
+            components = {c: dict(s) for c, s in self._stats.items()}
+        return {
+            'circuit': self.breaker.stats(),
+            'deadlines': self.deadlines,
+            'hedge_delay_ms': round(self.hedge_delay * 1000),
+            'scheduler': self.scheduler.stats(),
+            'components': components
+        }
+
+
+def create_llm_gateway():
+    """
+    Gateway over pooled sync and async OpenAI clients configured from MENTRA_LLM_* env vars.
+    SDK-level retries are disabled; the gateway owns the retry policy.
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv('MENTRA_LLM_MAX_CONNECTIONS', '64')),
+        max_keepalive_connections=int(os.getenv('MENTRA_LLM_KEEPALIVE_CONNECTIONS', '32')),
+        keepalive_expiry=30.0
+    )
+    timeout = httpx.Timeout(DEFAULT_DEADLINE, connect=5.0)
+    api_key = os.getenv('OPENAI_API_KEY')
+    client = OpenAI(api_key=api_key, max_retries=0,
+                    http_client=httpx.Client(limits=limits, timeout=timeout))
+    async_client = AsyncOpenAI(api_key=api_key, max_retries=0,
+                               http_client=httpx.AsyncClient(limits=limits, timeout=timeout))
+    deadlines = {}
+    for component in DEFAULT_DEADLINES:
+        value = os.getenv(f"MENTRA_LLM_DEADLINE_{component.upper()}")
+        if value:
+            deadlines[component] = float(value)
+    breaker = CircuitBreaker(
+        failure_threshold=int(os.getenv('MENTRA_LLM_BREAKER_FAILURES', '5')),
+        reset_timeout=float(os.getenv('MENTRA_LLM_BREAKER_RESET', '30'))
+    )
+    # RPM/TPM are per worker process: divide the account limits by the worker count
+    scheduler = LLMScheduler(
+        max_concurrency=int(os.getenv('MENTRA_LLM_MAX_CONCURRENCY', '32')),
+        requests_per_minute=int(os.getenv('MENTRA_LLM_RPM', '0')),
+        tokens_per_minute=int(os.getenv('MENTRA_LLM_TPM', '0'))
+    )
+    return LLMGateway(
+        client,
+        async_client,
+        deadlines=deadlines,
+        max_retries=int(os.getenv('MENTRA_LLM_MAX_RETRIES', '2')),
+        breaker=breaker,
+        hedge_delay=float(os.getenv('MENTRA_LLM_HEDGE_MS', '0')) / 1000.0,
+        scheduler=scheduler
+    )
@@ -0,0 +1,266 @@
+"""
+LLM Scheduler for Mentra AI System
+Orders outbound OpenAI calls by priority class (crisis, interactive intake,
+group formation, batch) with weighted fair queuing, under one concurrency cap
+and the account's requests-per-minute and tokens-per-minute limits
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from metrics import registry
+
+# Highest priority first. Crisis calls are always dispatched first; the other
+# classes share what is left by weight, so batch work slows down but never starves.
+PRIORITY_CLASSES = ('crisis', 'interactive', 'formation', 'batch')
+DEFAULT_WEIGHTS = {'interactive': 8, 'formation': 3, 'batch': 1}
+
+COMPONENT_CLASSES = {
+    'crisis': 'crisis',
+    'analyzer': 'interactive',
+    'matcher': 'formation',
+    'memory': 'batch',      # summarisation runs after the reply is sent
+    'briefing': 'batch',    # precomputed in the background
+    'reanalysis': 'batch'   # offline re-scoring of stored threads
+}
+
+# Completion tokens assumed for a call that does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 300
+
+QUEUE_WAIT = registry.histogram(
+    'mentra_llm_queue_wait_seconds', "Time an upstream call waited for a scheduler slot", ('priority',))
+QUEUE_DEPTH = registry.gauge(
+    'mentra_llm_queue_depth', "Upstream calls waiting for a scheduler slot", ('priority',))
+
+# Priority override for the calls made in this context (see prioritized())
+_priority = contextvars.ContextVar('mentra_llm_priority', default=None)
+
+
+@contextmanager
+def prioritized(priority_class):
+    """
+    Raise interactive calls made inside the block to priority_class, e.g. the
+    intake turn of a user already flagged in crisis. None leaves priorities alone.
+    """
+    token = _priority.set(priority_class)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_request_tokens(kwargs):
+    """Rough prompt + completion tokens for a chat.completions call (4 chars per token)"""
+    chars = sum(len(m.get('content') or '') for m in kwargs.get('messages') or () if isinstance(m, dict))
+    return chars // 4 + (kwargs.get('max_tokens') or DEFAULT_COMPLETION_TOKENS)
+
+
+class _RateBucket:
+    """Per-minute limit as a token bucket; limit 0 means unlimited"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait(self, amount, now):
+        """Seconds until amount is available (0 = now)"""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) * 60.0 / self.capacity
+
+    def take(self, amount):
+        if self.capacity:
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Give back (positive) or charge (negative) the difference from an estimate"""
+        if self.capacity:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class _Ticket:
+    __slots__ = ('priority', 'tokens', 'finish_tag', 'enqueued', 'granted', 'wake')
+
+    def __init__(self, priority, tokens, finish_tag, wake):
+        self.priority = priority
+        self.tokens = tokens
+        self.finish_tag = finish_tag
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.wake = wake
+
+
+class LLMScheduler:
+    """
+    acquire()/acquire_async() wait for a slot and return a ticket (None if the
+    timeout passes first); release(ticket, used_tokens) frees the slot and
+    corrects the tokens-per-minute bucket with what the call really used.
+
+    Fair queuing: each queued call gets a virtual finish tag of
+    max(class tag, system clock) + 1 / weight, and the lowest tag among the
+    class heads goes next. Waiters are threads (sync client) or futures on an
+    event loop (async client); both share one queue and one cap.
+    """
+
+    def __init__(self, max_concurrency=32, requests_per_minute=0, tokens_per_minute=0, weights=None):
+        self.max_concurrency = max_concurrency
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self._lock = threading.Lock()
+        self._queues = {c: deque() for c in PRIORITY_CLASSES}
+        self._tags = {c: 0.0 for c in PRIORITY_CLASSES}
+        self._clock = 0.0
+        self._requests = _RateBucket(requests_per_minute)
+        self._tokens = _RateBucket(tokens_per_minute)
+        self._timer = None
+        self.active = 0
+        self._stats = {c: {'granted': 0, 'timed_out': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+                       for c in PRIORITY_CLASSES}
+
+    def priority_for(self, component):
+        priority = COMPONENT_CLASSES.get(component, 'batch')
+        override = _priority.get()
+        if priority == 'interactive' and override in PRIORITY_CLASSES:
+            return override
+        return priority
+
+    # ------------------------------------------------------------------ waiting
+
+    def acquire(self, component, tokens, timeout):
+        """Block the calling thread until a slot is free"""
+        event = threading.Event()
+        ticket = self._enqueue(self.priority_for(component), tokens, event.set)
+        if ticket.granted or event.wait(max(timeout, 0)):
+            return ticket
+        return ticket if self._abandon(ticket) else None
+
+    async def acquire_async(self, component, tokens, timeout):
+        """acquire() without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+
+        ticket = self._enqueue(self.priority_for(component), tokens, wake)
+        if ticket.granted:
+            return ticket
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), max(timeout, 0))
+            return ticket
+        except asyncio.TimeoutError:
+            return ticket if self._abandon(ticket) else None
+        except asyncio.CancelledError:
+            if self._abandon(ticket):
+                self.release(ticket)
+            raise
+
+    def release(self, ticket, used_tokens=None):
+        with self._lock:
+            self.active -= 1
+            if used_tokens is not None:
+                self._tokens.adjust(ticket.tokens - used_tokens)
+            self._dispatch()
+
+    # --------------------------------------------------------------- internals
+
+    def _enqueue(self, priority, tokens, wake):
+        with self._lock:
+            if priority == 'crisis':
+                tag = 0.0
+            else:
+                tag = max(self._tags[priority], self._clock) + 1.0 / self.weights[priority]
+                self._tags[priority] = tag
+            ticket = _Ticket(priority, tokens, tag, wake)
+            self._queues[priority].append(ticket)
+            QUEUE_DEPTH.inc(priority)
+            self._dispatch()
+            return ticket
+
+    def _abandon(self, ticket):
+        """Take a timed-out or cancelled waiter off its queue; True if it was granted meanwhile"""
+        with self._lock:
+            if ticket.granted:
+                return True
+            self._queues[ticket.priority].remove(ticket)
+            QUEUE_DEPTH.dec(ticket.priority)
+            self._stats[ticket.priority]['timed_out'] += 1
+            # A large head that was waiting on the token bucket may have been blocking smaller calls
+            self._dispatch()
+            return False
+
+    def _next(self):
+        if self._queues['crisis']:
+            return self._queues['crisis'][0]
+        heads = [q[0] for c, q in self._queues.items() if q and c != 'crisis']
+        return min(heads, key=lambda t: t.finish_tag) if heads else None
+
+    def _dispatch(self):
+        """Grant slots in fair-queuing order while capacity and rate limits allow; lock held"""
+        while self.active < self.max_concurrency:
+            ticket = self._next()
+            if ticket is None:
+                return
+            now = time.monotonic()
+            delay = max(self._requests.wait(1, now), self._tokens.wait(ticket.tokens, now))
+            if delay > 0:
+                self._wake_in(delay)
+                return
+            self._requests.take(1)
+            self._tokens.take(ticket.tokens)
+            self._queues[ticket.priority].popleft()
+            if ticket.priority != 'crisis':
+                self._clock = ticket.finish_tag
+            self.active += 1
+            ticket.granted = True
+            waited = now - ticket.enqueued
+            stats = self._stats[ticket.priority]
+            stats['granted'] += 1
+            stats['wait_total'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+            QUEUE_DEPTH.dec(ticket.priority)
+            QUEUE_WAIT.observe(ticket.priority, value=waited)
+            ticket.wake()
+
+    def _wake_in(self, delay):
+        # One pending timer is enough: every dispatch re-checks the limits
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            classes = {}
+            for priority, stats in self._stats.items():
+                classes[priority] = {
+                    'queued': len(self._queues[priority]),
+                    'granted': stats['granted'],
+                    'timed_out': stats['timed_out'],
+                    'mean_wait_ms': round(stats['wait_total'] / stats['granted'] * 1000, 2) if stats['granted'] else 0.0,
+                    'max_wait_ms': round(stats['wait_max'] * 1000, 2)
+                }
+            return {
+                'in_flight': self.active,
+                'max_concurrency': self.max_concurrency,
+                'requests_per_minute': int(self._requests.capacity) or None,
+                'tokens_per_minute': int(self._tokens.capacity) or None,
+                'weights': dict(self.weights),
+                'classes': classes
+            }
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for the Mentra backend
+Drives many simulated intake sessions through /api/analyze-message, then forms
+groups and fetches therapist briefings, reporting p50/p95/p99 latency and
+requests per second per route. Results are saved as JSON for comparison.
+
+Run against the local OpenAI stand-in so numbers measure the backend only:
+    python3 mock_openai_server.py --port 8001
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=mock python3 backend_api.py
+    python3 load_test.py --sessions 200 --concurrency 32 --output results/run.json
+    python3 load_test.py ... --compare results/baseline.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+SCRIPTS = [
+    ["Hi, I need help",
+     "I've been feeling really anxious lately, for about {n} weeks",
+     "It started when work got stressful and I took on {n} new projects",
+     "I can't sleep and my heart races all the time",
+     "On a scale of 1-10, probably a {score}"],
+    ["Hello",
+     "Ever since my dad passed away {n} months ago I feel empty",
+     "I don't enjoy anything anymore and I skip meals",
+     "My friends keep inviting me out but I say no",
+     "I'd say it's about a {score} out of 10 most days"],
+    ["hey",
+     "I'm overwhelmed by stress at university, exams in {n} weeks",
+     "I keep procrastinating and then panic at night",
+     "It's affecting my relationship with my roommate",
+     "Maybe a {score}, it comes and goes"],
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return round(ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo), 1)
+
+
+class Recorder:
+    """Thread-safe latency/status log per route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}    # route -> [(latency_ms, ok)]
+        self.started = time.perf_counter()
+
+    def record(self, route, latency_ms, ok):
+        with self._lock:
+            self.samples.setdefault(route, []).append((latency_ms, ok))
+
+    def summary(self, elapsed):
+        routes = {}
+        all_latencies, total, errors = [], 0, 0
+        for route, samples in sorted(self.samples.items()):
+            latencies = [ms for ms, _ in samples]
+            failed = sum(1 for _, ok in samples if not ok)
+            routes[route] = {
+                'requests': len(samples),
+                'errors': failed,
+                'error_rate': round(failed / len(samples), 4),
+                'rps': round(len(samples) / elapsed, 2),
+                'mean_ms': round(sum(latencies) / len(latencies), 1),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'max_ms': round(max(latencies), 1)
+            }
+            all_latencies.extend(latencies)
+            total += len(samples)
+            errors += failed
+        overall = {
+            'requests': total,
+            'errors': errors,
+            'elapsed_s': round(elapsed, 2),
+            'rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': percentile(all_latencies, 50),
+            'p95_ms': percentile(all_latencies, 95),
+            'p99_ms': percentile(all_latencies, 99)
+        }
+        return routes, overall
+
+
+class LoadTest:
+    def __init__(self, api_url, timeout=60):
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.recorder = Recorder()
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=256)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+
+    def call(self, route, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, f"{self.api_url}{path}", timeout=self.timeout, **kwargs)
+            ok = response.status_code < 400
+            data = response.json() if ok else None
+        except Exception as e:
+            print(f"Error calling {path}: {str(e)}")
+            ok, data = False, None
+        self.recorder.record(route, (time.perf_counter() - started) * 1000, ok)
+        return data
+
+    def run_session(self, session_id, rng):
+        """One simulated intake: walk a script until the analyzer completes"""
+        user_id = f"load_{session_id}_{int(time.time())}"
+        script = rng.choice(SCRIPTS)
+        for template in script:
+            message = template.format(n=rng.randint(2, 12), score=rng.randint(4, 9))
+            data = self.call('analyze-message', 'POST', '/analyze-message',
+                             json={'user_id': user_id, 'message': message})
+            if data and data.get('status') == 'complete':
+                return True
+        return False
+
+    def run(self, sessions, concurrency, form_rounds, method, briefings, seed):
+        rng = random.Random(seed)
+        session_rngs = [random.Random(rng.random()) for _ in range(sessions)]
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            completed = sum(pool.map(lambda i: self.run_session(i, session_rngs[i]), range(sessions)))
+
+            groups = []
+            for _ in range(form_rounds):
+                data = self.call('groups-form', 'POST', '/groups/form', json={'method': method})
+                if data:
+                    groups = data.get('groups', groups)
+
+            group_ids = [g['id'] for g in groups][:briefings]
+            list(pool.map(lambda gid: self.call('therapist-briefing', 'GET', f"/therapist/briefing/{gid}"),
+                          group_ids))
+
+        routes, overall = self.recorder.summary(time.perf_counter() - started)
+        overall['sessions_completed'] = completed
+        overall['groups_formed'] = len(groups)
+        return routes, overall
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def print_report(routes, overall, baseline=None):
+    print("=" * 78)
+    print(f"{'route':<22}{'reqs':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    print("-" * 78)
+    for route, r in routes.items():
+        print(f"{route:<22}{r['requests']:>7}{r['errors']:>6}{r['rps']:>9}{r['p50_ms']:>9}"
+              f"{r['p95_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}")
+    print("-" * 78)
+    print(f"{'overall':<22}{overall['requests']:>7}{overall['errors']:>6}{overall['rps']:>9}"
+          f"{overall['p50_ms']:>9}{overall['p95_ms']:>9}{overall['p99_ms']:>9}")
+    print(f"elapsed {overall['elapsed_s']}s, sessions completed {overall['sessions_completed']}, "
+          f"groups formed {overall['groups_formed']}")
+
+    if baseline:
+        print("\nvs baseline " + (baseline['meta'].get('git_revision') or baseline['meta']['timestamp']))
+        for route, r in routes.items():
+            old = baseline['routes'].get(route)
+            if not old:
+                continue
+            deltas = []
+            for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                if old.get(key):
+                    deltas.append(f"{key} {old[key]} -> {r[key]} ({(r[key] - old[key]) / old[key] * 100:+.1f}%)")
+            print(f"  {route:<20} " + ", ".join(deltas))
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the Mentra backend")
+    parser.add_argument('--api-url', default=os.getenv('MENTRA_API_URL', 'http://localhost:5000/api'))
+    parser.add_argument('--sessions', type=int, default=100, help="simulated intake sessions")
+    parser.add_argument('--concurrency', type=int, default=16, help="sessions in flight at once")
+    parser.add_argument('--form-rounds', type=int, default=3, help="POST /groups/form calls after intake")
+    parser.add_argument('--method', default='similarity', choices=['similarity', 'traditional', 'ai'])
+    parser.add_argument('--briefings', type=int, default=20, help="briefings to fetch after forming")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', default='', help="free-form note stored with the results")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--compare', help="baseline results JSON to diff against")
+    args = parser.parse_args()
+
+    test = LoadTest(args.api_url, timeout=args.timeout)
+    print(f"Load test: {args.sessions} sessions x {args.concurrency} concurrent against {args.api_url}")
+    routes, overall = test.run(args.sessions, args.concurrency, args.form_rounds, args.method,
+                               args.briefings, args.seed)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'git_revision': _git_revision(),
+            'label': args.label,
+            'api_url': args.api_url,
+            'sessions': args.sessions,
+            'concurrency': args.concurrency,
+            'form_rounds': args.form_rounds,
+            'method': args.method,
+            'briefings': args.briefings,
+            'seed': args.seed
+        },
+        'routes': routes,
+        'overall': overall
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(routes, overall, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
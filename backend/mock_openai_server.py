@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI stand-in for load testing the Mentra backend
+Implements POST /v1/chat/completions (plain and streaming) with configurable
+latency, token usage and error injection, returning canned analyzer, matcher,
+briefing, crisis, summary and thread-analysis outputs, plus the Files and
+Batches endpoints a Batch API job uses (see batch_reanalysis.py --mode batch)
+
+Run:    python3 mock_openai_server.py --port 8001 --latency-ms 600 --error-rate 0.02
+Backend: OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=mock python3 backend_api.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from flask import Flask, request, jsonify, Response
+
+app = Flask(__name__)
+
+CONFIG = {
+    'latency_dist': 'lognormal',   # fixed | uniform | normal | lognormal
+    'latency_ms': 600.0,           # mean time before the first byte
+    'latency_jitter': 0.35,        # relative spread for uniform/normal/lognormal
+    'token_ms': 8.0,               # per completion token when streaming
+    'error_rate': 0.0,             # fraction of requests answered with an injected error
+    'error_codes': [429, 500, 503],
+    'batch_ms_per_request': 2.0,   # Batch API jobs process one request at a time at this pace
+    'seed': None
+}
+
+_rng = random.Random()
+_stats_lock = threading.Lock()
+_stats = {'requests': 0, 'streamed': 0, 'errors_injected': 0, 'by_component': {}}
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def sample_latency():
+    """Seconds to wait before answering, drawn from the configured distribution"""
+    mean = CONFIG['latency_ms'] / 1000.0
+    jitter = CONFIG['latency_jitter']
+    dist = CONFIG['latency_dist']
+    if dist == 'fixed' or mean <= 0:
+        return max(mean, 0.0)
+    if dist == 'uniform':
+        return _rng.uniform(mean * (1 - jitter), mean * (1 + jitter))
+    if dist == 'normal':
+        return max(0.0, _rng.gauss(mean, mean * jitter))
+    # lognormal with the requested mean: long right tail like real upstream latency
+    sigma = jitter
+    mu = -0.5 * sigma * sigma
+    return mean * _rng.lognormvariate(mu, sigma)
+
+
+# ============================================================================
+# CANNED RESPONSES
+# ============================================================================
+
+def detect_component(messages):
+    system = messages[0]['content'] if messages and messages[0]['role'] == 'system' else ''
+    if messages and 'conversation thread' in (messages[-1].get('content') or ''):
+        return 'thread'
+    if 'intake coordinator' in system:
+        return 'analyzer'
+    if 'group formation' in system:
+        return 'matcher'
+    if 'clinical supervisor' in system:
+        return 'briefing'
+    if 'crisis intervention' in system:
+        return 'crisis'
+    if 'running summaries' in system:
+        return 'memory'
+    return 'other'
+
+
+def analyzer_reply(prompt):
+    history = prompt.split('CURRENT USER MESSAGE:')[0]
+    user_turns = len(re.findall(r'^\s*user:', history, re.MULTILINE))
+    if 'Summary of earlier conversation' in history:
+        user_turns += 3
+    if user_turns >= 3:
+        return {
+            "status": "complete",
+            "conversation_stage": "finalizing",
+            "reply_to_user": "Thank you for sharing all of that with me. I have a good picture now and will match you with a supportive group.",
+            "gathered_info": {"concern": "anxiety", "missing_fields": []},
+            "final_analysis": {
+                "detected_concerns": {
+                    _rng.choice(["anxiety", "depression", "stress", "grief"]): {
+                        "confidence": round(_rng.uniform(0.6, 0.95), 2),
+                        "severity": _rng.choice(["mild", "moderate", "severe"])
+                    }
+                },
+                "recommended_group_type": "Anxiety Support",
+                "urgency_level": _rng.choice(["normal", "normal", "elevated"]),
+                "key_themes": _rng.sample(["work stress", "sleep", "relationships", "isolation", "self-esteem"], 2)
+            }
+        }
+    return {
+        "status": "interviewing",
+        "conversation_stage": "gathering_info" if user_turns else "greeting",
+        "reply_to_user": "That sounds really hard. How long have you been feeling this way, and how is it affecting your day?",
+        "gathered_info": {"concern": "anxiety", "missing_fields": ["severity", "duration"]}
+    }
+
+
+def matcher_reply(prompt):
+    ids = re.findall(r'"user_id":\s*"([^"]+)"', prompt)
+    groups = [{
+        "group_name": f"Support Circle {i // 6 + 1}",
+        "member_ids": ids[i:i + 6],
+        "primary_focus": "anxiety and stress",
+        "reasoning": "Members share overlapping concerns with compatible severity.",
+        "estimated_cohesion": round(_rng.uniform(0.6, 0.9), 2),
+        "special_considerations": ""
+    } for i in range(0, len(ids), 6)]
+    return {"recommended_groups": groups, "overall_strategy": "Grouped by shared primary concern."}
+
+
+def briefing_reply(prompt):
+    sections = ["Group Overview", "Member Profiles", "Common Themes", "Potential Group Dynamics",
+                "Recommended Session Structure", "Key Focus Areas", "Potential Challenges",
+                "Suggested Therapeutic Interventions"]
+    body = "This section is generated by the local OpenAI stand-in for load testing. " * 6
+    return "\n\n".join(f"## {i}. {title}\n{body}" for i, title in enumerate(sections, 1))
+
+
+def thread_reply(prompt):
+    concern = _rng.choice(["anxiety", "depression", "stress", "grief"])
+    return {
+        "detected_concerns": {
+            concern: {
+                "confidence": round(_rng.uniform(0.6, 0.95), 2),
+                "evidence": ["canned evidence from the local stand-in"],
+                "severity_level": _rng.choice(["mild", "moderate", "severe"])
+            }
+        },
+        "sentiment": _rng.choice(["negative", "neutral"]),
+        "urgency_level": _rng.choice(["normal", "normal", "elevated"]),
+        "emotional_indicators": ["worry"],
+        "key_themes": _rng.sample(["work stress", "sleep", "relationships", "isolation", "self-esteem"], 2),
+        "recommended_group_type": f"{concern.title()} Support",
+        "clinical_notes": "Generated by the local OpenAI stand-in."
+    }
+
+
+def crisis_reply(prompt):
+    text = prompt.lower()
+    level = 'high' if re.search(r'suicid|kill myself|want to die|end my life', text) else 'low'
+    return {
+        "crisis_level": level,
+        "specific_concerns": ["suicidal ideation"] if level == 'high' else [],
+        "recommended_actions": ["Share crisis line resources"] if level == 'high' else [],
+        "needs_immediate_intervention": False,
+        "safety_plan_needed": level == 'high'
+    }
+
+
+def canned_content(component, messages, json_mode):
+    prompt = messages[-1]['content'] if messages else ''
+    if component == 'analyzer':
+        return json.dumps(analyzer_reply(prompt))
+    if component == 'matcher':
+        return json.dumps(matcher_reply(prompt))
+    if component == 'briefing':
+        return briefing_reply(prompt)
+    if component == 'crisis':
+        return json.dumps(crisis_reply(prompt))
+    if component == 'thread':
+        return json.dumps(thread_reply(prompt))
+    if component == 'memory':
+        return "User reports ongoing anxiety affecting sleep and work; mood steady over recent turns."
+    return json.dumps({"ok": True}) if json_mode else "OK"
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+def _error_response(code):
+    kinds = {429: 'rate_limit_exceeded', 500: 'server_error', 502: 'bad_gateway', 503: 'service_unavailable'}
+    body = {'error': {'message': f"Injected {code} from mock server", 'type': kinds.get(code, 'server_error'),
+                      'code': kinds.get(code, 'server_error')}}
+    headers = {'Retry-After': '1'} if code == 429 else {}
+    return jsonify(body), code, headers
+
+
+def json_mode_error(messages, json_mode):
+    """OpenAI rejects JSON mode unless a message mentions JSON; None when the request is fine"""
+    if not json_mode or any('json' in str(m.get('content') or '').lower() for m in messages):
+        return None
+    return {'message': "'messages' must contain the word 'json' in some form, to use 'response_format' "
+                       "of type 'json_object'.",
+            'type': 'invalid_request_error', 'param': 'messages', 'code': None}
+
+
+def _chunk(completion_id, model, created, delta, finish_reason=None, usage=None):
+    payload = {
+        'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}] if usage is None else [],
+    }
+    if usage is not None:
+        payload['usage'] = usage
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def _usage(messages, content):
+    prompt_tokens = sum(estimate_tokens(m.get('content') or '') for m in messages)
+    completion_tokens = estimate_tokens(content)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_tokens_details': {'cached_tokens': 0}
+    }
+
+
+def _completion(completion_id, model, created, content, usage):
+    return {
+        'id': completion_id, 'object': 'chat.completion', 'created': created, 'model': model,
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        'usage': usage
+    }
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    body = request.get_json(force=True)
+    messages = body.get('messages', [])
+    model = body.get('model', 'gpt-4o-mini')
+    stream = bool(body.get('stream'))
+    json_mode = (body.get('response_format') or {}).get('type') == 'json_object'
+    component = detect_component(messages)
+
+    with _stats_lock:
+        _stats['requests'] += 1
+        _stats['streamed'] += int(stream)
+        _stats['by_component'][component] = _stats['by_component'].get(component, 0) + 1
+
+    invalid = json_mode_error(messages, json_mode)
+    if invalid:
+        return jsonify({'error': invalid}), 400
+
+    time.sleep(sample_latency())
+    if CONFIG['error_rate'] and _rng.random() < CONFIG['error_rate']:
+        with _stats_lock:
+            _stats['errors_injected'] += 1
+        return _error_response(_rng.choice(CONFIG['error_codes']))
+
+    content = canned_content(component, messages, json_mode)
+    usage = _usage(messages, content)
+    completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+
+    if not stream:
+        return jsonify(_completion(completion_id, model, created, content, usage))
+
+    include_usage = (body.get('stream_options') or {}).get('include_usage')
+
+    def generate():
+        yield _chunk(completion_id, model, created, {'role': 'assistant', 'content': ''})
+        # ~4 characters per token, paced at token_ms per token
+        for i in range(0, len(content), 4):
+            time.sleep(CONFIG['token_ms'] / 1000.0)
+            yield _chunk(completion_id, model, created, {'content': content[i:i + 4]})
+        yield _chunk(completion_id, model, created, {}, finish_reason='stop')
+        if include_usage:
+            yield _chunk(completion_id, model, created, None, usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return Response(generate(), mimetype='text/event-stream')
+
+
+@app.route('/v1/models', methods=['GET'])
+def list_models():
+    return jsonify({'object': 'list', 'data': [{'id': m, 'object': 'model', 'owned_by': 'mock'}
+                                               for m in ('gpt-4o-mini', 'gpt-4o')]})
+
+
+# ============================================================================
+# FILES AND BATCHES (Batch API stand-in, kept in memory)
+# ============================================================================
+
+_files = {}
+_batches = {}
+
+
+def _store_file(filename, data, purpose):
+    file_id = f"file-mock-{uuid.uuid4().hex[:12]}"
+    _files[file_id] = {'id': file_id, 'object': 'file', 'bytes': len(data), 'created_at': int(time.time()),
+                       'filename': filename, 'purpose': purpose, 'data': data}
+    return file_id
+
+
+def _file_meta(file_id):
+    return {k: v for k, v in _files[file_id].items() if k != 'data'}
+
+
+def _run_batch(batch_id):
+    """Answer every request line of a batch, one after another, then publish output and error files"""
+    batch = _batches[batch_id]
+    lines = [line for line in _files[batch['input_file_id']]['data'].decode('utf-8').splitlines() if line.strip()]
+    batch.update(status='in_progress', in_progress_at=int(time.time()))
+    batch['request_counts']['total'] = len(lines)
+    output, errors = [], []
+    for line in lines:
+        if batch['status'] == 'cancelling':
+            break
+        time.sleep(CONFIG['batch_ms_per_request'] / 1000.0)
+        request_line = json.loads(line)
+        body = request_line.get('body', {})
+        result = {'id': f"batch_req_{uuid.uuid4().hex[:12]}", 'custom_id': request_line.get('custom_id')}
+        if CONFIG['error_rate'] and _rng.random() < CONFIG['error_rate']:
+            result.update(response=None, error={'code': 'server_error', 'message': "Injected error from mock server"})
+            errors.append(result)
+            batch['request_counts']['failed'] += 1
+            continue
+        messages = body.get('messages', [])
+        json_mode = (body.get('response_format') or {}).get('type') == 'json_object'
+        invalid = json_mode_error(messages, json_mode)
+        if invalid:
+            result.update(response={'status_code': 400, 'request_id': uuid.uuid4().hex, 'body': {'error': invalid}},
+                          error=None)
+            output.append(result)
+            batch['request_counts']['failed'] += 1
+            continue
+        content = canned_content(detect_component(messages), messages, json_mode)
+        completion = _completion(f"chatcmpl-mock-{uuid.uuid4().hex[:12]}", body.get('model', 'gpt-4o-mini'),
+                                 int(time.time()), content, _usage(messages, content))
+        result.update(response={'status_code': 200, 'request_id': uuid.uuid4().hex, 'body': completion}, error=None)
+        output.append(result)
+        batch['request_counts']['completed'] += 1
+    to_file = lambda rows: ''.join(json.dumps(r) + '\n' for r in rows).encode('utf-8')
+    batch['output_file_id'] = _store_file(f"{batch_id}_output.jsonl", to_file(output), 'batch_output')
+    if errors:
+        batch['error_file_id'] = _store_file(f"{batch_id}_errors.jsonl", to_file(errors), 'batch_output')
+    if batch['status'] == 'cancelling':
+        batch.update(status='cancelled', cancelled_at=int(time.time()))
+    else:
+        batch.update(status='completed', completed_at=int(time.time()))
+
+
+@app.route('/v1/files', methods=['POST'])
+def upload_file():
+    upload = request.files['file']
+    file_id = _store_file(upload.filename, upload.read(), request.form.get('purpose', 'batch'))
+    return jsonify(_file_meta(file_id))
+
+
+@app.route('/v1/files/<file_id>', methods=['GET'])
+def get_file(file_id):
+    if file_id not in _files:
+        return jsonify({'error': {'message': f"No such file {file_id}", 'type': 'invalid_request_error'}}), 404
+    return jsonify(_file_meta(file_id))
+
+
+@app.route('/v1/files/<file_id>/content', methods=['GET'])
+def get_file_content(file_id):
+    if file_id not in _files:
+        return jsonify({'error': {'message': f"No such file {file_id}", 'type': 'invalid_request_error'}}), 404
+    return Response(_files[file_id]['data'], mimetype='application/octet-stream')
+
+
+@app.route('/v1/batches', methods=['POST'])
+def create_batch():
+    body = request.get_json(force=True)
+    if body.get('input_file_id') not in _files:
+        return jsonify({'error': {'message': "input_file_id not found", 'type': 'invalid_request_error'}}), 400
+    batch_id = f"batch_mock_{uuid.uuid4().hex[:12]}"
+    _batches[batch_id] = {
+        'id': batch_id, 'object': 'batch', 'endpoint': body.get('endpoint'), 'errors': None,
+        'input_file_id': body['input_file_id'], 'completion_window': body.get('completion_window', '24h'),
+        'status': 'validating', 'output_file_id': None, 'error_file_id': None, 'created_at': int(time.time()),
+        'in_progress_at': None, 'completed_at': None, 'cancelled_at': None, 'metadata': body.get('metadata'),
+        'request_counts': {'total': 0, 'completed': 0, 'failed': 0}
+    }
+    threading.Thread(target=_run_batch, args=(batch_id,), daemon=True).start()
+    return jsonify(_batches[batch_id])
+
+
+@app.route('/v1/batches/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    if batch_id not in _batches:
+        return jsonify({'error': {'message': f"No such batch {batch_id}", 'type': 'invalid_request_error'}}), 404
+    return jsonify(_batches[batch_id])
+
+
+@app.route('/v1/batches/<batch_id>/cancel', methods=['POST'])
+def cancel_batch(batch_id):
+    if batch_id not in _batches:
+        return jsonify({'error': {'message': f"No such batch {batch_id}", 'type': 'invalid_request_error'}}), 404
+    if _batches[batch_id]['status'] in ('validating', 'in_progress'):
+        _batches[batch_id]['status'] = 'cancelling'
+    return jsonify(_batches[batch_id])
+
+
+@app.route('/mock/config', methods=['GET', 'POST'])
+def mock_config():
+    """Inspect or change latency/error settings while a load test is running"""
+    if request.method == 'POST':
+        for key, value in (request.get_json(force=True) or {}).items():
+            if key in CONFIG:
+                CONFIG[key] = value
+    return jsonify(CONFIG)
+
+
+@app.route('/mock/stats', methods=['GET'])
+def mock_stats():
+    with _stats_lock:
+        return jsonify(json.loads(json.dumps(_stats)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local OpenAI chat.completions stand-in")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-dist', default=CONFIG['latency_dist'], choices=['fixed', 'uniform', 'normal', 'lognormal'])
+    parser.add_argument('--latency-ms', type=float, default=CONFIG['latency_ms'])
+    parser.add_argument('--latency-jitter', type=float, default=CONFIG['latency_jitter'])
+    parser.add_argument('--token-ms', type=float, default=CONFIG['token_ms'])
+    parser.add_argument('--error-rate', type=float, default=CONFIG['error_rate'])
+    parser.add_argument('--error-codes', default=','.join(str(c) for c in CONFIG['error_codes']))
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    CONFIG.update({
+        'latency_dist': args.latency_dist,
+        'latency_ms': args.latency_ms,
+        'latency_jitter': args.latency_jitter,
+        'token_ms': args.token_ms,
+        'error_rate': args.error_rate,
+        'error_codes': [int(c) for c in args.error_codes.split(',') if c],
+        'seed': args.seed
+    })
+    if args.seed is not None:
+        _rng.seed(args.seed)
+
+    print(f"Mock OpenAI server on http://localhost:{args.port}/v1 ({args.latency_dist} {args.latency_ms}ms, "
+          f"error rate {args.error_rate})")
+    app.run(host='0.0.0.0', port=args.port, threaded=True)
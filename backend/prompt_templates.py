@@ -256,7 +256,7 @@ Look for:
 - Psychotic symptoms
 - Substance abuse crisis
 
-Return:
+Respond with a JSON object in this format:
 {
     "crisis_level": "none|low|moderate|high|immediate",
     "specific_concerns": [],
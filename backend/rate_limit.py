@@ -0,0 +1,178 @@
+"""
+Rate Limiting for Mentra AI System
+Token buckets per user, per client IP and per AI component, checked before
+any OpenAI call; in-memory for one process or SQLite (WAL) shared by workers
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import registry
+
+RATE_LIMITED = registry.counter(
+    'mentra_rate_limited_total', "Requests refused with 429 by the first bucket that was empty", ('scope',))
+
+# scope -> default limit ("requests/seconds"; "off" disables). IP and whole-component
+# limits are off by default: the load tools and proxies funnel many users through one address,
+# and the right component quota depends on the OpenAI account tier.
+DEFAULT_LIMITS = {
+    'user': '30/60',
+    'ip': 'off',
+    'analyzer': 'off',
+    'matcher': 'off',
+    'briefing': '60/60'
+}
+
+
+def parse_limit(spec):
+    """'30/60' -> (refill per second, burst of 30); None when off"""
+    spec = (spec or '').strip().lower()
+    if not spec or spec in ('off', '0', 'none'):
+        return None
+    count, _, seconds = spec.partition('/')
+    count, seconds = float(count), float(seconds or 1)
+    return count / seconds, count
+
+
+class _TokenBuckets:
+    """
+    acquire([(scope, key), ...]) takes one token from every listed bucket or
+    from none of them. Scopes without a configured limit are ignored.
+    """
+
+    def __init__(self, limits):
+        self.limits = {scope: limit for scope, limit in limits.items() if limit}
+        self.allowed = 0
+        self.limited = {}
+
+    def acquire(self, keys, cost=1.0):
+        """None when allowed, else (scope, seconds until a token is available)"""
+        buckets = [(scope, key, self.limits[scope]) for scope, key in keys
+                   if scope in self.limits and key is not None]
+        if not buckets:
+            return None
+        refused = self._take(buckets, cost, time.time())
+        if refused is None:
+            self.allowed += 1
+        else:
+            self.limited[refused[0]] = self.limited.get(refused[0], 0) + 1
+            RATE_LIMITED.inc(refused[0])
+        return refused
+
+    @staticmethod
+    def _refill(limit, tokens, updated_at, now):
+        rate, burst = limit
+        return min(burst, tokens + max(now - updated_at, 0.0) * rate)
+
+    @staticmethod
+    def _plan(buckets, state, cost, now):
+        """New token counts for every bucket, or the refusal for the first one short"""
+        updated = {}
+        for scope, key, limit in buckets:
+            tokens, updated_at = state.get((scope, key), (limit[1], now))
+            tokens = _TokenBuckets._refill(limit, tokens, updated_at, now)
+            if tokens < cost:
+                return None, (scope, (cost - tokens) / limit[0])
+            updated[(scope, key)] = tokens - cost
+        return updated, None
+
+    def stats(self):
+        return {
+            'backend': self.backend,
+            'limits': {scope: f"{burst:g}/{burst / rate:g}s" for scope, (rate, burst) in self.limits.items()},
+            'allowed': self.allowed,
+            'limited': dict(self.limited)
+        }
+
+
+class InMemoryRateLimiter(_TokenBuckets):
+    """Buckets for a single process"""
+
+    backend = 'memory'
+
+    def __init__(self, limits, max_buckets=100000):
+        super().__init__(limits)
+        self.max_buckets = max_buckets
+        self._buckets = {}     # (scope, key) -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def _take(self, buckets, cost, now):
+        with self._lock:
+            updated, refused = self._plan(buckets, self._buckets, cost, now)
+            if refused:
+                return refused
+            for bucket_key, tokens in updated.items():
+                self._buckets[bucket_key] = (tokens, now)
+            if len(self._buckets) > self.max_buckets:
+                # A bucket idle long enough to refill completely is the same as no bucket
+                for bucket_key, (tokens, updated_at) in list(self._buckets.items()):
+                    limit = self.limits.get(bucket_key[0])
+                    if not limit or self._refill(limit, tokens, updated_at, now) >= limit[1]:
+                        del self._buckets[bucket_key]
+            return None
+
+
+class SQLiteRateLimiter(_TokenBuckets):
+    """Buckets in SQLite so every worker process sharing the file enforces one limit"""
+
+    backend = 'sqlite'
+
+    def __init__(self, limits, path='mentra.db'):
+        super().__init__(limits)
+        self.path = path
+        self._local = threading.local()
+        with sqlite3.connect(path, timeout=30) as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS rate_buckets (
+                scope TEXT NOT NULL,
+                bucket_key TEXT NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (scope, bucket_key))""")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Autocommit mode so the transaction below can be BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _take(self, buckets, cost, now):
+        conn = self._conn()
+        # Take the write lock up front so read-refill-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = {}
+            for scope, key, _ in buckets:
+                row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE scope = ? AND bucket_key = ?",
+                                   (scope, str(key))).fetchone()
+                if row:
+                    state[(scope, key)] = row
+            updated, refused = self._plan(buckets, state, cost, now)
+            if not refused:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rate_buckets (scope, bucket_key, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                    [(scope, str(key), tokens, now) for (scope, key), tokens in updated.items()])
+            conn.execute("COMMIT")
+            return refused
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def create_rate_limiter():
+    """
+    Limits from MENTRA_RATE_LIMIT_<SCOPE> ("requests/seconds" or "off") for scopes
+    user, ip, analyzer, matcher and briefing. Buckets are shared through SQLite
+    when MENTRA_USER_STORE=sqlite (MENTRA_DB_PATH), otherwise kept per process.
+    """
+    limits = {scope: parse_limit(os.getenv(f"MENTRA_RATE_LIMIT_{scope.upper()}", default))
+              for scope, default in DEFAULT_LIMITS.items()}
+    if os.getenv('MENTRA_USER_STORE', 'memory').lower() == 'sqlite':
+        return SQLiteRateLimiter(limits, os.getenv('MENTRA_DB_PATH', 'mentra.db'))
+    return InMemoryRateLimiter(limits)
@@ -0,0 +1,298 @@
+"""
+Similarity Group Formation Engine for Mentra AI System
+Deterministic, vectorized alternative to TraditionalGroupEngine: users become
+NumPy feature vectors, compatibility is computed in batch and groups are
+grown greedily under the 4-8 size rule and a severity-mismatch limit
+"""
+
+import zlib
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from user_store import URGENCY_LEVELS
+
+SEVERITY_LEVELS = {'mild': 1, 'moderate': 2, 'severe': 3}
+
+
+def user_concerns(user):
+    """concern -> (confidence, severity rank) from whatever analysis the user carries"""
+    concerns = {}
+
+    def add(name, details):
+        key = str(name).strip().lower()
+        if not isinstance(details, dict):
+            # A bare concern name never overrides one that came with analysis details
+            if key in concerns:
+                return
+            details = {}
+        severity = details.get('severity') or details.get('severity_level') or 'moderate'
+        entry = (float(details.get('confidence', 1.0) or 0.0), SEVERITY_LEVELS.get(severity, 2))
+        if key not in concerns or entry > concerns[key]:
+            concerns[key] = entry
+
+    for analysis in user.get('conversation_analysis') or []:
+        for name, details in (analysis.get('detected_concerns') or {}).items():
+            add(name, details)
+    primary = user.get('primary_concern')
+    if isinstance(primary, dict):
+        for name, details in primary.items():
+            add(name, details)
+    elif isinstance(primary, (list, tuple)):
+        for name in primary:
+            add(name, None)
+    elif primary:
+        add(primary, None)
+    return concerns
+
+
+def _user_themes(user):
+    themes = []
+    for analysis in user.get('conversation_analysis') or []:
+        themes.extend(analysis.get('key_themes') or [])
+    final = user.get('final_analysis') or {}
+    themes.extend(final.get('key_themes') or [])
+    return themes
+
+
+class SimilarityGroupEngine:
+    """
+    Vectorized group formation.
+
+    Each user is encoded as [concern weights | hashed key_themes], L2-normalised.
+    Compatibility between two users is their cosine similarity minus penalties for
+    severity and urgency distance; pairs further apart in severity than
+    max_severity_gap are never grouped. Users are blocked by primary concern, and
+    within a block groups are grown greedily by best mean compatibility.
+    """
+
+    def __init__(self, min_size=4, max_size=8, target_size=6, max_severity_gap=1,
+                 severity_penalty=0.15, urgency_penalty=0.1, theme_dims=64, theme_weight=0.5,
+                 block_size=1024):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_size = target_size
+        self.max_severity_gap = max_severity_gap
+        self.severity_penalty = severity_penalty
+        self.urgency_penalty = urgency_penalty
+        self.theme_dims = theme_dims
+        self.theme_weight = theme_weight
+        self.block_size = block_size
+
+    def encode(self, user_profiles):
+        """
+        Build the feature matrix.
+        Returns (X, severity, urgency, primary, vocab) where X is float32 (N x D).
+        """
+        vocab = {}
+        rows, cols, vals = [], [], []
+        n = len(user_profiles)
+        severity = np.full(n, 2, dtype=np.int8)
+        urgency = np.zeros(n, dtype=np.int8)
+        primary = np.full(n, -1, dtype=np.int32)
+
+        theme_rows, theme_cols = [], []
+        for i, user in enumerate(user_profiles):
+            concerns = user_concerns(user)
+            best = None
+            for name, (confidence, sev) in concerns.items():
+                col = vocab.setdefault(name, len(vocab))
+                weight = max(confidence, 0.05) * (0.5 + sev / 6.0)
+                rows.append(i)
+                cols.append(col)
+                vals.append(weight)
+                if best is None or weight > best[0]:
+                    best = (weight, col)
+            if concerns:
+                severity[i] = max(sev for _, sev in concerns.values())
+                primary[i] = best[1]
+            level = user.get('urgency_level')
+            levels = [level] + [a.get('urgency_level') for a in user.get('conversation_analysis') or []]
+            ranks = [URGENCY_LEVELS.index(l) for l in levels if l in URGENCY_LEVELS]
+            urgency[i] = max(ranks) if ranks else 0
+            for theme in _user_themes(user):
+                theme_rows.append(i)
+                theme_cols.append(zlib.crc32(str(theme).lower().encode('utf-8')) % self.theme_dims)
+
+        concern_part = np.zeros((n, max(len(vocab), 1)), dtype=np.float32)
+        if rows:
+            np.add.at(concern_part, (np.array(rows), np.array(cols)), np.array(vals, dtype=np.float32))
+        theme_part = np.zeros((n, self.theme_dims), dtype=np.float32)
+        if theme_rows:
+            np.add.at(theme_part, (np.array(theme_rows), np.array(theme_cols)), 1.0)
+
+        X = np.hstack([self._normalise(concern_part), self.theme_weight * self._normalise(theme_part)])
+        return self._normalise(X), severity, urgency, primary, vocab
+
+    @staticmethod
+    def _normalise(M):
+        norms = np.linalg.norm(M, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return M / norms
+
+    def compatibility(self, X, severity, urgency):
+        """Pairwise compatibility matrix for one block; infeasible pairs are -inf"""
+        sev = severity.astype(np.float32)
+        urg = urgency.astype(np.float32)
+        sev_gap = np.abs(sev[:, None] - sev[None, :])
+        C = X @ X.T
+        C -= self.severity_penalty * sev_gap
+        C -= self.urgency_penalty * np.abs(urg[:, None] - urg[None, :])
+        C[sev_gap > self.max_severity_gap] = -np.inf
+        np.fill_diagonal(C, -np.inf)
+        return C
+
+    def form_groups(self, user_profiles):
+        return self.partition(user_profiles)[0]
+
+    def partition(self, user_profiles):
+        """
+        Returns (groups, unassigned user_ids). Every group keeps the 4-8 size rule and
+        the severity limit; users that fit no group are returned unassigned.
+        """
+        user_profiles = list(user_profiles)
+        if not user_profiles:
+            return [], []
+        X, severity, urgency, primary, vocab = self.encode(user_profiles)
+        names = {col: name for name, col in vocab.items()}
+
+        # Block by primary concern; oversized blocks are cut after sorting by severity/urgency
+        blocks = defaultdict(list)
+        for i, col in enumerate(primary):
+            blocks[int(col)].append(i)
+
+        groups, leftovers = [], []
+        for col in sorted(blocks, key=lambda c: names.get(c, 'general')):
+            idx = np.array(blocks[col])
+            order = np.lexsort((urgency[idx], severity[idx]))
+            idx = idx[order]
+            for start in range(0, len(idx), self.block_size):
+                block = idx[start:start + self.block_size]
+                # Never leave a sliver block too small to form a group on its own
+                if 0 < len(idx) - (start + self.block_size) < self.min_size:
+                    block = idx[start:]
+                formed, rest = self._grow_groups(block, X, severity, urgency)
+                groups.extend(formed)
+                leftovers.extend(rest)
+                if len(block) > self.block_size:
+                    break
+
+        groups, stragglers = self._place_leftovers(groups, leftovers, X, severity)
+        formed, unassigned = self._group_stragglers(stragglers, X, severity, urgency)
+        groups.extend(formed)
+
+        return ([self._build_group(members, n, user_profiles, X, severity, primary, names)
+                 for n, members in enumerate(groups, 1)],
+                [user_profiles[i]['user_id'] for i in unassigned])
+
+    def _group_stragglers(self, stragglers, X, severity, urgency):
+        """
+        Form groups across concerns from users no block could place, one severity
+        window at a time (fullest window first). Returns (groups, still unplaced).
+        """
+        groups, rest = [], list(stragglers)
+        while len(rest) >= self.min_size:
+            windows = [[i for i in rest if low <= severity[i] <= low + self.max_severity_gap]
+                       for low in sorted({int(severity[i]) for i in rest})]
+            window = max(windows, key=len)
+            if len(window) < self.min_size:
+                break
+            formed, _ = self._grow_groups(np.array(window), X, severity, urgency)
+            if not formed:
+                break
+            groups.extend(formed)
+            taken = {i for group in formed for i in group}
+            rest = [i for i in rest if i not in taken]
+        return groups, rest
+
+    def _grow_groups(self, block, X, severity, urgency):
+        """Greedy growth inside one block. Returns (groups as index lists, leftover indices)."""
+        n = len(block)
+        if n < self.min_size:
+            return [], list(block)
+        C = self.compatibility(X[block], severity[block], urgency[block])
+        available = np.ones(n, dtype=bool)
+
+        # Spread members evenly: enough groups to keep every group within max_size
+        n_groups = max(-(-n // self.max_size), round(n / self.target_size))
+        n_groups = min(n_groups, n // self.min_size)
+        sizes = [n // n_groups + (1 if g < n % n_groups else 0) for g in range(n_groups)]
+
+        groups, leftovers = [], []
+        # Most urgent, most severe members seed first so they get the best matches
+        seed_order = np.lexsort((-severity[block], -urgency[block]))
+        for size in sizes:
+            seeds = seed_order[available[seed_order]]
+            if len(seeds) == 0:
+                break
+            seed = seeds[0]
+            members = [seed]
+            available[seed] = False
+            score = C[seed].copy()
+            while len(members) < size:
+                candidate_scores = np.where(available, score, -np.inf)
+                best = int(np.argmax(candidate_scores))
+                if not np.isfinite(candidate_scores[best]):
+                    break
+                members.append(best)
+                available[best] = False
+                # Running sum keeps the mean compatibility to all current members
+                score += C[best]
+            if len(members) >= self.min_size:
+                groups.append([int(block[m]) for m in members])
+            else:
+                leftovers.extend(int(block[m]) for m in members)
+        leftovers.extend(int(block[m]) for m in np.flatnonzero(available))
+        return groups, leftovers
+
+    def _place_leftovers(self, groups, leftovers, X, severity):
+        """Put leftovers into the most compatible group with capacity and a compatible severity range"""
+        if not leftovers or not groups:
+            return groups, list(leftovers)
+        centroids = np.stack([X[g].mean(axis=0) for g in groups])
+        sizes = np.array([len(g) for g in groups])
+        sev_min = np.array([severity[g].min() for g in groups])
+        sev_max = np.array([severity[g].max() for g in groups])
+        scores = X[leftovers] @ centroids.T
+
+        stragglers = []
+        for row, i in enumerate(leftovers):
+            feasible = ((sizes < self.max_size)
+                        & (np.maximum(sev_max, severity[i]) - np.minimum(sev_min, severity[i]) <= self.max_severity_gap))
+            candidate = np.where(feasible, scores[row], -np.inf)
+            best = int(np.argmax(candidate))
+            if not np.isfinite(candidate[best]):
+                stragglers.append(i)
+                continue
+            groups[best].append(i)
+            sizes[best] += 1
+            sev_min[best] = min(sev_min[best], severity[i])
+            sev_max[best] = max(sev_max[best], severity[i])
+        return groups, stragglers
+
+    def _build_group(self, members, n, user_profiles, X, severity, primary, names):
+        V = X[members]
+        k = len(members)
+        if k > 1:
+            S = V @ V.T
+            cohesion = float((S.sum() - np.trace(S)) / (k * (k - 1)))
+        else:
+            cohesion = 0.0
+        focus_col = np.bincount(primary[members][primary[members] >= 0]).argmax() if (primary[members] >= 0).any() else -1
+        focus = names.get(int(focus_col), 'general')
+        users = [user_profiles[m] for m in members]
+        inverse_severity = {v: k for k, v in SEVERITY_LEVELS.items()}
+        return {
+            'id': f"group_sim_{focus}_{n}",
+            'name': f"{focus.replace('_', ' ').title()} Support Group {n}",
+            'members': [u['user_id'] for u in users],
+            'primary_focus': focus,
+            'reasoning': "Matched by concern, severity, urgency and theme similarity",
+            'cohesion_score': round(min(max(cohesion, 0.0), 1.0), 3),
+            'severity_range': [inverse_severity[int(severity[members].min())],
+                               inverse_severity[int(severity[members].max())]],
+            'created_at': datetime.utcnow().isoformat(),
+            'status': 'forming',
+            'formation_method': 'similarity'
+        }
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for resumable thread re-analysis (batch_reanalysis.py)
+Run: python -m pytest -q test_batch_reanalysis.py
+"""
+
+import json
+
+import pytest
+
+from batch_reanalysis import ReanalysisRun, ResultLog, chunked, read_threads
+
+
+class FakeAnalyzer:
+    """score_thread stand-in that fails for threads whose first message says so"""
+
+    def __init__(self, model='gpt-test'):
+        self.model = model
+        self.scored = []
+
+    def score_thread(self, messages, component=None, system_prompt=None):
+        if messages[0]['content'] == 'fail':
+            raise RuntimeError("upstream unavailable")
+        self.scored.append(messages[0]['content'])
+        return {'urgency_level': 'normal', 'seen': messages[0]['content']}
+
+
+def write_lines(path, lines):
+    path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+
+
+def thread(thread_id, content):
+    return json.dumps({'thread_id': thread_id, 'messages': [{'role': 'user', 'content': content}]})
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_result_log_drops_a_truncated_last_record(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    path.write_bytes(b'{"line": 1}\n{"line": 2}\n{"line": 3, "analy')
+    log = ResultLog(str(path))
+    assert log.done == {1, 2}
+    log.write({'line': 3})
+    log.close()
+    assert [r['line'] for r in read_results(path)] == [1, 2, 3]
+
+
+def test_read_threads_logs_unusable_lines(tmp_path):
+    source = tmp_path / 'threads.jsonl'
+    write_lines(source, [
+        thread('t1', 'hello'),
+        '{not json',
+        '[1, 2]',
+        '',
+        json.dumps({'user_id': 'u1', 'chat_history': []}),
+        json.dumps({'user_id': 'u2', 'chat_history': [{'role': 'user', 'content': 'hi'}]})
+    ])
+    log = ResultLog(str(tmp_path / 'results.jsonl'))
+    threads = list(read_threads(str(source), log))
+    log.close()
+
+    assert [(line, thread_id) for line, thread_id, _ in threads] == [(1, 't1'), (6, 'u2')]
+    errors = {r['line']: r['error'] for r in read_results(tmp_path / 'results.jsonl')}
+    assert set(errors) == {2, 3, 5}
+    assert errors[2].startswith("invalid JSON") and errors[5] == "no messages to analyse"
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 3)) == []
+
+
+def test_run_direct_resumes_and_retries_failures(tmp_path):
+    source, output = tmp_path / 'threads.jsonl', tmp_path / 'results.jsonl'
+    write_lines(source, [thread('t1', 'a'), thread('t2', 'fail'), thread('t3', 'c')])
+
+    analyzer = FakeAnalyzer()
+    summary = ReanalysisRun(analyzer, str(source), str(output), 'current', 'prompt').run_direct(2)
+    assert summary['written'] == 2 and summary['failed'] == 1
+    assert sorted(r['thread_id'] for r in read_results(output)) == ['t1', 't3']
+
+    # The failed thread was not written, so a rerun picks up only that one
+    write_lines(source, [thread('t1', 'a'), thread('t2', 'b'), thread('t3', 'c')])
+    analyzer = FakeAnalyzer()
+    summary = ReanalysisRun(analyzer, str(source), str(output), 'current', 'prompt').run_direct(2)
+    assert analyzer.scored == ['b']
+    assert summary['resumed_from'] == 2 and summary['total_in_output'] == 3
+
+
+def test_changed_prompt_or_model_refuses_to_mix_results(tmp_path):
+    source, output = tmp_path / 'threads.jsonl', tmp_path / 'results.jsonl'
+    write_lines(source, [thread('t1', 'a')])
+    ReanalysisRun(FakeAnalyzer(), str(source), str(output), 'v1', 'prompt one').run_direct(1)
+
+    with pytest.raises(SystemExit):
+        ReanalysisRun(FakeAnalyzer(), str(source), str(output), 'v2', 'prompt two')
+    with pytest.raises(SystemExit):
+        ReanalysisRun(FakeAnalyzer('other-model'), str(source), str(output), 'v1', 'prompt one')
+
+    run = ReanalysisRun(FakeAnalyzer(), str(source), str(output), 'v2', 'prompt two', restart=True)
+    assert run.resumed == 0 and run.run_direct(1)['written'] == 1
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the background briefing store (briefing_store.py)
+Run: python -m pytest -q test_briefing_store.py
+"""
+
+import threading
+
+import pytest
+
+from briefing_store import BriefingError, BriefingStore, group_fingerprint
+
+
+class CountingGenerator:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, group):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        return {'group_id': group['id'], 'briefing_text': f"briefing {n}", 'generated_at': str(n)}
+
+
+def make_group(group_id, members, focus='anxiety'):
+    return {
+        'id': group_id,
+        'members': list(members),
+        'primary_focus': focus,
+        'member_details': [{'user_id': m, 'primary_concern': focus, 'urgency_level': 'normal'} for m in members]
+    }
+
+
+def formation(run, member_sets):
+    return [make_group(f"group_ai_{run}_{i}", members) for i, members in enumerate(member_sets)]
+
+
+def drain(store):
+    for future in list(store._inflight.values()):
+        future.result()
+
+
+def test_reformation_with_same_members_reuses_briefings():
+    generate = CountingGenerator()
+    store = BriefingStore(generate)
+    member_sets = [[f"u{g}_{m}" for m in range(5)] for g in range(7)]
+
+    for run in range(3):
+        store.schedule_all(formation(run, member_sets))
+        drain(store)
+
+    assert generate.calls == 7
+    briefing, meta = store.get(formation(3, member_sets)[0])
+    assert briefing['group_id'] == 'group_ai_3_0'
+    assert not meta['stale'] and generate.calls == 7
+
+
+def test_changed_members_serve_stale_copy_while_regenerating():
+    generate = CountingGenerator()
+    store = BriefingStore(generate)
+    group = make_group('g1', ['a', 'b', 'c', 'd'])
+    first, meta = store.get(group)
+    assert not meta['stale'] and first['briefing_text'] == 'briefing 1'
+
+    grown = make_group('g1', ['a', 'b', 'c', 'd', 'e'])
+    briefing, meta = store.get(grown)
+    assert meta['stale'] and briefing['briefing_text'] == 'briefing 1'
+    drain(store)
+
+    briefing, meta = store.get(grown)
+    assert not meta['stale'] and briefing['briefing_text'] == 'briefing 2'
+    # The superseded briefing is dropped once no group uses it
+    assert set(store._entries) == {group_fingerprint(grown)}
+
+
+def test_schedule_all_forgets_groups_that_are_gone():
+    store = BriefingStore(CountingGenerator())
+    store.schedule_all(formation(0, [['a', 'b', 'c', 'd'], ['e', 'f', 'g', 'h']]))
+    drain(store)
+    store.schedule_all(formation(1, [['a', 'b', 'c', 'd']]))
+    drain(store)
+    assert store.stats()['stored'] == 1
+
+
+def test_invalidate_regenerates_on_next_get():
+    generate = CountingGenerator()
+    store = BriefingStore(generate)
+    group = make_group('g1', ['a', 'b', 'c', 'd'])
+    store.get(group)
+    store.invalidate()
+
+    briefing, meta = store.get(group)
+    assert meta['stale'] and briefing['briefing_text'] == 'briefing 1'
+    drain(store)
+    assert store.get(group)[0]['briefing_text'] == 'briefing 2'
+
+
+def test_failed_generation_is_not_stored():
+    outcomes = [{'error': 'upstream timeout'}]
+    generate = CountingGenerator()
+    store = BriefingStore(lambda group: outcomes.pop(0) if outcomes else generate(group))
+    group = make_group('g1', ['a', 'b', 'c', 'd'])
+
+    with pytest.raises(BriefingError, match='upstream timeout'):
+        store.get(group)
+    assert store.stats()['stored'] == 0 and store.stats()['failed'] == 1
+
+    briefing, meta = store.get(group)
+    assert briefing['briefing_text'] == 'briefing 1' and not meta['stale']
@@ -39,6 +39,8 @@ def test_conversation():
                     "message": message,
                     "user_id": USER_ID
                 },
+                # Lets the backend answer a retried turn without calling OpenAI again
+                headers={"Idempotency-Key": f"{USER_ID}-{i}"},
                 timeout=30
             )
             
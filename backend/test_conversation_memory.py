@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Unit tests for rolling conversation memory and prompt trimming (conversation_memory.py)
+Run: python -m pytest -q test_conversation_memory.py
+"""
+
+from conversation_memory import ConversationMemory, message_tokens, trim_to_budget, unsummarized
+from user_store import InMemoryUserStore
+
+
+def turns(start, end):
+    return [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': f"message {i}"} for i in range(start, end)]
+
+
+def make_memory(summarize=None):
+    store = InMemoryUserStore()
+    summarize = summarize or (lambda previous, messages: f"{previous or ''}[{len(messages)} folded]")
+    return ConversationMemory(store, summarize, keep_recent=4, max_messages=8), store
+
+
+def test_trim_keeps_the_newest_messages_that_fit():
+    messages = turns(0, 10)
+    budget = sum(message_tokens(m) for m in messages[-3:])
+    assert trim_to_budget(messages, budget) == messages[-3:]
+    assert trim_to_budget(messages, budget - 1) == messages[-2:]
+    # The newest message is kept even when it alone is over budget
+    assert trim_to_budget(messages, 0) == messages[-1:]
+    assert trim_to_budget(None, 100) == []
+
+
+def test_short_history_is_not_folded():
+    memory, store = make_memory()
+    user = store.upsert({'user_id': 'u1', 'chat_history': turns(0, 8)})
+    assert memory.maybe_fold(user) is None
+
+
+def test_fold_summarises_but_keeps_the_full_transcript():
+    memory, store = make_memory()
+    user = store.upsert({'user_id': 'u1', 'chat_history': turns(0, 10)})
+    assert memory.maybe_fold(user).result() == "[6 folded]"
+
+    stored = store.get('u1')
+    assert stored['chat_history'] == turns(0, 10)
+    assert stored['memory_folded'] == 6 and stored['memory_summary'] == "[6 folded]"
+    assert unsummarized(stored) == turns(6, 10)
+
+
+def test_later_folds_build_on_the_previous_summary():
+    memory, store = make_memory()
+    user = store.upsert({'user_id': 'u1', 'chat_history': turns(0, 10)})
+    memory.maybe_fold(user).result()
+    store.update('u1', lambda u: u['chat_history'].extend(turns(10, 16)))
+
+    user = store.get('u1')
+    assert memory.maybe_fold(user).result() == "[6 folded][6 folded]"
+    stored = store.get('u1')
+    assert stored['memory_folded'] == 12 and len(stored['chat_history']) == 16
+    assert unsummarized(stored) == turns(12, 16)
+
+
+def test_fold_is_dropped_if_another_fold_won_the_race():
+    memory, store = make_memory()
+    user = store.upsert({'user_id': 'u1', 'chat_history': turns(0, 10)})
+    store.update('u1', lambda u: u.update(memory_folded=2, memory_summary="other worker"))
+    assert memory.maybe_fold(user).result() is None
+    assert store.get('u1')['memory_summary'] == "other worker"
+
+
+def test_records_folded_before_memory_folded_existed():
+    # Older records dropped the folded turns, so the summary covers nothing still in the history
+    user = {'user_id': 'u1', 'chat_history': turns(6, 10), 'memory_summary': "earlier"}
+    assert unsummarized(user) == turns(6, 10)
+
+
+def test_record_turn_bounds_the_token_log():
+    memory, _ = make_memory()
+    memory.log_size = 3
+    user = {'user_id': 'u1'}
+    for n in range(5):
+        memory.record_turn(user, {'estimated': n, 'billed': n})
+    assert user['turn_count'] == 5
+    assert [entry['turn'] for entry in user['prompt_token_log']] == [3, 4, 5]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Unit tests for crisis screening and urgency bookkeeping (backend_api.py)
+Run: python -m pytest -q test_crisis_screener.py
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('MENTRA_JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+
+import backend_api
+from backend_api import CrisisScreener, _apply_crisis, _raise_urgency
+
+
+class JSONModeGateway:
+    """Stands in for the gateway; like the OpenAI API, rejects JSON mode unless a message mentions JSON"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def complete_async(self, component, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get('response_format', {}).get('type') == 'json_object':
+            if not any('json' in m['content'].lower() for m in kwargs['messages']):
+                raise ValueError("'messages' must contain the word 'json' in some form")
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=10, total_tokens=20)
+        message = SimpleNamespace(content=json.dumps(self.reply))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_json_mode_messages_mention_json():
+    messages = CrisisScreener().build_messages("I want to die")
+    assert any('json' in m['content'].lower() for m in messages)
+
+
+def test_assessment_uses_the_model_verdict(monkeypatch):
+    monkeypatch.setattr(backend_api.llm_cache, 'get', lambda key: None)
+    screener = CrisisScreener()
+    screener.gateway = JSONModeGateway({'crisis_level': 'low', 'specific_concerns': []})
+    assessment = asyncio.run(screener.assess("cutting back on coffee, test 41", ['cutting']))
+
+    assert screener.gateway.calls[0]['response_format'] == {'type': 'json_object'}
+    assert assessment['crisis_level'] == 'low'
+    assert not assessment.get('unverified')
+    assert not assessment['escalate']
+
+
+def test_keyword_screen_gates_assessment():
+    screener = CrisisScreener()
+    assert screener.keyword_screen("work has been stressful") == []
+    assert screener.keyword_screen("Sometimes I want to die") == ['want to die']
+
+
+def test_escalation_raises_urgency_to_crisis():
+    user = {'urgency_level': 'elevated'}
+    _apply_crisis(user, {'crisis_level': 'high', 'escalate': True})
+    assert user['urgency_level'] == 'crisis'
+
+
+def test_completed_intake_never_lowers_urgency():
+    user = {}
+    _apply_crisis(user, {'crisis_level': 'immediate', 'escalate': True})
+    _raise_urgency(user, 'elevated')
+    assert user['urgency_level'] == 'crisis'
+
+    user = {'urgency_level': 'normal'}
+    _raise_urgency(user, 'high')
+    assert user['urgency_level'] == 'high'
+
+    user = {'urgency_level': 'high'}
+    _raise_urgency(user, None)
+    assert user['urgency_level'] == 'high'
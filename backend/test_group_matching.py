@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit tests for sharded AI group formation and its merge step (backend_api.py)
+Run: python -m pytest -q test_group_matching.py
+"""
+
+import os
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('MENTRA_JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+
+import backend_api
+from backend_api import GroupMatchingAI
+from group_placement import IncrementalGroupPlacer
+from group_store import InMemoryGroupStore
+from user_store import InMemoryUserStore
+
+
+def summary(user_id, concern, urgency='normal'):
+    return {'user_id': user_id, 'primary_concerns': [concern], 'urgency': urgency, 'key_themes': []}
+
+
+def recommended(*member_ids, focus='anxiety'):
+    return {'group_name': f"{focus} group", 'member_ids': list(member_ids), 'primary_focus': focus,
+            'reasoning': "shared concern", 'estimated_cohesion': 0.8}
+
+
+def merge(results, summaries):
+    return GroupMatchingAI()._merge_shards(results, summaries)
+
+
+def test_plan_shards_keeps_concerns_together_within_budget():
+    matcher = GroupMatchingAI(shard_token_budget=400)
+    summaries = [summary(f"a{i}", 'anxiety') for i in range(12)] + [summary(f"g{i}", 'grief') for i in range(12)]
+    shards = matcher._plan_shards(summaries)
+    assert len(shards) > 1
+    assert sorted(s['user_id'] for shard in shards for s in shard) == sorted(s['user_id'] for s in summaries)
+
+
+def test_merge_drops_unknown_and_duplicate_ids_and_splits_oversized_groups():
+    summaries = [summary(f"a{i}", 'anxiety') for i in range(12)]
+    results = [
+        {'recommended_groups': [recommended(*[f"a{i}" for i in range(10)], 'ghost')]},
+        {'recommended_groups': [recommended('a0', 'a10', 'a11', 'a9')]}
+    ]
+    merged = merge(results, summaries)
+    members = [m for g in merged['recommended_groups'] for m in g['member_ids']]
+    assert sorted(members) == sorted(s['user_id'] for s in summaries)
+    assert all(4 <= len(g['member_ids']) <= 8 for g in merged['recommended_groups'])
+    assert merged['unassigned_ids'] == []
+
+
+def test_leftovers_join_a_compatible_group_with_room():
+    summaries = [summary(f"a{i}", 'anxiety') for i in range(6)]
+    merged = merge([{'recommended_groups': [recommended('a0', 'a1', 'a2', 'a3')]}], summaries)
+    assert [len(g['member_ids']) for g in merged['recommended_groups']] == [6]
+
+
+def test_stragglers_too_few_for_a_group_are_unassigned():
+    summaries = ([summary(f"a{i}", 'anxiety') for i in range(8)]
+                 + [summary(f"g{i}", 'grief') for i in range(3)]
+                 + [summary(f"s{i}", 'stress') for i in range(5)])
+    merged = merge([{'recommended_groups': [recommended(*[f"a{i}" for i in range(8)])]},
+                    {'recommended_groups': []}], summaries)
+    assert all(4 <= len(g['member_ids']) <= 8 for g in merged['recommended_groups'])
+    assert sorted(merged['unassigned_ids']) == ['g0', 'g1', 'g2']
+    stress = [g for g in merged['recommended_groups'] if g['primary_focus'] == 'stress']
+    assert len(stress) == 1 and len(stress[0]['member_ids']) == 5
+
+
+def test_failed_shards_are_reported():
+    summaries = [summary(f"a{i}", 'anxiety') for i in range(4)]
+    assert merge([{'error': 'timeout'}], summaries) == {'error': 'timeout'}
+    merged = merge([{'error': 'timeout'}, {'recommended_groups': [recommended('a0', 'a1', 'a2', 'a3')]}], summaries)
+    assert merged['shard_errors'] == ['timeout'] and len(merged['recommended_groups']) == 1
+
+
+def test_form_all_groups_waitlists_ai_stragglers(monkeypatch):
+    users = InMemoryUserStore()
+    for i in range(4):
+        users.upsert({'user_id': f"a{i}", 'primary_concern': 'anxiety'})
+    for i in range(2):
+        users.upsert({'user_id': f"g{i}", 'primary_concern': 'grief'})
+    store = InMemoryGroupStore()
+    placer = IncrementalGroupPlacer(store, users=users)
+    monkeypatch.setattr(backend_api, 'users_db', users)
+    monkeypatch.setattr(backend_api, 'groups_db', store)
+    monkeypatch.setattr(backend_api, 'group_placer', placer)
+    monkeypatch.setattr(backend_api, 'briefing_store', SimpleNamespace(schedule_all=lambda groups: None))
+    monkeypatch.setattr(backend_api.group_matcher, 'optimize_group_formation', lambda profiles: {
+        'recommended_groups': [recommended('a0', 'a1', 'a2', 'a3')],
+        'unassigned_ids': ['g0', 'g1'],
+        'overall_strategy': "by concern"
+    })
+
+    groups, method, _ = backend_api._form_all_groups('ai')
+    assert method == 'ai_optimized' and [len(g['members']) for g in groups] == [4]
+    assert placer.stats()['queued'] == {'grief': 2}
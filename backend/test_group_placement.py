@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Unit tests for incremental group placement (group_placement.py)
+Run: python -m pytest -q test_group_placement.py
+"""
+
+import random
+
+import pytest
+
+from group_placement import IncrementalGroupPlacer
+from group_store import InMemoryGroupStore, SQLiteGroupStore
+from similarity_engine import SEVERITY_LEVELS
+from user_store import InMemoryUserStore, SQLiteUserStore
+
+
+def make_user(user_id, severity, concern='anxiety'):
+    return {
+        'user_id': user_id,
+        'primary_concern': {concern: {'confidence': 0.9, 'severity': severity}}
+    }
+
+
+def make_placer():
+    users = InMemoryUserStore()
+    return IncrementalGroupPlacer(InMemoryGroupStore(), users=users), users
+
+
+def place_all(placer, users, profiles):
+    outcomes = []
+    for user in profiles:
+        users.upsert(user)
+        outcomes.append(placer.place(user))
+    return outcomes
+
+
+def severity_of(users, user_id):
+    concern = users.get(user_id)['primary_concern']
+    return SEVERITY_LEVELS[next(iter(concern.values()))['severity']]
+
+
+def assert_valid(placer, users):
+    for group in placer.store.all():
+        ranks = [severity_of(users, uid) for uid in group['members']]
+        assert len(group['members']) <= placer.max_size, group
+        assert max(ranks) - min(ranks) <= placer.max_severity_gap, group
+
+
+def test_queue_never_mixes_mild_and_severe():
+    placer, users = make_placer()
+    profiles = [make_user('a', 'mild'), make_user('b', 'severe'), make_user('c', 'mild'),
+                make_user('d', 'severe'), make_user('e', 'moderate')]
+    outcomes = place_all(placer, users, profiles)
+    assert [o['action'] for o in outcomes] == ['queued'] * 5
+    assert len(placer.store) == 0
+
+
+def test_group_opens_from_one_severity_window():
+    placer, users = make_placer()
+    profiles = [make_user('a', 'mild'), make_user('b', 'severe'), make_user('c', 'mild'),
+                make_user('d', 'severe'), make_user('e', 'moderate'), make_user('f', 'mild')]
+    outcome = place_all(placer, users, profiles)[-1]
+    assert outcome['action'] == 'formed'
+    group = placer.get_group(outcome['group_id'])
+    assert sorted(group['members']) == ['a', 'c', 'e', 'f']
+    assert_valid(placer, users)
+
+
+def test_open_group_only_accepts_compatible_severity():
+    placer, users = make_placer()
+    outcomes = place_all(placer, users, [make_user(f"m{i}", 'mild') for i in range(4)])
+    group_id = outcomes[-1]['group_id']
+    assert place_all(placer, users, [make_user('s', 'severe')])[0]['action'] == 'queued'
+    joined = place_all(placer, users, [make_user('n', 'moderate')])[0]
+    assert joined['action'] == 'placed' and joined['group_id'] == group_id
+
+
+def test_random_stream_keeps_every_group_valid():
+    rng = random.Random(11)
+    placer, users = make_placer()
+    profiles = [make_user(f"u{i}", rng.choice(list(SEVERITY_LEVELS)), rng.choice(['anxiety', 'grief']))
+                for i in range(400)]
+    place_all(placer, users, profiles)
+    assert_valid(placer, users)
+    members = [uid for g in placer.store.all() for uid in g['members']]
+    assert len(members) == len(set(members))
+
+
+def test_replace_groups_waitlists_ungrouped_users():
+    placer, users = make_placer()
+    waiting = [make_user(f"w{i}", 'severe') for i in range(3)]
+    for user in waiting:
+        users.upsert(user)
+    placer.replace_groups([], waitlist=waiting)
+    assert placer.stats()['queued'] == {'anxiety': 3}
+
+    outcome = place_all(placer, users, [make_user('late', 'severe')])[0]
+    assert outcome['action'] == 'formed'
+    assert len(placer.get_group(outcome['group_id'])['members']) == 4
+
+
+def shared_placers(path):
+    """Two placers sharing SQLite stores, as two worker processes would"""
+    placers = []
+    for _ in range(2):
+        users = SQLiteUserStore(path)
+        users.all = lambda: pytest.fail("placement scanned the user store")
+        placers.append(IncrementalGroupPlacer(SQLiteGroupStore(path), users=users))
+    return placers
+
+
+def test_workers_share_groups_and_queues(tmp_path):
+    first, second = shared_placers(str(tmp_path / 'mentra.db'))
+    profiles = [make_user(f"u{i}", 'moderate') for i in range(5)]
+    for i, user in enumerate(profiles):
+        placer = (first, second)[i % 2]
+        placer.users.upsert(user)
+        outcome = placer.place(user)
+    assert outcome['action'] == 'placed'
+    group = second.get_group(outcome['group_id'])
+    assert sorted(group['members']) == ['u0', 'u1', 'u2', 'u3', 'u4']
+    assert first.get_group(outcome['group_id'])['members'] == group['members']
+
+
+def test_queues_persist_ids_and_severities_only(tmp_path):
+    first, _ = shared_placers(str(tmp_path / 'mentra.db'))
+    user = dict(make_user('u1', 'severe'), chat_history=[{'role': 'user', 'content': 'private'}])
+    first.users.upsert(user)
+    first.place(user)
+    assert first.store.get_state('pending') == {'anxiety': [['u1', 3]]}
+
+
+def test_sync_reloads_only_changed_groups(tmp_path):
+    first, second = shared_placers(str(tmp_path / 'mentra.db'))
+    for i in range(8):
+        user = make_user(f"u{i}", ['mild', 'severe'][i // 4], ['anxiety', 'grief'][i // 4])
+        first.users.upsert(user)
+        first.place(user)
+    second.group_for('u0')
+
+    reloaded = []
+    changes_since = second.store.changes_since
+    second.store.changes_since = lambda generation: reloaded.append(changes_since(generation)) or reloaded[-1]
+    joiner = make_user('late', 'mild')
+    first.users.upsert(joiner)
+    group_id = first.place(joiner)['group_id']
+
+    assert len(first.store) == 2
+    assert second.group_for('late') == group_id
+    groups, replaced = reloaded[-1]
+    assert not replaced and [g['id'] for g in groups] == [group_id]
+
+
+def test_requeued_user_waits_in_one_queue_and_joins_one_group():
+    placer, users = make_placer()
+    # Intake finished as anxiety, then a later turn re-analysed the user as grief
+    place_all(placer, users, [make_user('x', 'mild', 'anxiety'), make_user('x', 'mild', 'grief')])
+    assert placer.stats()['queued'] == {'grief': 1}
+
+    place_all(placer, users, [make_user(f"a{i}", 'mild', 'anxiety') for i in range(3)])
+    place_all(placer, users, [make_user(f"g{i}", 'mild', 'grief') for i in range(3)])
+    place_all(placer, users, [make_user(f"a{i}", 'mild', 'anxiety') for i in range(3, 5)])
+    memberships = [g['id'] for g in placer.store.all() if 'x' in g['members']]
+    assert len(memberships) == 1 and placer.group_for('x') == memberships[0]
+    assert all('x' not in queue for queue in placer._pending.values())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Idempotency-Key replay (idempotency.py)
+Run: python -m pytest -q test_idempotency.py
+"""
+
+import asyncio
+
+import pytest
+
+import idempotency
+from idempotency import IdempotencyStore, request_fingerprint
+
+
+class Handler:
+    """Counts runs and answers with the queued (payload, status) outcomes, the last one repeating"""
+
+    def __init__(self, *outcomes, delay=0):
+        self.outcomes = list(outcomes) or [({'success': True}, 200)]
+        self.delay = delay
+        self.runs = 0
+
+    async def __call__(self):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        return self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+
+
+def run(store, key, fingerprint, handler, scope='analyze-message'):
+    return asyncio.run(store.run(scope, key, fingerprint, handler))
+
+
+def test_fingerprint_depends_on_the_request():
+    assert request_fingerprint('u1', 'hi', 1) == request_fingerprint('u1', 'hi', 1)
+    assert request_fingerprint('u1', 'hi', 1) != request_fingerprint('u1', 'hi', 2)
+
+
+def test_retry_with_the_same_key_replays_the_response():
+    store, handler = IdempotencyStore(), Handler(({'reply': 'first'}, 200), ({'reply': 'second'}, 200))
+    assert run(store, 'k1', 'f', handler) == ({'reply': 'first'}, 200, False)
+    assert run(store, 'k1', 'f', handler) == ({'reply': 'first'}, 200, True)
+    assert handler.runs == 1
+    # Other keys, other routes and keyless requests run for real
+    assert run(store, 'k2', 'f', handler)[2] is False
+    assert run(store, 'k1', 'f', handler, scope='briefing')[2] is False
+    assert run(store, None, 'f', handler)[2] is False
+    assert handler.runs == 4 and store.stats()['replayed'] == 1
+
+
+def test_reusing_a_key_for_another_request_is_refused():
+    store, handler = IdempotencyStore(), Handler()
+    run(store, 'k1', 'f1', handler)
+    payload, status, duplicate = run(store, 'k1', 'f2', handler)
+    assert status == 422 and payload['success'] is False and duplicate is False
+    assert handler.runs == 1 and store.stats()['key_mismatches'] == 1
+
+
+def test_retry_while_the_original_runs_waits_for_its_result():
+    store, handler = IdempotencyStore(), Handler(delay=0.02)
+
+    async def main():
+        return await asyncio.gather(store.run('s', 'k1', 'f', handler), store.run('s', 'k1', 'f', handler))
+
+    assert asyncio.run(main()) == [({'success': True}, 200, False), ({'success': True}, 200, True)]
+    assert handler.runs == 1 and store.stats()['attached_in_flight'] == 1
+
+
+def test_different_request_on_an_in_flight_key_conflicts():
+    store, handler = IdempotencyStore(), Handler(delay=0.02)
+
+    async def main():
+        return await asyncio.gather(store.run('s', 'k1', 'f1', handler), store.run('s', 'k1', 'f2', handler))
+
+    first, second = asyncio.run(main())
+    assert first[1] == 200 and second[1] == 422
+    assert handler.runs == 1 and store.stats()['in_flight'] == 0
+
+
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_failures_and_refusals_are_not_kept(status):
+    store, handler = IdempotencyStore(), Handler(({'success': False}, status), ({'success': True}, 200))
+    assert run(store, 'k1', 'f', handler)[1] == status
+    assert run(store, 'k1', 'f', handler) == ({'success': True}, 200, False)
+
+
+def test_handler_errors_are_not_kept():
+    store = IdempotencyStore()
+
+    async def broken():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        run(store, 'k1', 'f', broken)
+    assert store.stats()['entries'] == 0 and store.stats()['in_flight'] == 0
+
+
+def test_entries_expire_and_are_evicted(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(idempotency.time, 'monotonic', lambda: now[0])
+    store, handler = IdempotencyStore(max_entries=2, ttl_seconds=60), Handler()
+    for key in ('a', 'b', 'c'):
+        run(store, key, 'f', handler)
+    assert store.stats()['evictions'] == 1
+    assert run(store, 'a', 'f', handler)[2] is False
+
+    now[0] += 61
+    assert run(store, 'c', 'f', handler)[2] is False
+    assert handler.runs == 5
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the persistent job queue and runner (job_queue.py)
+Run: python -m pytest -q test_job_queue.py
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue, JobRunner
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.db'), max_attempts=2, lease_seconds=0.2)
+
+
+def expire_leases(queue):
+    queue._conn().execute("UPDATE jobs SET lease_until = ? WHERE status = 'running'", (time.time() - 1,))
+
+
+def wait_for(queue, job_id, statuses=('succeeded', 'failed', 'cancelled'), timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job stuck in {queue.get(job_id)['status']}")
+
+
+def test_submit_dedupes_active_jobs(queue):
+    job, created = queue.submit('briefing', {'group_id': 'g1'}, dedupe_key='briefing:g1')
+    again, created_again = queue.submit('briefing', {'group_id': 'g1'}, dedupe_key='briefing:g1')
+    assert created and not created_again and again['job_id'] == job['job_id']
+
+
+def test_claim_hands_a_job_to_one_worker(queue):
+    job, _ = queue.submit('briefing', {})
+    claimed = queue.claim('A')
+    assert claimed['job_id'] == job['job_id'] and claimed['worker'] == 'A'
+    assert claimed['lease_until'] > time.time()
+    assert queue.claim('B') is None
+
+
+def test_live_lease_is_not_recovered(queue):
+    queue.submit('briefing', {})
+    queue.claim('A')
+    assert queue.recover() == 0
+
+
+def test_expired_lease_is_requeued_even_if_the_pid_is_alive(queue):
+    # After a container restart the old worker's pid usually belongs to a live process
+    job, _ = queue.submit('briefing', {})
+    queue.claim(f"{os.getpid()}:previous")
+    expire_leases(queue)
+    assert queue.recover() == 1
+    assert queue.get(job['job_id'])['status'] == 'queued'
+    assert queue.claim('B')['attempts'] == 2
+
+
+def test_renewed_lease_survives(queue):
+    job, _ = queue.submit('briefing', {})
+    queue.claim('A')
+    time.sleep(0.15)
+    assert queue.renew([job['job_id']], 'A') == [job['job_id']]
+    time.sleep(0.1)
+    assert queue.recover() == 0
+    assert queue.renew([job['job_id']], 'B') == []
+
+
+def test_job_fails_after_max_attempts(queue):
+    job, _ = queue.submit('briefing', {})
+    for _ in range(2):
+        queue.claim('A')
+        expire_leases(queue)
+        queue.recover()
+    failed = queue.get(job['job_id'])
+    assert failed['status'] == 'failed' and 'lease expired' in failed['error']
+
+
+def test_lost_lease_does_not_overwrite_the_new_claim(queue):
+    job, _ = queue.submit('briefing', {})
+    queue.claim('A')
+    expire_leases(queue)
+    queue.recover()
+    queue.claim('B')
+
+    assert not queue.finish(job['job_id'], 'succeeded', {'from': 'A'}, worker='A')
+    assert queue.cancel_requested(job['job_id'], 'A')
+    assert not queue.cancel_requested(job['job_id'], 'B')
+    assert queue.finish(job['job_id'], 'succeeded', {'from': 'B'}, worker='B')
+    assert queue.get(job['job_id'])['result'] == {'from': 'B'}
+
+
+def test_runner_runs_and_renews_jobs(queue):
+    release = threading.Event()
+
+    def slow(params, handle):
+        release.wait(5)
+        return {'echo': params['n']}
+
+    runner = JobRunner(queue, {'slow': slow}, max_workers=1, worker='runner').start()
+    job, _ = queue.submit('slow', {'n': 3})
+    runner.wake()
+    wait_for(queue, job['job_id'], ('running',))
+    # Several lease periods pass while the handler blocks; the runner keeps the claim
+    time.sleep(0.5)
+    assert queue.recover() == 0
+    release.set()
+    done = wait_for(queue, job['job_id'])
+    assert done['status'] == 'succeeded' and done['result'] == {'echo': 3}
+
+
+def test_runner_stops_cancelled_jobs(queue):
+    started = threading.Event()
+
+    def looping(params, handle):
+        started.set()
+        while True:
+            handle.check_cancelled()
+            time.sleep(0.01)
+
+    runner = JobRunner(queue, {'loop': looping}, max_workers=1, worker='runner').start()
+    job, _ = queue.submit('loop', {})
+    runner.wake()
+    assert started.wait(5)
+    queue.cancel(job['job_id'])
+    assert wait_for(queue, job['job_id'])['status'] == 'cancelled'
+
+
+class Flaky(Exception):
+    pass
+
+
+def test_runner_retries_retryable_errors_until_max_attempts(queue):
+    calls = []
+
+    def flaky(params, handle):
+        calls.append(handle.job_id)
+        if len(calls) < params['fail_times'] + 1:
+            raise Flaky("upstream unavailable")
+        return {'ok': True}
+
+    runner = JobRunner(queue, {'flaky': flaky}, max_workers=1, worker='runner', retryable=(Flaky,)).start()
+    recovered, _ = queue.submit('flaky', {'fail_times': 1})
+    runner.wake()
+    done = wait_for(queue, recovered['job_id'])
+    assert done['status'] == 'succeeded' and done['attempts'] == 2
+
+    calls.clear()
+    exhausted, _ = queue.submit('flaky', {'fail_times': 5})
+    runner.wake()
+    failed = wait_for(queue, exhausted['job_id'])
+    assert failed['status'] == 'failed' and failed['attempts'] == 2 and 'upstream unavailable' in failed['error']
+    assert runner.stats()['finished_here']['retried'] == 2
+
+
+def test_runner_fails_other_errors_at_once(queue):
+    def broken(params, handle):
+        raise LookupError("Group not found")
+
+    runner = JobRunner(queue, {'broken': broken}, max_workers=1, worker='runner', retryable=(Flaky,)).start()
+    job, _ = queue.submit('broken', {})
+    runner.wake()
+    failed = wait_for(queue, job['job_id'])
+    assert failed['status'] == 'failed' and failed['attempts'] == 1
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the orjson-backed JSON provider and compact prompt JSON (json_provider.py)
+Run: python -m pytest -q test_json_provider.py
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from quart import Quart
+
+import json_provider
+from json_provider import FastJSONProvider, compact_json
+
+SAMPLE = {
+    'user_id': 'u1',
+    'reply_to_user': 'Ça va? 😀 "quoted"',
+    'scores': {'anxiety': 0.75, 'stress': 1},
+    'themes': ['sleep', 'work'],
+    'turns': {1: 'first'},
+    'crisis': None
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def encoder(request, monkeypatch):
+    """Runs a test with orjson (skipped when it is not installed) and with the stdlib fallback"""
+    if request.param == 'orjson':
+        if json_provider.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    return request.param
+
+
+def make_app():
+    app = Quart(__name__)
+    app.json = FastJSONProvider(app)
+    return app
+
+
+def test_compact_json_has_no_spaces_and_keeps_unicode(encoder):
+    encoded = compact_json(SAMPLE)
+    assert encoded == json.dumps(SAMPLE, separators=(',', ':'), ensure_ascii=False)
+    assert 'Ça va? 😀' in encoded
+
+
+def test_compact_json_falls_back_to_str_for_other_types(encoder):
+    moment = datetime(2026, 1, 2, 3, 4, 5)
+    assert compact_json({'at': moment, 'ids': {'a'}}) == '{"at":"2026-01-02 03:04:05","ids":"{\'a\'}"}'
+
+
+def test_provider_round_trips_and_keeps_key_order(encoder):
+    provider = make_app().json
+    encoded = provider.dumps({'b': 1, 'a': [1, 2]})
+    assert list(json.loads(encoded)) == ['b', 'a']
+    assert provider.loads(encoded) == {'b': 1, 'a': [1, 2]}
+    assert provider.loads(b'{"x": "\\u00e9"}') == {'x': 'é'}
+
+
+def test_provider_formats_dates_like_quart(encoder):
+    moment = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert json.loads(make_app().json.dumps({'at': moment})) == {'at': 'Fri, 02 Jan 2026 03:04:05 GMT'}
+
+
+def test_keyword_arguments_use_the_stdlib_path(encoder):
+    assert make_app().json.dumps({'b': 1, 'a': 2}, sort_keys=True, indent=1) == '{\n "a": 2,\n "b": 1\n}'
+
+
+def test_responses_are_compact_utf8_with_a_trailing_newline(encoder):
+    app = make_app()
+
+    async def respond():
+        async with app.app_context():
+            response = app.json.response(SAMPLE)
+            return response.mimetype, await response.get_data()
+
+    mimetype, body = asyncio.run(respond())
+    assert mimetype == 'application/json'
+    assert body.endswith(b'\n') and body.count(b'\n') == 1
+    assert json.loads(body) == json.loads(json.dumps(SAMPLE))
+    assert 'Ça va? 😀'.encode('utf-8') in body and b': ' not in body
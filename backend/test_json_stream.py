@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Unit tests for incremental JSON parsing (json_stream.py)
+Run: python -m pytest -q test_json_stream.py
+"""
+
+import json
+
+import pytest
+
+from json_stream import JSONFieldStreamer, JSONRecordStream
+
+
+def stream_field(text, chunk_size, field='reply_to_user'):
+    streamer = JSONFieldStreamer(field)
+    out = ''.join(streamer.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size))
+    assert streamer.text == text
+    return out
+
+
+@pytest.mark.parametrize('ensure_ascii', [False, True])
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1000])
+@pytest.mark.parametrize('obj', [
+    {"reply_to_user": "Hi \"there\" é 😀\n\\ /\t"},
+    {"status": "interviewing", "reply_to_user": "How long has this been going on?"},
+    {"reply_to_user": ""},
+])
+def test_field_text_matches_json_loads(obj, chunk_size, ensure_ascii):
+    # ensure_ascii splits escapes and surrogate pairs (😀) across chunks
+    text = json.dumps(obj, ensure_ascii=ensure_ascii)
+    assert stream_field(text, chunk_size) == obj['reply_to_user']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4])
+def test_only_the_top_level_field_is_captured(chunk_size):
+    obj = {
+        "gathered_info": {"reply_to_user": "nested"},
+        "echo": "reply_to_user",
+        "history": ["reply_to_user", {"reply_to_user": "deeper"}],
+        "reply_to_user": "top"
+    }
+    assert stream_field(json.dumps(obj), chunk_size) == "top"
+
+
+def test_whitespace_and_escaped_keys():
+    assert stream_field('{\n  "status" : "x" ,\n  "reply_to_user" :  "hey"\n}', 1) == "hey"
+    assert stream_field('{"reply_\\u0074o_user": "escaped key"}', 1) == "escaped key"
+
+
+def test_missing_field_yields_nothing():
+    assert stream_field(json.dumps({"status": "complete", "final_analysis": {}}), 3) == ''
+
+
+def stream_records(body, chunk_size, **kwargs):
+    stream = JSONRecordStream(**kwargs)
+    records = []
+    for i in range(0, len(body), chunk_size):
+        records.extend(stream.feed(body[i:i + chunk_size]))
+    return records + stream.close()
+
+
+RECORDS = [{"thread_id": "t1", "text": "caf\u00e9 \U0001F600"}, {"thread_id": "t2", "text": "x"}]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 10000])
+@pytest.mark.parametrize('body', [
+    b"".join(json.dumps(r, ensure_ascii=False).encode() + b"\n" for r in RECORDS),
+    b"\n\n" + b"\r\n\n".join(json.dumps(r, ensure_ascii=False).encode() for r in RECORDS),
+    b"  \n [" + b" ,\n".join(json.dumps(r, ensure_ascii=False).encode() for r in RECORDS) + b"]\n",
+], ids=['ndjson', 'ndjson-no-final-newline', 'array'])
+def test_records_survive_any_chunking(body, chunk_size):
+    # Chunk sizes 1 and 2 split the multibyte UTF-8 sequences
+    assert stream_records(body, chunk_size) == [(1, RECORDS[0], None), (2, RECORDS[1], None)]
+
+
+def test_mode_is_decided_by_the_first_non_blank_byte():
+    stream = JSONRecordStream()
+    assert stream.feed(b"  \n") == [] and stream.mode is None
+    stream.feed(b"[")
+    assert stream.mode == 'array'
+    assert stream_records(b" \n\n ", 1) == []
+
+
+def test_bad_ndjson_line_loses_only_that_line():
+    records = stream_records(b'{"a": 1}\n{"a": \n[1, 2]\n{"a": 2}\n', 3)
+    assert [(n, r) for n, r, _ in records] == [(1, {"a": 1}), (2, None), (3, None), (4, {"a": 2})]
+    assert records[1][2].startswith("invalid JSON") and records[2][2] == "record must be a JSON object"
+
+
+def test_array_syntax_error_ends_the_stream():
+    stream = JSONRecordStream()
+    records = stream.feed(b'[{"a": 1} {"a": 2}, {"a": 3}]')
+    assert records[0] == (1, {"a": 1}, None)
+    assert records[1][2].startswith("expected ','")
+    assert stream.finished and stream.feed(b'{"a": 4}') == [] and stream.close() == []
+
+
+@pytest.mark.parametrize('chunk_size', [1, 10000])
+def test_trailing_comma_in_array_is_a_syntax_error(chunk_size):
+    records = stream_records(b'[{"a": 1}, {"a": 2},\n]', chunk_size)
+    assert records[:2] == [(1, {"a": 1}, None), (2, {"a": 2}, None)]
+    assert records[2] == (3, None, "invalid JSON: trailing comma before ']'") and len(records) == 3
+    assert stream_records(b'[ ]', 1) == []
+
+
+def test_truncated_array_reports_the_cut():
+    records = stream_records(b'[{"a": 1}, {"a": ', 4)
+    assert records[0] == (1, {"a": 1}, None)
+    assert records[1][1] is None and records[1][2].startswith("invalid JSON")
+
+
+def test_unclosed_array_reports_the_cut():
+    assert stream_records(b'[{"a": 1},', 4) == [(1, {"a": 1}, None),
+                                               (2, None, "body ended before the array was closed")]
+
+
+@pytest.mark.parametrize('chunk_size', [3, 64])
+def test_oversized_ndjson_line_is_reported_once(chunk_size):
+    big = json.dumps({"text": "x" * 100}).encode()
+    records = stream_records(b'{"a": 1}\n' + big + b'\n{"a": 2}\n', chunk_size, max_record_bytes=50)
+    assert [(n, r) for n, r, _ in records] == [(1, {"a": 1}), (2, None), (3, {"a": 2})]
+    assert "larger than 50 bytes" in records[1][2]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local lexicon pre-classifier (lexicon.py)
+Run: python -m pytest -q test_lexicon.py
+"""
+
+import pytest
+
+from lexicon import LexiconClassifier
+
+HISTORY = [
+    {"role": "user", "content": "I've been feeling really anxious lately"},
+    {"role": "assistant", "content": "On a scale of 1-10, how much is this affecting your daily life?"}
+]
+
+
+@pytest.fixture(scope='module')
+def lexicon():
+    return LexiconClassifier()
+
+
+def test_bare_greeting_on_first_turn(lexicon):
+    assert lexicon.classify("hey there!")['kind'] == 'greeting'
+
+
+def test_greeting_mid_intake_goes_to_model(lexicon):
+    assert lexicon.classify("hello", HISTORY)['kind'] == 'content'
+
+
+def test_nonsense_opening_message_is_invalid(lexicon):
+    for message in ("asdf qwerty", "sdfg hjkl", "???", "skibidi toilet"):
+        assert lexicon.classify(message)['kind'] == 'invalid', message
+
+
+@pytest.mark.parametrize('message', ["7", "10/10", "hmmm", "asdf", "...", "😢😢", "我很难过"])
+def test_short_answers_mid_intake_go_to_model(lexicon, message):
+    assert lexicon.classify(message, HISTORY)['kind'] == 'content'
+
+
+@pytest.mark.parametrize('message', ["7", "10/10", "😢😢", "我很难过", "estoy muy triste últimamente"])
+def test_digits_emoji_and_other_scripts_are_content(lexicon, message):
+    assert lexicon.classify(message)['kind'] == 'content'
+
+
+def test_concern_phrases_become_hints(lexicon):
+    screen = lexicon.classify("I keep having panic attacks and can't sleep")
+    assert screen['kind'] == 'content'
+    assert screen['concerns']
+    assert all(phrases for phrases in screen['concerns'].values())
+
+
+def test_only_invalid_turns_get_the_invalid_template(lexicon):
+    reply = lexicon.templated_response('invalid')
+    assert reply['status'] == 'invalid' and reply['answered_locally']
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the content-addressed LLM response cache (llm_cache.py)
+Run: python -m pytest -q test_llm_cache.py
+"""
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMResponseCache, make_cache_key
+
+MESSAGES = [{'role': 'system', 'content': 'You are a helper'}, {'role': 'user', 'content': 'hello'}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, 'time', clock)
+    return clock
+
+
+def test_key_covers_everything_that_shapes_the_completion():
+    key = make_cache_key('gpt-4o', MESSAGES, 0.3)
+    assert key == make_cache_key('gpt-4o', [dict(m) for m in MESSAGES], 0.3)
+    assert key != make_cache_key('gpt-4o-mini', MESSAGES, 0.3)
+    assert key != make_cache_key('gpt-4o', MESSAGES, 0.7)
+    assert key != make_cache_key('gpt-4o', MESSAGES[1:], 0.3)
+    assert key != make_cache_key('gpt-4o', MESSAGES, 0.3, {'type': 'json_object'})
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = LLMResponseCache(ttl_seconds=60)
+    cache.set('k', {'reply': 'hi'})
+    clock.now += 60
+    assert cache.get('k') == {'reply': 'hi'}
+    clock.now += 1
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMResponseCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_disk_tier_survives_a_restart_and_refills_memory(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    LLMResponseCache(disk_path=path).set('k', {'reply': 'hi'}, component='analyzer')
+
+    cache = LLMResponseCache(disk_path=path, ttl_seconds=60)
+    assert cache.get('k') == {'reply': 'hi'}
+    assert cache.get('k') == {'reply': 'hi'}
+    stats = cache.stats()
+    assert stats['disk_hits'] == 1 and stats['hits'] == 1 and stats['hit_ratio'] == 1.0
+
+    # Expiry applies to disk entries too
+    clock.now += 61
+    assert LLMResponseCache(disk_path=path, ttl_seconds=60).get('k') is None
+
+
+def test_invalidate_by_component_in_both_tiers(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = LLMResponseCache(disk_path=path)
+    cache.set('a', 1, component='analyzer')
+    cache.set('b', 2, component='analyzer')
+    cache.set('m', 3, component='matcher')
+
+    assert cache.invalidate('analyzer') == 2
+    assert cache.get('a') is None and cache.get('m') == 3
+    restarted = LLMResponseCache(disk_path=path)
+    assert restarted.get('b') is None and restarted.get('m') == 3
+
+    assert cache.invalidate() == 1
+    assert LLMResponseCache(disk_path=path).get('m') is None
+
+
+def test_create_llm_cache_reads_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv('MENTRA_LLM_CACHE_SIZE', '5')
+    monkeypatch.setenv('MENTRA_LLM_CACHE_TTL', '10')
+    monkeypatch.setenv('MENTRA_LLM_CACHE_PATH', str(tmp_path / 'cache.db'))
+    cache = llm_cache.create_llm_cache()
+    assert (cache.max_entries, cache.ttl_seconds, cache.disk_path) == (5, 10.0, str(tmp_path / 'cache.db'))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the LLM gateway: retries, deadlines and circuit breaking (llm_gateway.py)
+Run: python -m pytest -q test_llm_gateway.py
+"""
+
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailableError
+
+REQUEST = httpx.Request('POST', 'http://upstream/v1/chat/completions')
+
+
+def server_error():
+    return openai.InternalServerError("boom", response=httpx.Response(500, request=REQUEST), body=None)
+
+
+def rate_limited(retry_after):
+    response = httpx.Response(429, request=REQUEST, headers={'retry-after': str(retry_after)})
+    return openai.RateLimitError("slow down", response=response, body=None)
+
+
+def bad_request():
+    return openai.BadRequestError("bad", response=httpx.Response(400, request=REQUEST), body=None)
+
+
+class FakeClient:
+    """Stands in for OpenAI(): raises the queued outcomes in order, then answers"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+        self.max_retries = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, timeout=None, max_retries=None):
+        self.timeouts.append(timeout)
+        self.max_retries.append(max_retries)
+        return self
+
+    def create(self, **kwargs):
+        if self.outcomes:
+            raise self.outcomes.pop(0)
+        return SimpleNamespace(content='ok', usage=None)
+
+
+def make_gateway(client, **kwargs):
+    kwargs.setdefault('backoff_base', 0.001)
+    return LLMGateway(client, hedge_components=(), **kwargs)
+
+
+def test_retryable_errors_are_retried():
+    client = FakeClient(server_error(), openai.APIConnectionError(request=REQUEST))
+    gateway = make_gateway(client)
+    assert gateway.complete('analyzer', model='m', messages=[]).content == 'ok'
+    assert len(client.timeouts) == 3
+    assert gateway.stats()['components']['analyzer']['retries'] == 2
+
+
+def test_retries_stop_after_max_retries():
+    client = FakeClient(*[server_error() for _ in range(5)])
+    gateway = make_gateway(client, max_retries=1)
+    with pytest.raises(openai.InternalServerError):
+        gateway.complete('analyzer', model='m', messages=[])
+    assert len(client.timeouts) == 2
+
+
+def test_client_errors_are_not_retried_and_do_not_trip_the_breaker():
+    client = FakeClient(bad_request())
+    gateway = make_gateway(client, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(openai.BadRequestError):
+        gateway.complete('analyzer', model='m', messages=[])
+    assert len(client.timeouts) == 1
+    assert gateway.breaker.state == 'closed'
+
+
+def test_retry_after_that_overruns_the_deadline_raises():
+    client = FakeClient(rate_limited(3))
+    gateway = make_gateway(client, deadlines={'analyzer': 0.5})
+    started = time.monotonic()
+    with pytest.raises(openai.RateLimitError):
+        gateway.complete('analyzer', model='m', messages=[])
+    assert time.monotonic() - started < 0.5
+    assert len(client.timeouts) == 1
+    # A 429 is back-pressure, not an unhealthy upstream
+    assert gateway.breaker.stats()['consecutive_failures'] == 0
+
+
+def test_attempt_timeout_is_what_is_left_of_the_deadline():
+    client = FakeClient()
+    gateway = make_gateway(client, deadlines={'memory': 2.0})
+    gateway.complete('memory', model='m', messages=[])
+    assert 1.5 < client.timeouts[0] <= 2.0
+    assert client.max_retries == [0]
+
+
+def test_open_circuit_fails_fast():
+    client = FakeClient(server_error(), server_error())
+    gateway = make_gateway(client, max_retries=0, breaker=CircuitBreaker(failure_threshold=2))
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            gateway.complete('analyzer', model='m', messages=[])
+    with pytest.raises(LLMUnavailableError):
+        gateway.complete('analyzer', model='m', messages=[])
+    assert len(client.timeouts) == 2
+    assert gateway.breaker.stats()['short_circuited'] == 1
+    # The refused call gave its scheduler slot back
+    assert gateway.scheduler.active == 0
+
+
+def test_breaker_lets_one_probe_through_after_the_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == 'half_open'
+    assert breaker.allow() and not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == 'open' and breaker.times_opened == 2
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_real_client_makes_one_request_per_attempt():
+    requests = []
+
+    def upstream(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(500, json={'error': {'message': 'boom'}})
+        return httpx.Response(200, json={
+            'id': 'c1', 'object': 'chat.completion', 'created': 0, 'model': 'm',
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'ok'}}]
+        })
+
+    client = openai.OpenAI(api_key='test', base_url='http://upstream/v1', max_retries=5,
+                           http_client=httpx.Client(transport=httpx.MockTransport(upstream)))
+    response = make_gateway(client, max_retries=1).complete('analyzer', model='m', messages=[])
+    assert response.choices[0].message.content == 'ok'
+    # The client's own max_retries is overridden; the single retry is the gateway's
+    assert len(requests) == 2
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the priority scheduler in front of upstream calls (llm_scheduler.py)
+Run: python -m pytest -q test_llm_scheduler.py
+"""
+
+import asyncio
+import threading
+import time
+
+from llm_scheduler import LLMScheduler, estimate_request_tokens, prioritized
+
+
+def test_estimate_request_tokens():
+    kwargs = {'messages': [{'role': 'user', 'content': 'x' * 400}, {'role': 'system', 'content': None}],
+              'max_tokens': 50}
+    assert estimate_request_tokens(kwargs) == 150
+    assert estimate_request_tokens({}) == 300
+
+
+def test_prioritized_only_raises_interactive_calls():
+    scheduler = LLMScheduler()
+    with prioritized('crisis'):
+        assert scheduler.priority_for('analyzer') == 'crisis'
+        assert scheduler.priority_for('memory') == 'batch'
+    assert scheduler.priority_for('analyzer') == 'interactive'
+    assert scheduler.priority_for('unknown') == 'batch'
+
+
+def grant_order(scheduler, components):
+    """Queue one waiter per component behind a held slot and record the order they are granted"""
+    holder = scheduler.acquire('analyzer', 1, 1)
+    order, threads = [], []
+
+    def wait(component):
+        ticket = scheduler.acquire(component, 1, 5)
+        order.append(component)
+        scheduler.release(ticket)
+
+    for component in components:
+        threads.append(threading.Thread(target=wait, args=(component,)))
+        threads[-1].start()
+        while sum(len(q) for q in scheduler._queues.values()) < len(threads):
+            time.sleep(0.001)
+    scheduler.release(holder)
+    for t in threads:
+        t.join()
+    return order
+
+
+def test_crisis_goes_first_and_batch_is_not_starved():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = grant_order(scheduler, ['reanalysis'] + ['analyzer'] * 12 + ['crisis'])
+    # Interactive outweighs batch 8:1, but the batch call still gets its turn mid-burst
+    assert order == ['crisis'] + ['analyzer'] * 8 + ['reanalysis'] + ['analyzer'] * 4
+
+
+def test_acquire_times_out_and_leaves_the_queue():
+    scheduler = LLMScheduler(max_concurrency=1)
+    held = scheduler.acquire('analyzer', 1, 1)
+    assert scheduler.acquire('memory', 1, 0.05) is None
+    stats = scheduler.stats()
+    assert stats['classes']['batch'] == dict(stats['classes']['batch'], queued=0, timed_out=1)
+    scheduler.release(held)
+    assert scheduler.acquire('memory', 1, 0.05) is not None
+
+
+def test_requests_per_minute_limit_delays_the_next_call():
+    scheduler = LLMScheduler(requests_per_minute=600)
+    for _ in range(600):
+        scheduler.release(scheduler.acquire('analyzer', 1, 1))
+    started = time.monotonic()
+    assert scheduler.acquire('analyzer', 1, 1) is not None
+    assert time.monotonic() - started >= 0.05
+
+
+def test_release_corrects_the_token_estimate():
+    scheduler = LLMScheduler(tokens_per_minute=1000)
+    ticket = scheduler.acquire('analyzer', 900, 1)
+    scheduler.release(ticket, used_tokens=100)
+    # The 800 unused tokens were given back, so this does not wait for a refill
+    started = time.monotonic()
+    assert scheduler.acquire('analyzer', 800, 1) is not None
+    assert time.monotonic() - started < 0.5
+
+
+def test_async_waiters_share_the_cap_with_threads():
+    scheduler = LLMScheduler(max_concurrency=1)
+    held = scheduler.acquire('analyzer', 1, 1)
+
+    async def main():
+        waiter = asyncio.ensure_future(scheduler.acquire_async('analyzer', 1, 5))
+        await asyncio.sleep(0.02)
+        assert not waiter.done()
+        scheduler.release(held)
+        ticket = await waiter
+        scheduler.release(ticket)
+        return await scheduler.acquire_async('memory', 1, 0.05)
+
+    assert asyncio.run(main()) is not None
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Prometheus metrics rendering (metrics.py) and the /metrics endpoint
+Run: python -m pytest -q test_metrics.py
+"""
+
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('MENTRA_JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+
+import pytest
+
+import backend_api
+from metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render_per_label_set():
+    registry = MetricsRegistry()
+    errors = registry.counter('app_errors_total', "Errors by type", ('type',))
+    errors.inc('timeout')
+    errors.inc('timeout', value=2)
+    errors.inc('say "hi"\n')
+    in_flight = registry.gauge('app_in_flight', "Requests in progress")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP app_errors_total Errors by type', '# TYPE app_errors_total counter']
+    assert 'app_errors_total{type="timeout"} 3' in lines
+    assert 'app_errors_total{type="say \\"hi\\"\\n"} 1' in lines
+    assert 'app_in_flight 1' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('app_seconds', "Latency", ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe('/x', value=value)
+
+    lines = registry.render().splitlines()
+    assert 'app_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 'app_seconds_bucket{route="/x",le="1"} 3' in lines
+    assert 'app_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'app_seconds_sum{route="/x"} 3.65' in lines
+    assert 'app_seconds_count{route="/x"} 4' in lines
+
+
+def test_histogram_timer_observes_its_block():
+    registry = MetricsRegistry()
+    latency = registry.histogram('app_seconds', "Latency")
+    with latency.time():
+        pass
+    assert 'app_seconds_count 1' in registry.render().splitlines()
+
+
+def test_wrong_label_count_is_an_error():
+    counter = MetricsRegistry().counter('app_total', "Calls", ('component',))
+    with pytest.raises(ValueError):
+        counter.inc()
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter('app_total', "Calls") is registry.counter('app_total', "Calls")
+
+
+def test_collectors_run_at_scrape_time_and_a_failing_one_is_skipped():
+    registry = MetricsRegistry()
+    state = {'hits': 1}
+
+    def broken():
+        raise RuntimeError("store unavailable")
+
+    registry.register_collector(broken)
+    registry.register_collector(lambda: [
+        ('app_cache_hits_total', 'counter', "Cache hits", [({'tier': 'memory'}, state['hits'])])])
+    assert 'app_cache_hits_total{tier="memory"} 1' in registry.render().splitlines()
+    state['hits'] = 5
+    assert 'app_cache_hits_total{tier="memory"} 5' in registry.render().splitlines()
+
+
+def test_metrics_endpoint_counts_requests_by_route_template():
+    async def scrape():
+        client = backend_api.app.test_client()
+        await client.get('/api/jobs/no-such-job')
+        response = await client.get('/metrics')
+        return response.status_code, response.headers['Content-Type'], await response.get_data(as_text=True)
+
+    status, content_type, body = asyncio.run(scrape())
+    assert status == 200 and content_type.startswith('text/plain; version=0.0.4')
+    lines = body.splitlines()
+    assert any(line.startswith('mentra_http_request_duration_seconds_count{route="/api/jobs/<job_id>",method="GET",status="404"}')
+               for line in lines)
+    assert '# TYPE mentra_llm_cache_lookups_total counter' in lines
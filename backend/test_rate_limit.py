@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the token-bucket rate limiters (rate_limit.py) and the 429 they produce
+Run: python -m pytest -q test_rate_limit.py
+"""
+
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('MENTRA_JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+
+import pytest
+
+import backend_api
+import rate_limit
+from rate_limit import InMemoryRateLimiter, SQLiteRateLimiter, parse_limit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_limiter(request, tmp_path):
+    def make(**limits):
+        limits = {scope: parse_limit(spec) for scope, spec in limits.items()}
+        if request.param == 'memory':
+            return InMemoryRateLimiter(limits)
+        return SQLiteRateLimiter(limits, str(tmp_path / 'limits.db'))
+    return make
+
+
+def test_parse_limit():
+    assert parse_limit('30/60') == (0.5, 30.0)
+    assert parse_limit('5') == (5.0, 5.0)
+    assert parse_limit('off') is None and parse_limit('') is None
+
+
+def test_burst_then_refill(make_limiter, clock):
+    limiter = make_limiter(user='3/60')
+    for _ in range(3):
+        assert limiter.acquire([('user', 'u1')]) is None
+    scope, wait = limiter.acquire([('user', 'u1')])
+    assert scope == 'user' and wait == pytest.approx(20.0)
+
+    clock.now += 19.0
+    assert limiter.acquire([('user', 'u1')]) is not None
+    clock.now += 1.0
+    assert limiter.acquire([('user', 'u1')]) is None
+    # Other keys have their own bucket
+    assert limiter.acquire([('user', 'u2')]) is None
+
+
+def test_refill_is_capped_at_the_burst(make_limiter, clock):
+    limiter = make_limiter(user='2/10')
+    clock.now += 3600
+    assert [limiter.acquire([('user', 'u1')]) for _ in range(3)][-1][0] == 'user'
+
+
+def test_all_buckets_or_none(make_limiter, clock):
+    limiter = make_limiter(user='5/60', analyzer='1/60')
+    assert limiter.acquire([('user', 'u1'), ('analyzer', '*')]) is None
+    assert limiter.acquire([('user', 'u1'), ('analyzer', '*')])[0] == 'analyzer'
+    # The refused call did not spend the user's token
+    assert limiter.stats()['allowed'] == 1
+    for _ in range(4):
+        assert limiter.acquire([('user', 'u1')]) is None
+
+
+def test_unlimited_scopes_and_missing_keys_are_ignored(make_limiter, clock):
+    limiter = make_limiter(user='1/60', ip='off')
+    for _ in range(3):
+        assert limiter.acquire([('ip', '10.0.0.1'), ('user', None)]) is None
+
+
+def test_sqlite_buckets_are_shared_between_limiters(tmp_path, clock):
+    path = str(tmp_path / 'limits.db')
+    first = SQLiteRateLimiter({'user': parse_limit('2/60')}, path)
+    second = SQLiteRateLimiter({'user': parse_limit('2/60')}, path)
+    assert first.acquire([('user', 'u1')]) is None
+    assert second.acquire([('user', 'u1')]) is None
+    assert first.acquire([('user', 'u1')])[0] == 'user'
+
+
+def test_exhausted_bucket_returns_429_with_retry_after(make_limiter, monkeypatch):
+    limiter = make_limiter(analyzer='1/30')
+    monkeypatch.setattr(backend_api, 'rate_limiter', limiter)
+    assert limiter.acquire([('analyzer', '*')]) is None
+
+    async def post():
+        client = backend_api.app.test_client()
+        return await client.post('/api/analyze-conversation', json={'messages': [{'role': 'user', 'content': 'hi'}]})
+
+    response = asyncio.run(post())
+    assert response.status_code == 429
+    assert 29 <= int(response.headers['Retry-After']) <= 30
+    payload = asyncio.run(response.get_json())
+    assert payload['error'] == 'rate_limited' and payload['scope'] == 'analyzer'
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the similarity group formation engine (similarity_engine.py)
+Run: python -m pytest -q test_similarity_engine.py
+"""
+
+import random
+
+from similarity_engine import SimilarityGroupEngine, SEVERITY_LEVELS, user_concerns
+
+CONCERNS = ['anxiety', 'depression', 'grief', 'stress']
+
+
+def make_user(user_id, severity, concern='anxiety'):
+    return {
+        'user_id': user_id,
+        'conversation_analysis': [{
+            'urgency_level': 'normal',
+            'detected_concerns': {concern: {'confidence': 0.9, 'severity': severity}}
+        }]
+    }
+
+
+def assert_valid(groups, users, engine):
+    severity = {u['user_id']: max(sev for _, sev in user_concerns(u).values()) for u in users}
+    for group in groups:
+        ranks = [severity[uid] for uid in group['members']]
+        assert engine.min_size <= len(group['members']) <= engine.max_size, group
+        assert max(ranks) - min(ranks) <= engine.max_severity_gap, group
+
+
+def test_stragglers_never_form_an_invalid_group():
+    engine = SimilarityGroupEngine()
+    users = [make_user(f"mild_{i}", 'mild') for i in range(3)] + \
+            [make_user(f"severe_{i}", 'severe') for i in range(3)]
+    groups, unassigned = engine.partition(users)
+    assert groups == []
+    assert sorted(unassigned) == sorted(u['user_id'] for u in users)
+
+
+def test_stragglers_are_grouped_by_severity_window():
+    engine = SimilarityGroupEngine()
+    users = [make_user(f"mild_{i}", 'mild') for i in range(4)] + \
+            [make_user(f"severe_{i}", 'severe') for i in range(3)]
+    groups, unassigned = engine.partition(users)
+    assert [g['severity_range'] for g in groups] == [['mild', 'mild']]
+    assert sorted(unassigned) == ['severe_0', 'severe_1', 'severe_2']
+
+
+def test_every_user_is_grouped_or_unassigned_and_groups_stay_valid():
+    rng = random.Random(7)
+    users = [make_user(f"u{i}", rng.choice(list(SEVERITY_LEVELS)), rng.choice(CONCERNS)) for i in range(500)]
+    engine = SimilarityGroupEngine()
+    groups, unassigned = engine.partition(users)
+
+    assert_valid(groups, users, engine)
+    placed = [uid for g in groups for uid in g['members']]
+    assert len(placed) == len(set(placed))
+    assert sorted(placed + unassigned) == sorted(u['user_id'] for u in users)
+
+
+def test_form_groups_returns_only_groups():
+    users = [make_user(f"u{i}", 'moderate') for i in range(6)]
+    groups = SimilarityGroupEngine().form_groups(users)
+    assert len(groups) == 1 and len(groups[0]['members']) == 6
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Unit tests for therapist briefing generation and serving (backend_api.py)
+Run: python -m pytest -q test_therapist_briefing.py
+"""
+
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('MENTRA_JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+
+import pytest
+
+import backend_api
+from briefing_store import BriefingError, BriefingStore, group_fingerprint
+from user_store import InMemoryUserStore
+
+
+def stored_user(user_id):
+    return {
+        'user_id': user_id,
+        'primary_concern': 'anxiety',
+        'conversation_analysis': [{'urgency_level': 'normal', 'key_themes': ['sleep']}],
+        'urgency_level': 'normal',
+        'crisis_level': 'none',
+        'memory_summary': 'Trouble sleeping since a job change.',
+        'responses': {'preferred_time': 'evening'},
+        'chat_history': [{'role': 'user', 'content': 'private transcript'}],
+        'prompt_token_log': [{'prompt_tokens': 900}] * 50,
+        'last_turn': {'reply_to_user': 'full response'},
+        'turn_count': 7
+    }
+
+
+def test_member_details_carry_only_briefing_fields():
+    users = InMemoryUserStore()
+    for uid in ('a', 'b'):
+        users.upsert(stored_user(uid))
+    group = {'id': 'g1', 'members': ['a', 'b', 'gone'], 'primary_focus': 'anxiety'}
+
+    details = backend_api._with_member_details(group, users.get)['member_details']
+    assert [d['user_id'] for d in details] == ['a', 'b']
+    assert set(details[0]) == set(backend_api.BRIEFING_MEMBER_FIELDS)
+    assert 'private transcript' not in backend_api.compact_json(details)
+
+
+def test_transcript_changes_do_not_change_the_fingerprint():
+    users = InMemoryUserStore()
+    users.upsert(stored_user('a'))
+    group = {'id': 'g1', 'members': ['a'], 'primary_focus': 'anxiety'}
+    before = group_fingerprint(backend_api._with_member_details(group, users.get))
+    users.update('a', lambda u: u['chat_history'].append({'role': 'user', 'content': 'more'}))
+    assert group_fingerprint(backend_api._with_member_details(group, users.get)) == before
+
+
+def test_failed_briefing_is_a_503_and_is_not_replayed(monkeypatch):
+    group = {'id': 'g1', 'members': ['a', 'b', 'c', 'd'], 'primary_focus': 'anxiety'}
+    outcomes = [{'error': 'upstream timeout'}, {'group_id': 'g1', 'briefing_text': 'Session plan'}]
+    monkeypatch.setattr(backend_api, 'group_placer', SimpleNamespace(get_group=lambda group_id: group))
+    monkeypatch.setattr(backend_api, 'briefing_store', BriefingStore(lambda g: outcomes.pop(0)))
+
+    async def fetch():
+        client = backend_api.app.test_client()
+        response = await client.get('/api/therapist/briefing/g1', headers={'Idempotency-Key': 'k1'})
+        return response.status_code, await response.get_json()
+
+    status, payload = asyncio.run(fetch())
+    assert status == 503 and payload['success'] is False and 'upstream timeout' in payload['error']
+    # The retry with the same key runs again instead of replaying the failure
+    status, payload = asyncio.run(fetch())
+    assert status == 200 and payload['briefing']['briefing_text'] == 'Session plan'
+
+
+def test_failed_briefing_fails_the_job(monkeypatch):
+    group = {'id': 'g1', 'members': ['a', 'b', 'c', 'd'], 'primary_focus': 'anxiety'}
+    monkeypatch.setattr(backend_api, 'group_placer', SimpleNamespace(get_group=lambda group_id: group))
+    monkeypatch.setattr(backend_api, 'briefing_store', BriefingStore(lambda g: {'error': 'upstream timeout'}))
+    with pytest.raises(BriefingError):
+        backend_api._run_briefing_job({'group_id': 'g1'}, None)
+    assert BriefingError in backend_api.job_runner.retryable
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for request tracing: sampling and traceparent propagation (tracing.py)
+Run: python -m pytest -q test_tracing.py
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+import tracing
+from tracing import NOOP_SPAN, BackgroundExporter, JSONLinesExporter, Tracer
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def test_sampling_off_ignores_a_sampled_traceparent():
+    tracer = Tracer(ListExporter(), sample_rate=0.0, trust_parent=True)
+    assert tracer.start_trace('GET /', f"00-{TRACE_ID}-{PARENT_ID}-01") is NOOP_SPAN
+
+
+def test_untrusted_traceparent_cannot_force_sampling(monkeypatch):
+    tracer = Tracer(ListExporter(), sample_rate=0.01)
+    monkeypatch.setattr(tracing.random, 'random', lambda: 0.5)
+    assert tracer.start_trace('GET /', f"00-{TRACE_ID}-{PARENT_ID}-01") is NOOP_SPAN
+
+
+def test_trusted_traceparent_decides_sampling(monkeypatch):
+    tracer = Tracer(ListExporter(), sample_rate=0.01, trust_parent=True)
+    monkeypatch.setattr(tracing.random, 'random', lambda: 0.5)
+    span = tracer.start_trace('GET /', f"00-{TRACE_ID}-{PARENT_ID}-01")
+    assert (span.trace_id, span.parent_id) == (TRACE_ID, PARENT_ID)
+    monkeypatch.setattr(tracing.random, 'random', lambda: 0.0)
+    assert tracer.start_trace('GET /', f"00-{TRACE_ID}-{PARENT_ID}-00") is NOOP_SPAN
+
+
+def test_sampled_trace_continues_the_callers_trace_id():
+    tracer = Tracer(ListExporter(), sample_rate=1.0)
+    span = tracer.start_trace('GET /', f"00-{TRACE_ID}-{PARENT_ID}-00")
+    assert (span.trace_id, span.parent_id) == (TRACE_ID, PARENT_ID)
+    fresh = tracer.start_trace('GET /', 'garbage')
+    assert len(fresh.trace_id) == 32 and fresh.parent_id is None
+
+
+def test_child_spans_nest_across_awaits_and_threads():
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=1.0)
+
+    @tracer.traced('work')
+    def work():
+        return threading.current_thread().name
+
+    async def handle():
+        with tracer.start_trace('POST /api/x') as root:
+            with tracer.span('load'):
+                await asyncio.sleep(0)
+            await asyncio.to_thread(work)
+            return root
+
+    root = asyncio.run(handle())
+    by_name = {s.name: s for s in exporter.spans}
+    assert set(by_name) == {'POST /api/x', 'load', 'work'}
+    assert {s.trace_id for s in exporter.spans} == {root.trace_id}
+    assert by_name['load'].parent_id == by_name['work'].parent_id == root.span_id
+
+
+def test_spans_outside_a_sampled_request_are_noops():
+    tracer = Tracer(ListExporter(), sample_rate=1.0)
+    assert tracer.span('orphan') is NOOP_SPAN
+    assert tracer.current() is NOOP_SPAN
+
+
+def test_exporter_thread_starts_with_the_first_span(tmp_path):
+    exporter = JSONLinesExporter(str(tmp_path / 'traces.jsonl'), flush_interval=0.01)
+    assert exporter._thread is None
+    tracer = Tracer(exporter, sample_rate=1.0)
+    tracer.start_trace('GET /').end()
+    assert exporter._thread is not None
+    exporter._thread.join(0.5)
+    line = json.loads((tmp_path / 'traces.jsonl').read_text().splitlines()[0])
+    assert line['name'] == 'GET /'
+
+
+def test_configure_tracer_off_creates_no_exporter(monkeypatch):
+    monkeypatch.setenv('MENTRA_TRACE_SAMPLE_RATE', '0')
+    monkeypatch.setattr(tracing, 'tracer', Tracer(tracing.NullExporter()))
+    assert isinstance(tracing.configure_tracer().exporter, tracing.NullExporter)
+
+
+def test_background_exporter_requires_write():
+    with pytest.raises(TypeError):
+        BackgroundExporter()
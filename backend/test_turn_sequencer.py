@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-user intake turn ordering (turn_sequencer.py) and the 409s it produces
+Run: python -m pytest -q test_turn_sequencer.py
+"""
+
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('MENTRA_JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+
+import pytest
+
+import backend_api
+from turn_sequencer import StaleTurn, TurnSequencer
+from user_store import InMemoryUserStore
+
+REPLY = {'success': True, 'reply_to_user': 'Thanks for sharing'}
+
+
+def user_after(turns):
+    return {'user_id': 'u1', 'turn_count': turns,
+            'last_turn': {'seq': turns, 'message': 'last message', 'response': REPLY}}
+
+
+def test_next_turn_and_unnumbered_turns_pass():
+    sequencer = TurnSequencer()
+    sequencer.check(user_after(2), 'hello', 3)
+    sequencer.check(user_after(2), 'hello', None)
+    sequencer.check({'user_id': 'new'}, 'hello', 1)
+    assert sequencer.stats()['rejected'] == 0
+
+
+@pytest.mark.parametrize('seq, error', [(1, 'stale_turn'), (2, 'stale_turn'), (4, 'out_of_order_turn')])
+def test_stale_and_skipped_turns_are_409s(seq, error):
+    sequencer = TurnSequencer()
+    with pytest.raises(StaleTurn) as raised:
+        sequencer.check(user_after(2), 'a different message', seq)
+    payload, status = raised.value.response()
+    assert status == 409 and payload == {'success': False, 'error': error, 'expected_seq': 3}
+    assert sequencer.stats()['rejected'] == 1
+
+
+def test_retry_of_the_last_turn_replays_its_reply():
+    sequencer = TurnSequencer()
+    with pytest.raises(StaleTurn) as raised:
+        sequencer.check(user_after(2), 'last message', 2)
+    assert raised.value.response() == (dict(REPLY, duplicate=True), 200)
+    assert sequencer.stats()['replayed'] == 1
+
+
+def test_turns_for_one_user_run_one_at_a_time():
+    sequencer = TurnSequencer()
+    order = []
+
+    async def turn(user_id, name):
+        async with sequencer.serialize(user_id):
+            order.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            order.append(f"{name} end")
+
+    async def main():
+        await asyncio.gather(turn('u1', 'a'), turn('u1', 'b'), turn('u2', 'c'))
+
+    asyncio.run(main())
+    assert order.index('a end') < order.index('b start')
+    # Another user's turn did not wait behind u1
+    assert order.index('c start') < order.index('a end')
+    assert sequencer.stats()['serialized'] == 1 and sequencer.stats()['active_users'] == 0
+
+
+def test_identical_requests_in_flight_share_one_run():
+    sequencer = TurnSequencer()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'reply'
+
+    async def main():
+        return await asyncio.gather(sequencer.coalesce(('u1', 1, 'hi'), run),
+                                    sequencer.coalesce(('u1', 1, 'hi'), run))
+
+    assert asyncio.run(main()) == [('reply', False), ('reply', True)]
+    assert len(calls) == 1 and sequencer.stats()['in_flight'] == 0
+
+
+@pytest.mark.parametrize('path', ['/api/analyze-message', '/api/analyze-message/stream'])
+def test_stale_turn_is_a_409_over_http(monkeypatch, path):
+    users = InMemoryUserStore()
+    users.upsert(dict(user_after(2), chat_history=[]))
+    monkeypatch.setattr(backend_api, 'users_db', users)
+
+    async def post(body):
+        client = backend_api.app.test_client()
+        response = await client.post(path, json=body)
+        return response.status_code, await response.get_json()
+
+    status, payload = asyncio.run(post({'user_id': 'u1', 'message': 'again', 'seq': 1}))
+    assert status == 409 and payload['error'] == 'stale_turn' and payload['expected_seq'] == 3
+    status, payload = asyncio.run(post({'user_id': 'u1', 'message': 'hi', 'seq': 0}))
+    assert status == 400
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the indexed user stores (user_store.py), run against both backends
+Run: python -m pytest -q test_user_store.py
+"""
+
+import threading
+
+import pytest
+
+from user_store import InMemoryUserStore, SQLiteUserStore, VersionConflict, concern_keys, urgency_of
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return InMemoryUserStore()
+    return SQLiteUserStore(str(tmp_path / 'users.db'))
+
+
+def test_concern_keys_and_urgency():
+    assert concern_keys({'primary_concern': ' Anxiety '}) == ['anxiety']
+    assert sorted(concern_keys({'primary_concern': {'Grief': {}, 'stress': {}}})) == ['grief', 'stress']
+    assert urgency_of({'urgency_level': 'elevated',
+                       'conversation_analysis': [{'urgency_level': 'crisis'}]}) == 'crisis'
+    assert urgency_of({}) == 'normal'
+
+
+def test_upsert_get_and_delete(store):
+    store.upsert({'user_id': 'u1', 'primary_concern': 'anxiety'})
+    assert store.get('u1')['primary_concern'] == 'anxiety'
+    assert 'u1' in store and len(store) == 1
+    assert store.delete('u1')
+    assert store.get('u1') is None and len(store) == 0
+
+
+def test_get_returns_a_private_copy(store):
+    store.upsert({'user_id': 'u1', 'chat_history': []})
+    store.get('u1')['chat_history'].append('edit')
+    assert store.get('u1')['chat_history'] == []
+
+
+def test_indexes_follow_updates(store):
+    store.upsert({'user_id': 'u1', 'primary_concern': 'anxiety', 'urgency_level': 'normal'})
+    store.upsert({'user_id': 'u2', 'primary_concern': 'anxiety', 'urgency_level': 'high'})
+    assert sorted(u['user_id'] for u in store.by_concern('Anxiety')) == ['u1', 'u2']
+
+    store.update('u1', lambda u: u.update(primary_concern='grief', urgency_level='high'))
+    assert [u['user_id'] for u in store.by_concern('anxiety')] == ['u2']
+    assert [u['user_id'] for u in store.by_concern('grief')] == ['u1']
+    assert sorted(u['user_id'] for u in store.by_urgency('high')) == ['u1', 'u2']
+    assert store.by_urgency('normal') == []
+
+    store.delete('u2')
+    assert store.by_concern('anxiety') == []
+
+
+def test_stale_write_is_rejected(store):
+    store.upsert({'user_id': 'u1'})
+    first, second = store.get('u1'), store.get('u1')
+    store.upsert(first, expected_version=first['_version'])
+    with pytest.raises(VersionConflict):
+        store.upsert(second, expected_version=second['_version'])
+    with pytest.raises(VersionConflict):
+        store.upsert({'user_id': 'u1'}, expected_version=0)
+
+
+def test_update_creates_and_skips(store):
+    assert store.update('missing', lambda u: None) is None
+    created = store.update('u1', lambda u: u.update(seen=True), create=lambda: {'user_id': 'u1'})
+    assert created['seen'] and store.get('u1')['seen']
+    assert store.update('u1', lambda u: False) is None
+
+
+def test_concurrent_updates_are_not_lost(store):
+    store.upsert({'user_id': 'u1', 'chat_history': []})
+
+    def append(n):
+        for i in range(25):
+            store.update('u1', lambda u: u['chat_history'].append(f"{n}-{i}"), attempts=1000)
+
+    threads = [threading.Thread(target=append, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(store.get('u1')['chat_history']) == 100
+
+
+def test_upsert_many_and_clear(store):
+    assert store.upsert_many([{'user_id': f"u{i}", 'primary_concern': 'stress'} for i in range(50)]) == 50
+    assert len(store) == 50 and len(store.by_concern('stress')) == 50
+    store.clear()
+    assert len(store) == 0 and store.by_concern('stress') == []
+
+
+def test_readers_return_copies_without_version(store):
+    user = {'user_id': 'u1', 'primary_concern': 'anxiety', 'urgency_level': 'high', 'chat_history': []}
+    written = store.upsert(user)
+    assert '_version' not in user and written['_version'] == 1
+
+    user['chat_history'].append('caller edit')
+    for reader in (store.all, lambda: store.by_concern('anxiety'), lambda: store.by_urgency('high')):
+        record = reader()[0]
+        assert '_version' not in record and record['chat_history'] == []
+        record['chat_history'].append('reader edit')
+    assert store.get('u1')['chat_history'] == []
+
+
+def test_upsert_many_does_not_touch_the_callers_records(store):
+    users = [{'user_id': 'u1', 'tags': []}]
+    store.upsert_many(users)
+    users[0]['tags'].append('edit')
+    assert users == [{'user_id': 'u1', 'tags': ['edit']}]
+    assert store.get('u1') == {'user_id': 'u1', 'tags': [], '_version': 1}
+
+
+def test_legacy_rows_with_version_in_the_json(tmp_path):
+    store = SQLiteUserStore(str(tmp_path / 'users.db'))
+    with store._conn() as conn:
+        conn.execute("INSERT INTO users (user_id, urgency, data, version) VALUES ('u1', 'normal', ?, 3)",
+                     ('{"user_id": "u1", "_version": 2}',))
+    assert store.get('u1')['_version'] == 3
+    assert store.all() == [{'user_id': 'u1'}]
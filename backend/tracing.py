@@ -0,0 +1,293 @@
+"""
+Request Tracing for Mentra AI System
+Nested timing spans with a per-request trace id, sampled per request and
+exported in the background as JSON lines or OTLP/HTTP JSON. When a request is
+not sampled every span is a shared no-op, so instrumentation costs one
+context-variable lookup.
+"""
+
+import abc
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+# The span new spans nest under; None when the request is not being traced
+_current = contextvars.ContextVar('mentra_span', default=None)
+
+
+class Span:
+    __slots__ = ('tracer', 'trace_id', 'span_id', 'parent_id', 'name', 'attributes',
+                 'start_ns', 'end_ns', 'status', '_token')
+
+    def __init__(self, tracer, trace_id, parent_id, name, attributes):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = 'ok'
+        self._token = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.status = 'error'
+            self.attributes['error'] = f"{exc_type.__name__}: {exc}"
+        self.end()
+        _current.reset(self._token)
+        return False
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.exporter.export(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'status': self.status,
+            'attributes': self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stands in for every span of an unsampled request"""
+
+    trace_id = None
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    start_trace() opens a request's root span, sampled with probability
+    sample_rate; a sampled trace continues the caller's W3C traceparent. The
+    caller's sampled flag is only obeyed from a trusted upstream (trust_parent)
+    and while tracing is on, so clients cannot force spans into the export.
+    span() nests under whatever span is current in this context, including
+    across awaits, asyncio tasks and asyncio.to_thread.
+    """
+
+    def __init__(self, exporter, sample_rate=0.0, trust_parent=False):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.trust_parent = trust_parent
+
+    def start_trace(self, name, traceparent=None, **attributes):
+        """Root span for one request; call .end() (or use as a context manager)"""
+        if self.sample_rate <= 0:
+            return NOOP_SPAN
+        trace_id, parent_id, sampled = None, None, None
+        if traceparent:
+            parts = traceparent.split('-')
+            if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+                trace_id, parent_id, sampled = parts[1], parts[2], parts[3] == '01'
+        if sampled is None or not self.trust_parent:
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return NOOP_SPAN
+        return Span(self, trace_id or f"{random.getrandbits(128):032x}", parent_id, name, attributes)
+
+    def span(self, name, parent=None, **attributes):
+        """Child of parent, or of the current span; no-op outside a sampled request"""
+        parent = parent or _current.get()
+        if parent is None or parent is NOOP_SPAN:
+            return NOOP_SPAN
+        return Span(self, parent.trace_id, parent.span_id, name, attributes)
+
+    def traced(self, name=None):
+        """Decorator wrapping a function or coroutine function in a span"""
+        def decorate(fn):
+            span_name = name or fn.__qualname__
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    @staticmethod
+    def current():
+        """The active span, or the no-op span outside a sampled request"""
+        span = _current.get()
+        return span if span is not None else NOOP_SPAN
+
+
+# ============================================================================
+# EXPORTERS
+# ============================================================================
+
+class BackgroundExporter(abc.ABC):
+    """
+    Finished spans go on a deque (append is atomic, no lock or thread wake-up);
+    a daemon thread, started with the first span, drains it every flush_interval
+    seconds and writes in batches.
+    """
+
+    def __init__(self, flush_interval=1.0, max_queue=10000):
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._pending = deque()
+        self.exported = 0
+        self.dropped = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def export(self, span):
+        if self._thread is None:
+            self._start()
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._pending.append(span)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='trace-export', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if not batch:
+                continue
+            try:
+                self.write(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                print(f"Error exporting trace spans: {str(e)}")
+
+    @abc.abstractmethod
+    def write(self, spans):
+        """Send one batch of finished spans"""
+
+
+class JSONLinesExporter(BackgroundExporter):
+    """One JSON object per span, appended to a local file"""
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def write(self, spans):
+        with open(self.path, 'a') as f:
+            f.write(''.join(json.dumps(s.to_dict(), default=str) + '\n' for s in spans))
+
+
+class OTLPExporter(BackgroundExporter):
+    """OTLP/HTTP JSON to a collector, e.g. http://localhost:4318/v1/traces"""
+
+    def __init__(self, endpoint, service_name='mentra-backend', **kwargs):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.http = httpx.Client(timeout=5.0)
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def write(self, spans):
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'mentra.tracing'},
+                'spans': [{
+                    'traceId': s.trace_id,
+                    'spanId': s.span_id,
+                    'parentSpanId': s.parent_id or '',
+                    'name': s.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(s.start_ns),
+                    'endTimeUnixNano': str(s.end_ns),
+                    'attributes': [{'key': k, 'value': self._value(v)} for k, v in s.attributes.items()],
+                    'status': {'code': 2 if s.status == 'error' else 1}
+                } for s in spans]
+            }]
+        }]}
+        self.http.post(self.endpoint, json=payload).raise_for_status()
+
+
+class NullExporter:
+    exported = 0
+    dropped = 0
+
+    def export(self, span):
+        pass
+
+
+# Process-wide tracer; off until configure_tracer() runs
+tracer = Tracer(NullExporter())
+
+
+def configure_tracer():
+    """
+    Configure the shared tracer from MENTRA_TRACE_* env vars: SAMPLE_RATE (0-1,
+    default 0 = off), EXPORT (jsonl | otlp), PATH (JSON lines file), OTLP_ENDPOINT
+    and TRUST_PARENT (obey the sampled flag of an incoming traceparent, for use
+    behind a gateway that sets it). With tracing off no exporter is created.
+    """
+    tracer.sample_rate = float(os.getenv('MENTRA_TRACE_SAMPLE_RATE', '0'))
+    tracer.trust_parent = os.getenv('MENTRA_TRACE_TRUST_PARENT', 'false').lower() in ('1', 'true', 'yes')
+    if tracer.sample_rate <= 0:
+        tracer.exporter = NullExporter()
+        return tracer
+    export = os.getenv('MENTRA_TRACE_EXPORT', 'jsonl').lower()
+    if export == 'otlp':
+        tracer.exporter = OTLPExporter(os.getenv('MENTRA_TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces'))
+    elif export == 'jsonl':
+        tracer.exporter = JSONLinesExporter(os.getenv('MENTRA_TRACE_PATH', 'traces.jsonl'))
+    return tracer
@@ -0,0 +1,108 @@
+"""
+Turn Sequencer for Mentra AI System
+Keeps intake turns for one user in order: a per-user lock serializes them,
+optional client sequence numbers reject stale or out-of-order turns, and
+identical requests already in flight share one analysis
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class StaleTurn(Exception):
+    """A turn whose sequence number was already used or skips ahead"""
+
+    def __init__(self, user_id, seq, expected, replay=None):
+        super().__init__(f"turn {seq} for {user_id}: expected {expected}")
+        self.seq = seq
+        self.expected = expected
+        self.replay = replay
+
+    def response(self):
+        """(payload, status): the stored reply for a retried turn, otherwise a 409"""
+        if self.replay is not None:
+            return dict(self.replay, duplicate=True), 200
+        return {
+            'success': False,
+            'error': 'stale_turn' if self.seq < self.expected else 'out_of_order_turn',
+            'expected_seq': self.expected
+        }, 409
+
+
+class TurnSequencer:
+    """
+    Per-user ordering for intake turns on one event loop.
+
+    seq is the 1-based turn number the client is sending; turn N is accepted
+    only when the user's record holds N - 1 turns (user['turn_count']). A retry
+    of the last recorded turn (same seq and message) gets the stored reply back
+    instead of a second LLM call. Without seq, turns are still serialized so
+    each one sees the history written by the one before it.
+    Different users never wait on each other.
+    """
+
+    def __init__(self):
+        self._locks = {}       # user_id -> [asyncio.Lock, holders]
+        self._inflight = {}    # (user_id, seq, message) -> asyncio.Task
+        self.serialized = 0    # turns that waited behind another turn for the same user
+        self.coalesced = 0
+        self.replayed = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def serialize(self, user_id):
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        if entry[0].locked():
+            self.serialized += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[user_id]
+
+    async def coalesce(self, key, run):
+        """
+        Await run() unless an identical request is already in flight, in which case
+        share its result. Returns (result, coalesced).
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so a client hanging up does not cancel the turn for a duplicate
+        return await asyncio.shield(task), False
+
+    def check(self, user, message, seq):
+        """Raise StaleTurn unless seq (when given) is the user's next turn"""
+        if seq is None:
+            return
+        expected = user.get('turn_count', 0) + 1
+        if seq == expected:
+            return
+        last = user.get('last_turn') or {}
+        replay = None
+        if last.get('seq') == seq and last.get('message') == message:
+            replay = last.get('response')
+        if replay is not None:
+            self.replayed += 1
+        else:
+            self.rejected += 1
+        raise StaleTurn(user.get('user_id'), seq, expected, replay)
+
+    def stats(self):
+        return {
+            'active_users': len(self._locks),
+            'in_flight': len(self._inflight),
+            'serialized': self.serialized,
+            'coalesced': self.coalesced,
+            'replayed': self.replayed,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,337 @@
+"""
+User Store for Mentra AI System
+Indexed user/session storage with an in-memory and a SQLite (WAL) backend.
+Records carry a version so concurrent writers (threads or worker processes)
+use optimistic concurrency instead of silently overwriting each other.
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+
+
+# Urgency levels ordered from least to most urgent
+URGENCY_LEVELS = ['normal', 'elevated', 'high', 'crisis']
+
+
+def concern_keys(user):
+    """Normalised concern keys a user should be indexed under"""
+    concern = user.get('primary_concern')
+    if not concern:
+        return []
+    if isinstance(concern, dict):
+        keys = concern.keys()
+    elif isinstance(concern, (list, tuple, set)):
+        keys = concern
+    else:
+        keys = [concern]
+    return sorted({str(k).strip().lower() for k in keys if k})
+
+
+def urgency_of(user):
+    """Highest urgency level recorded for a user"""
+    levels = [user.get('urgency_level')]
+    for analysis in user.get('conversation_analysis') or []:
+        levels.append(analysis.get('urgency_level'))
+    ranked = [URGENCY_LEVELS.index(l) for l in levels if l in URGENCY_LEVELS]
+    return URGENCY_LEVELS[max(ranked)] if ranked else 'normal'
+
+
+def _without_version(user):
+    """The record as stored: the version lives beside it, not in it"""
+    return {k: v for k, v in user.items() if k != '_version'}
+
+
+class VersionConflict(Exception):
+    """The stored record changed since it was read"""
+
+
+class OptimisticUpdateMixin:
+    """read-modify-write with retry on VersionConflict"""
+
+    def update(self, user_id, mutate, create=None, attempts=8):
+        """
+        Load the latest record (or create() it), apply mutate(user) and write it
+        back only if nobody else wrote in between; on conflict start over from the
+        fresh record. mutate may return False to skip the write. Returns the
+        written user, or None when there was nothing to update.
+        """
+        for _ in range(attempts):
+            user = self.get(user_id)
+            if user is None:
+                if create is None:
+                    return None
+                user = create()
+            expected = user.get('_version', 0)
+            if mutate(user) is False:
+                return None
+            try:
+                return self.upsert(user, expected_version=expected)
+            except VersionConflict:
+                self.conflicts += 1
+        raise VersionConflict(f"user {user_id} kept changing after {attempts} attempts")
+
+
+class InMemoryUserStore(OptimisticUpdateMixin):
+    """
+    Dict-backed user store with O(1) lookup by user_id and secondary
+    indexes on primary concern and urgency. Like the SQLite store it keeps
+    its own copy of every record and hands out copies, so records only
+    change through upsert/update; get() and writes add '_version'.
+    """
+
+    backend = 'memory'
+
+    def __init__(self):
+        self._users = {}
+        self._versions = {}
+        self._by_concern = defaultdict(set)
+        self._by_urgency = defaultdict(set)
+        self._indexed = {}
+        self._lock = threading.Lock()
+        self.conflicts = 0
+
+    def get(self, user_id):
+        """A private copy, so edits only land through upsert/update"""
+        # Stored records are replaced, never edited, so copying outside the lock is safe
+        with self._lock:
+            user, version = self._users.get(user_id), self._versions.get(user_id)
+        return dict(copy.deepcopy(user), _version=version) if user is not None else None
+
+    def upsert(self, user, expected_version=None):
+        """
+        Insert or replace a user and refresh its index entries.
+        With expected_version the write only happens if the stored version still
+        matches (0 = must not exist yet); otherwise VersionConflict is raised.
+        """
+        record = copy.deepcopy(_without_version(user))
+        with self._lock:
+            current = self._versions.get(user['user_id'], 0)
+            if expected_version is not None and current != expected_version:
+                raise VersionConflict(user['user_id'])
+            self._put(record)
+        return dict(user, _version=current + 1)
+
+    def upsert_many(self, users):
+        records = [copy.deepcopy(_without_version(user)) for user in users]
+        with self._lock:
+            for record in records:
+                self._put(record)
+        return len(users)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._unindex(user_id)
+            self._versions.pop(user_id, None)
+            return self._users.pop(user_id, None) is not None
+
+    def _copies(self, user_ids):
+        with self._lock:
+            users = [self._users[uid] for uid in list(user_ids)]
+        return [copy.deepcopy(user) for user in users]
+
+    def by_concern(self, concern):
+        return self._copies(self._by_concern.get(str(concern).strip().lower(), ()))
+
+    def by_urgency(self, level):
+        return self._copies(self._by_urgency.get(level, ()))
+
+    def all(self):
+        return self._copies(self._users)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._versions.clear()
+            self._by_concern.clear()
+            self._by_urgency.clear()
+            self._indexed.clear()
+
+    def _put(self, user):
+        user_id = user['user_id']
+        self._unindex(user_id)
+        self._users[user_id] = user
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        concerns, urgency = concern_keys(user), urgency_of(user)
+        for concern in concerns:
+            self._by_concern[concern].add(user_id)
+        self._by_urgency[urgency].add(user_id)
+        self._indexed[user_id] = (concerns, urgency)
+
+    def _unindex(self, user_id):
+        previous = self._indexed.pop(user_id, None)
+        if not previous:
+            return
+        concerns, urgency = previous
+        for concern in concerns:
+            self._by_concern[concern].discard(user_id)
+        self._by_urgency[urgency].discard(user_id)
+
+    def __len__(self):
+        return len(self._users)
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __contains__(self, user_id):
+        return user_id in self._users
+
+
+class SQLiteUserStore(OptimisticUpdateMixin):
+    """
+    SQLite-backed user store running in WAL mode so readers never block the writer.
+    Records are stored as JSON, with indexed columns for concern and urgency,
+    and the version in its own column. Several worker processes can share one
+    database file.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path='mentra.db'):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.conflicts = 0
+        conn = self._conn()
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                urgency TEXT NOT NULL,
+                data TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0)""")
+            # Databases created before versioning
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+            if 'version' not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute("""CREATE TABLE IF NOT EXISTS user_concerns (
+                user_id TEXT NOT NULL,
+                concern TEXT NOT NULL,
+                PRIMARY KEY (concern, user_id))""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_urgency ON users(urgency)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_user_concerns_user ON user_concerns(user_id)")
+
+    def _conn(self):
+        """One connection per thread (and process); SQLite connections are not thread safe"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, user_id):
+        row = self._conn().execute(
+            "SELECT data, version FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if not row:
+            return None
+        return dict(self._load(row[0]), _version=row[1])
+
+    @staticmethod
+    def _load(data):
+        user = json.loads(data)
+        # Rows written before the version had its own column carried it in the JSON
+        user.pop('_version', None)
+        return user
+
+    def upsert(self, user, expected_version=None):
+        """
+        Insert or replace a user. With expected_version the write is a
+        compare-and-set on the version column (0 = must not exist yet), atomic
+        across processes; a mismatch raises VersionConflict.
+        """
+        conn = self._conn()
+        if expected_version is None:
+            with self._write_lock, conn:
+                return dict(user, _version=self._put(conn, user))
+        user_id = user['user_id']
+        data = json.dumps(_without_version(user))
+        with self._write_lock, conn:
+            if expected_version == 0:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO users (user_id, urgency, data, version) VALUES (?, ?, ?, 1)",
+                    (user_id, urgency_of(user), data))
+            else:
+                cur = conn.execute(
+                    "UPDATE users SET urgency = ?, data = ?, version = version + 1 WHERE user_id = ? AND version = ?",
+                    (urgency_of(user), data, user_id, expected_version))
+            if cur.rowcount != 1:
+                raise VersionConflict(user_id)
+            self._index_concerns(conn, user)
+        return dict(user, _version=expected_version + 1)
+
+    def upsert_many(self, users):
+        conn = self._conn()
+        with self._write_lock, conn:
+            for user in users:
+                self._put(conn, user)
+        return len(users)
+
+    def delete(self, user_id):
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM user_concerns WHERE user_id = ?", (user_id,))
+            cur = conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+        return cur.rowcount > 0
+
+    def by_concern(self, concern):
+        rows = self._conn().execute(
+            """SELECT u.data FROM user_concerns c JOIN users u ON u.user_id = c.user_id
+               WHERE c.concern = ?""", (str(concern).strip().lower(),))
+        return [self._load(r[0]) for r in rows]
+
+    def by_urgency(self, level):
+        rows = self._conn().execute("SELECT data FROM users WHERE urgency = ?", (level,))
+        return [self._load(r[0]) for r in rows]
+
+    def all(self):
+        return [self._load(r[0]) for r in self._conn().execute("SELECT data FROM users")]
+
+    def clear(self):
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM user_concerns")
+            conn.execute("DELETE FROM users")
+
+    def _put(self, conn, user):
+        """Write a user unconditionally; returns its new version"""
+        user_id = user['user_id']
+        row = conn.execute("SELECT version FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        version = (row[0] if row else 0) + 1
+        conn.execute(
+            "INSERT OR REPLACE INTO users (user_id, urgency, data, version) VALUES (?, ?, ?, ?)",
+            (user_id, urgency_of(user), json.dumps(_without_version(user)), version))
+        self._index_concerns(conn, user)
+        return version
+
+    def _index_concerns(self, conn, user):
+        user_id = user['user_id']
+        conn.execute("DELETE FROM user_concerns WHERE user_id = ?", (user_id,))
+        conn.executemany(
+            "INSERT INTO user_concerns (user_id, concern) VALUES (?, ?)",
+            [(user_id, c) for c in concern_keys(user)])
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __contains__(self, user_id):
+        return self._conn().execute(
+            "SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+
+def create_user_store():
+    """
+    Build the user store selected by MENTRA_USER_STORE ("memory" or "sqlite").
+    The SQLite file location is read from MENTRA_DB_PATH.
+    """
+    backend = os.getenv('MENTRA_USER_STORE', 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteUserStore(os.getenv('MENTRA_DB_PATH', 'mentra.db'))
+    return InMemoryUserStore()
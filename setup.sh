@@ -16,7 +16,7 @@ NC='\033[0m' # No Color
 echo -n "Checking Python... "
 if ! command -v python3 &> /dev/null; then
     echo -e "${RED}✗ Not found${NC}"
-    echo "Please install Python 3.8+ from https://www.python.org/"
+    echo "Please install Python 3.9+ from https://www.python.org/"
     exit 1
 fi
 echo -e "${GREEN}✓ $(python3 --version)${NC}"
@@ -39,7 +39,7 @@ echo ""
 cd backend
 
 # Install Python packages
-echo "Installing Flask, OpenAI, and other Python packages..."
+echo "Installing Quart, OpenAI, and other Python packages..."
 pip3 install -r requirements.txt --quiet
 if [ $? -eq 0 ]; then
     echo -e "${GREEN}✓ Python packages installed${NC}"